@@ -0,0 +1,282 @@
+# Benchmarks udsm.model operations and the GUI list updates against a
+# synthetic SAVE library in a temporary config directory, the real config is
+# never touched. Results are written as JSON so runs on different commits can
+# be compared:
+#
+#     python scripts/benchmark.py --saves 500 --output before.json
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def isolate(tmp: Path) -> None:
+    # pyqt_utils derives its config directory from the user's home, point
+    # every candidate at the temporary directory before it's imported
+    for var in (
+        "HOME", "USERPROFILE", "XDG_CONFIG_HOME", "XDG_DATA_HOME",
+        "APPDATA", "LOCALAPPDATA",
+    ):
+        os.environ[var] = str(tmp / "home")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sys.path.insert(0, str(ROOT))
+
+    import pyqt_utils
+    import pyqt_utils.paths
+    init_app = pyqt_utils.init_app
+
+    # udsm.__main__ calls init_app() again on import
+    def isolated_init_app(*args: Any, **kwargs: Any) -> Any:
+        result = init_app(*args, **kwargs)
+        pyqt_utils.paths.CONFIG_DIR = tmp / "config"
+        return result
+
+    pyqt_utils.init_app = isolated_init_app
+    pyqt_utils.init_app("ut-dr-save-manager", str(ROOT / "udsm" / "cli.py"))
+
+
+def summarize(times: list[float]) -> dict[str, Any]:
+    ms = [t * 1000 for t in times]
+    return {
+        "runs": len(ms),
+        "min_ms": min(ms),
+        "median_ms": statistics.median(ms),
+        "mean_ms": statistics.fmean(ms),
+        "max_ms": max(ms),
+    }
+
+
+def measure(
+    fn: Callable[[], Any],
+    repeat: int,
+    setup: Callable[[], Any] | None = None,
+    teardown: Callable[[], Any] | None = None,
+) -> dict[str, Any]:
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+        if teardown is not None:
+            teardown()
+    return summarize(times)
+
+
+def make_save_folder(
+    path: Path, game: str, files: int, file_size: int, rng: random.Random
+) -> None:
+    path.mkdir(parents=True)
+    if game == "undertale":
+        names = ["file0", "file9", "undertale.ini", "config.ini"]
+    else:
+        names = [f"filech{ch}_{slot}" for ch in (1, 2) for slot in (0, 1, 2)]
+        names.append("dr.ini")
+    for name in names[:files]:
+        (path / name).write_bytes(rng.randbytes(file_size))
+
+
+def generate_library(
+    sources: Path, saves: int, files: int, file_size: int, seed: int
+) -> list[tuple[Any, str, Path]]:
+    rng = random.Random(seed)
+    library = []
+    for game in ("undertale", "deltarune"):
+        for i in range(saves):
+            name = f"bench {game} {i:05d}"
+            make_save_folder(sources / name, game, files, file_size, rng)
+            library.append((game, name, sources / name))
+    return library
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_model(
+    args: argparse.Namespace, tmp: Path, results: dict[str, Any]
+) -> None:
+    from udsm import model
+
+    for saves_path in model.SAVES_PATHS.values():
+        saves_path.mkdir(parents=True, exist_ok=True)
+    sources = tmp / "sources"
+    library = generate_library(
+        sources, args.saves, args.files, args.file_size, args.seed
+    )
+    start = perf_counter()
+    model.bulk_import(library)
+    results["bulk_import_library"] = summarize([perf_counter() - start])
+
+    def get_saves() -> None:
+        model.get_undertale_saves()
+        model.get_deltarune_saves()
+
+    results["get_saves_cold"] = measure(
+        get_saves, args.repeat, setup=model.index.invalidate
+    )
+    results["get_saves_warm"] = measure(get_saves, args.repeat)
+
+    rng = random.Random(args.seed)
+    new_source = tmp / "new"
+    make_save_folder(
+        new_source, "undertale", args.files, args.file_size, rng
+    )
+    results["create"] = measure(
+        lambda: model.create_undertale_save("bench new", new_source),
+        args.repeat,
+        teardown=lambda: model.delete_undertale_save("bench new"),
+    )
+    results["delete"] = measure(
+        lambda: model.delete_undertale_save("bench new"),
+        args.repeat,
+        setup=lambda: model.create_undertale_save("bench new", new_source),
+    )
+    name = library[0][1]
+    results["rename"] = measure(
+        lambda: model.rename_undertale_save(name, f"{name} renamed"),
+        args.repeat,
+        teardown=lambda: model.rename_undertale_save(f"{name} renamed", name),
+    )
+
+    live = tmp / "live" / "UNDERTALE"
+    names = [save for _, save, _ in library[:args.saves]]
+    applied = iter(names * args.repeat)
+    results["apply"] = measure(
+        lambda: model.copy_undertale_save(next(applied), live), args.repeat
+    )
+    model.backups.wait_for_prune()
+
+    def remove_premade() -> None:
+        for game, save, _ in premade:
+            if game == "undertale":
+                model.delete_undertale_save(save)
+            else:
+                model.delete_deltarune_save(save)
+
+    premade = model.find_premade_saves()
+    results["premade_saves"] = len(premade)
+    results["bulk_import_premade"] = measure(
+        lambda: model.bulk_import(premade), args.repeat,
+        teardown=remove_premade,
+    )
+
+    from udsm import processes
+
+    def reset_scanner() -> None:
+        processes.scanner = processes.ProcessScanner()
+
+    results["program_running_cold"] = measure(
+        lambda: model.program_running("udsm-bench-missing"),
+        args.repeat,
+        setup=reset_scanner,
+    )
+    own_name = processes._proc_stat(os.getpid())
+    if own_name is not None:
+        results["program_running_cached"] = measure(
+            lambda: model.program_running(own_name[0]), args.repeat
+        )
+
+
+def bench_gui(
+    args: argparse.Namespace, tmp: Path, results: dict[str, Any]
+) -> None:
+    from PyQt6.QtWidgets import QApplication
+
+    import udsm.__main__ as gui
+    from udsm import model
+    from udsm.config import init_config, set_config_value
+
+    init_config(gui.DEFAULT_CONFIG)
+    set_config_value("first_startup", False)
+    app = QApplication.instance() or QApplication(["udsm-benchmark"])
+    start = perf_counter()
+    win = gui.MainWindow()
+    results["main_window_init"] = summarize([perf_counter() - start])
+    results["main_window_update_ui_cold"] = measure(
+        win.updateUi, args.repeat, setup=model.index.invalidate
+    )
+    results["main_window_update_ui_warm"] = measure(win.updateUi, args.repeat)
+
+    saves = model.get_undertale_saves() + model.get_deltarune_saves()
+    for i in range(args.playlists):
+        model.playlists.set(f"bench {i}", saves[i::args.playlists])
+    model.playlists.commit()
+    dialog = gui.PlaylistsDialog(model.playlists, win)
+    dialog.playlists.setCurrentRow(0)
+    results["playlists_dialog_update_ui"] = measure(
+        dialog.updateUi, args.repeat
+    )
+    dialog.deleteLater()
+    win.deleteLater()
+    app.processEvents()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark udsm against a synthetic SAVE library."
+    )
+    parser.add_argument(
+        "--saves", type=int, default=200, help="Synthetic SAVES per game"
+    )
+    parser.add_argument("--files", type=int, default=4, help="Files per SAVE")
+    parser.add_argument(
+        "--file-size", type=int, default=4096, help="Bytes per file"
+    )
+    parser.add_argument("--playlists", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-gui", action="store_true")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="udsm-benchmark-"))
+    try:
+        isolate(tmp)
+        results: dict[str, Any] = {}
+        bench_model(args, tmp, results)
+        if not args.no_gui:
+            bench_gui(args, tmp, results)
+        from udsm import jobs
+        jobs.runner.shutdown()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            key: value for key, value in vars(args).items()
+            if key != "output"
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+
+
+def pytest_configure() -> None:
+    # Same isolation as scripts/benchmark.py, udsm.paths reads the config
+    # directory once on import
+    tmp = Path(tempfile.mkdtemp(prefix="udsm-tests-"))
+    for var in (
+        "HOME", "USERPROFILE", "XDG_CONFIG_HOME", "XDG_DATA_HOME",
+        "APPDATA", "LOCALAPPDATA",
+    ):
+        os.environ[var] = str(tmp / "home")
+
+    import pyqt_utils
+    import pyqt_utils.paths
+    pyqt_utils.init_app("ut-dr-save-manager", str(ROOT / "udsm" / "cli.py"))
+    pyqt_utils.paths.CONFIG_DIR = tmp / "config"
+
+
+# Points every store in udsm.model at an empty library below tmp_path
+@pytest.fixture
+def library(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    from udsm import model
+    from udsm.backups import BackupArchive, RetentionPolicy
+    from udsm.index import GAMES, SaveIndex
+    from udsm.metadata import MetadataCache
+    from udsm.playlists import PlaylistStore
+    from udsm.store import ObjectStore
+
+    for game in GAMES:
+        saves_path = tmp_path / f"{game}_saves"
+        saves_path.mkdir()
+        monkeypatch.setitem(model.SAVES_PATHS, game, saves_path)
+    objects = ObjectStore(tmp_path / "objects")
+    backups = BackupArchive(tmp_path / "backups", RetentionPolicy())
+    metadata = MetadataCache(tmp_path / "metadata.sqlite3")
+    monkeypatch.setattr(model, "_objects", objects)
+    monkeypatch.setattr(model, "backups", backups)
+    monkeypatch.setattr(model, "index", SaveIndex(model.SAVES_PATHS))
+    monkeypatch.setattr(model, "metadata", metadata)
+    monkeypatch.setattr(
+        model, "playlists", PlaylistStore(tmp_path / "playlists")
+    )
+    yield tmp_path
+    objects.close()
+    backups.objects.close()
+    metadata.close()
+
+
+type WriteTree = Callable[[Path, dict[str, bytes]], Path]
+
+
+@pytest.fixture
+def write_tree() -> WriteTree:
+    def write(root: Path, files: dict[str, bytes]) -> Path:
+        for rel, data in files.items():
+            (root / rel).parent.mkdir(parents=True, exist_ok=True)
+            (root / rel).write_bytes(data)
+        return root
+    return write
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+from udsm.backups import AUTO_SAVE, BackupArchive, RetentionPolicy
+
+
+def test_snapshot_and_checkout(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    archive = BackupArchive(tmp_path / "backups", RetentionPolicy())
+    save = write_tree(tmp_path / "save", {"file0": b"zero", "sub/a": b"a"})
+    snapshot = archive.snapshot("UNDERTALE", "Frisk", save)
+    archive.wait_for_prune()
+    assert snapshot is not None
+    assert snapshot.size == len(b"zero") + len(b"a")
+    assert [s.name for s in archive.list_snapshots()] == [snapshot.name]
+    archive.checkout(snapshot.name, tmp_path / "dest")
+    assert (tmp_path / "dest" / "sub" / "a").read_bytes() == b"a"
+
+
+def test_unchanged_save_is_skipped(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    archive = BackupArchive(tmp_path / "backups", RetentionPolicy())
+    save = write_tree(tmp_path / "save", {"file0": b"zero"})
+    assert archive.snapshot("UNDERTALE", "Frisk", save) is not None
+    assert archive.snapshot("UNDERTALE", "Frisk", save) is None
+    archive.wait_for_prune()
+    assert len(archive.list_snapshots("UNDERTALE")) == 1
+
+
+def test_same_second_names_are_unique(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    archive = BackupArchive(tmp_path / "backups", RetentionPolicy())
+    created = datetime(2025, 1, 1)
+    names = set()
+    for i in range(3):
+        save = write_tree(tmp_path / "save", {"file0": bytes([i])})
+        snapshot = archive.snapshot("UNDERTALE", "Frisk", save, created)
+        assert snapshot is not None
+        names.add(snapshot.name)
+    archive.wait_for_prune()
+    assert len(names) == 3
+
+
+def test_save_names_are_escaped(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    archive = BackupArchive(tmp_path / "backups", RetentionPolicy())
+    created = datetime(2025, 1, 1)
+    for i, save_name in enumerate(["100%done", "Frisk/Chara"]):
+        save = write_tree(tmp_path / "save", {"file0": bytes([i])})
+        archive.snapshot("UNDERTALE", save_name, save, created)
+    archive.wait_for_prune()
+    assert [(s.name, s.save) for s in archive.list_snapshots()] == [
+        ("UNDERTALE_Frisk_Chara_2025-01-01_00-00-00", "Frisk/Chara"),
+        ("UNDERTALE_100%done_2025-01-01_00-00-00", "100%done"),
+    ]
+
+
+def test_prune_keeps_last_and_days(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    archive = BackupArchive(
+        tmp_path / "backups", RetentionPolicy(keep_last=2, keep_days=1)
+    )
+    start = datetime(2025, 1, 1)
+    for i in range(5):
+        save = write_tree(tmp_path / "save", {"file0": bytes([i]) * 100})
+        archive.snapshot("UNDERTALE", "Frisk", save, start - timedelta(i))
+        archive.wait_for_prune()
+    # The two newest, the newest day is one of them
+    assert [s.created for s in archive.list_snapshots()] == [
+        start, start - timedelta(1)
+    ]
+    digests = {
+        digest for snapshot in archive.list_snapshots()
+        for digest in snapshot.files.values()
+    }
+    assert {
+        path.parent.name + path.name.removesuffix(".delta")
+        for path in archive.objects.root.glob("??/*")
+    } == digests
+
+
+def test_auto_snapshots_have_their_own_limit(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    archive = BackupArchive(
+        tmp_path / "backups",
+        RetentionPolicy(keep_last=2, keep_days=0, keep_auto=3),
+    )
+    start = datetime(2025, 1, 1)
+    saves = ["Frisk"] + [AUTO_SAVE] * 5 + ["Chara"]
+    for i, save_name in enumerate(saves):
+        save = write_tree(tmp_path / "save", {"file0": bytes([i]) * 100})
+        archive.snapshot("UNDERTALE", save_name, save, start + timedelta(i))
+        archive.wait_for_prune()
+    # The auto snapshots don't push out the older manual backup
+    assert [s.save for s in archive.list_snapshots()] == [
+        "Chara", AUTO_SAVE, AUTO_SAVE, AUTO_SAVE, "Frisk",
+    ]
+
+
+def test_prune_by_size_keeps_newest(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    archive = BackupArchive(
+        tmp_path / "backups",
+        RetentionPolicy(max_bytes=0),
+    )
+    for i in range(3):
+        save = write_tree(tmp_path / "save", {"file0": bytes([i])})
+        archive.snapshot("UNDERTALE", "Frisk", save)
+        archive.wait_for_prune()
+    assert len(archive.list_snapshots()) == 1
+
+
+def test_migrate_legacy_backups(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    archive = BackupArchive(tmp_path / "backups", RetentionPolicy())
+    write_tree(
+        archive.root / "DELTARUNE_Kris_2024-05-01_12-00-00",
+        {"filech1_0": b"kris"},
+    )
+    archive.migrate_legacy_backups()
+    archive.wait_for_prune()
+    [snapshot] = archive.list_snapshots("DELTARUNE")
+    assert (snapshot.save, snapshot.created) == (
+        "Kris", datetime(2024, 5, 1, 12)
+    )
+    assert not (archive.root / "DELTARUNE_Kris_2024-05-01_12-00-00").exists()
@@ -0,0 +1,27 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_benchmark_emits_json() -> None:
+    output = subprocess.run(
+        [
+            sys.executable, str(ROOT / "scripts" / "benchmark.py"),
+            "--no-gui", "--saves", "3", "--files", "1", "--repeat", "1",
+            "--playlists", "1",
+        ],
+        capture_output=True, check=True, text=True, timeout=120,
+    ).stdout
+    report = json.loads(output)
+    assert report["params"]["no_gui"] is True
+    timings = [
+        result for result in report["results"].values()
+        if isinstance(result, dict)
+    ]
+    assert timings
+    for result in timings:
+        assert result["runs"] == 1
+        assert result["min_ms"] <= result["median_ms"] <= result["max_ms"]
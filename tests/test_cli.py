@@ -0,0 +1,175 @@
+import json
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from udsm import cli, config, model, paths
+from udsm.config import ConfigStore
+
+
+@pytest.fixture
+def run(
+    library: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> Callable[..., tuple[int, str, str]]:
+    # The library fixture replaces what setup() would initialize
+    monkeypatch.setattr(cli, "setup", lambda: None)
+
+    def run(*argv: str) -> tuple[int, str, str]:
+        code = cli.main(list(argv))
+        out, err = capsys.readouterr()
+        return code, out, err
+    return run
+
+
+@pytest.fixture
+def settings(
+    library: Path, monkeypatch: pytest.MonkeyPatch
+) -> Path:
+    # setup() runs against a fresh settings.json in the library
+    import pyqt_utils
+    monkeypatch.setattr(pyqt_utils, "init_app", lambda *args: None)
+    path = library / "settings.json"
+    path.write_text("{}")
+    monkeypatch.setattr(paths, "CONFIG_PATH", path)
+    monkeypatch.setattr(config, "store", ConfigStore(delay=60))
+    return path
+
+
+def test_setup_migrates_once(
+    settings: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    migrated: list[None] = []
+    monkeypatch.setattr(
+        model, "migrate_legacy_saves", lambda: migrated.append(None)
+    )
+    cli.setup()
+    config.flush_config()
+    cli.setup()
+    assert len(migrated) == 1
+
+
+def test_setup_keeps_the_config(settings: Path) -> None:
+    settings.write_text(json.dumps({"playlists": {"Route": ["Kris"]}}))
+    cli.setup()
+    config.flush_config()
+    assert model.playlists.get("Route") == ["Kris"]
+    assert json.loads(settings.read_text())["playlists"] == {}
+    # Nothing to migrate, so nothing is written
+    mtime = settings.stat().st_mtime_ns
+    cli.setup()
+    config.flush_config()
+    assert settings.stat().st_mtime_ns == mtime
+
+
+def test_save_commands(
+    library: Path,
+    run: Callable[..., tuple[int, str, str]],
+    write_tree: Callable[..., Path],
+) -> None:
+    source = write_tree(library / "source", {"filech1_0": b"kris"})
+    assert run("create", "Kris", str(source))[:2] == (
+        0, "Created deltarune SAVE 'Kris'\n"
+    )
+    assert run("list")[1] == "deltarune\tKris\n"
+    assert run("rename", "Kris", "Susie")[0] == 0
+    assert run("list", "--game", "deltarune")[1] == "Susie\n"
+
+    save_path = library / "live" / "DELTARUNE"
+    assert run("apply", "Susie", "--save-path", str(save_path))[0] == 0
+    assert (save_path / "filech1_0").read_bytes() == b"kris"
+
+    assert run("delete", "Susie")[0] == 0
+    assert run("list")[1] == ""
+    assert model.get_deltarune_saves() == []
+
+
+def test_errors(
+    library: Path,
+    run: Callable[..., tuple[int, str, str]],
+    write_tree: Callable[..., Path],
+) -> None:
+    assert run("apply", "Nobody") == (
+        1, "", "udsm-cli: No SAVE named 'Nobody'\n"
+    )
+    source = write_tree(library / "source", {"notes.txt": b""})
+    code, _, err = run("create", "Notes", str(source))
+    assert code == 1 and "pass --game" in err
+    write_tree(source, {"file0": b"frisk"})
+    assert run("create", "Frisk", str(source))[0] == 0
+    code, _, err = run("create", "frisk", str(source))
+    assert code == 1 and "already exists" in err
+    code, _, err = run(
+        "apply", "Frisk", "--save-path", str(library / "DELTARUNE")
+    )
+    assert code == 1 and "does not end with 'undertale'" in err
+    model._manifest_path("undertale", "Frisk").write_text("{")
+    code, out, err = run(
+        "apply", "Frisk", "--save-path", str(library / "UNDERTALE")
+    )
+    assert (code, out) == (1, "") and err.startswith("udsm-cli: ")
+
+
+def test_backup_commands(
+    library: Path,
+    run: Callable[..., tuple[int, str, str]],
+    write_tree: Callable[..., Path],
+) -> None:
+    save_path = write_tree(library / "UNDERTALE", {"file0": b"frisk"})
+    code, name, _ = run(
+        "backup", "create", "undertale", "--save-path", str(save_path)
+    )
+    assert code == 0
+    name = name.strip()
+    assert run(
+        "backup", "create", "undertale", "--save-path", str(save_path)
+    )[1] == "Nothing changed since the last backup\n"
+    assert run("backup", "list")[1].startswith(f"{name}\t")
+
+    dest = library / "extracted"
+    assert run("backup", "extract", name, str(dest))[0] == 0
+    assert (dest / "file0").read_bytes() == b"frisk"
+    assert run("backup", "extract", name, str(dest))[0] == 1
+    assert run("backup", "extract", "missing", str(library / "x"))[0] == 1
+
+
+def test_pack_commands(
+    library: Path,
+    run: Callable[..., tuple[int, str, str]],
+    write_tree: Callable[..., Path],
+) -> None:
+    source = write_tree(library / "source", {"file0": b"frisk"})
+    assert run("create", "Frisk", str(source))[0] == 0
+    pack = library / "saves.udsmpack"
+    assert run("pack", "export", str(pack), "-p", "Missing")[0] == 1
+    assert run("pack", "export", str(pack))[1] == (
+        f"Exported SAVE pack '{pack}'\n"
+    )
+    assert run("delete", "Frisk")[0] == 0
+    assert run("pack", "import", str(pack))[1] == "Imported 1 of 1 SAVES\n"
+    assert model.get_undertale_saves() == ["Frisk"]
+    code, _, err = run("pack", "import", str(source / "file0"))
+    assert code == 1 and "Can't read SAVE pack" in err
+
+
+def test_verify_command(
+    library: Path,
+    run: Callable[..., tuple[int, str, str]],
+    write_tree: Callable[..., Path],
+) -> None:
+    source = write_tree(library / "source", {"file0": b"frisk"})
+    assert run("create", "Frisk", str(source))[0] == 0
+    assert run("verify")[:2] == (0, "No problems found\n")
+    model.playlists.set("Route", ["Gone"])
+    model.playlists.commit()
+    code, out, err = run("verify")
+    assert code == 1
+    assert out == "Playlist 'Route' lists missing SAVES: Gone\n"
+    assert "--repair" in err
+    assert run("verify", "--repair")[:2] == (0, (
+        "Playlist 'Route' lists missing SAVES: Gone\n"
+        "Removed 1 missing SAVES from playlists\n"
+    ))
+    assert run("verify")[1] == "No problems found\n"
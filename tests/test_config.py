@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from udsm import config
+from udsm.config import ConfigStore
+
+DEFAULTS = {"theme": "", "launch_timeout": 60, "playlists": {}}
+
+
+@pytest.fixture
+def legacy(monkeypatch: pytest.MonkeyPatch) -> dict[str, Any]:
+    # Stands in for the values kept by pyqt_utils.config
+    values: dict[str, Any] = {}
+    from pyqt_utils import config as legacy_config
+    monkeypatch.setattr(
+        legacy_config, "init_config",
+        lambda defaults: values.update({**defaults, **values}),
+    )
+    monkeypatch.setattr(legacy_config, "get_config_value", values.get)
+    return values
+
+
+def test_writes_are_coalesced(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, legacy: dict[str, Any]
+) -> None:
+    path = tmp_path / "settings.json"
+    store = ConfigStore(delay=60)
+    store.init(DEFAULTS, path)
+    writes: list[Path] = []
+    atomic_write = config.atomic_write
+
+    def count_write(path: Path, data: bytes) -> None:
+        writes.append(path)
+        atomic_write(path, data)
+
+    monkeypatch.setattr(config, "atomic_write", count_write)
+    for i in range(10):
+        store.set("theme", f"theme {i}")
+    store.set("launch_timeout", 30)
+    assert json.loads(path.read_text())["theme"] == ""
+    store.flush()
+    assert writes == [path]
+    assert json.loads(path.read_text()) == {
+        "theme": "theme 9", "launch_timeout": 30, "playlists": {}
+    }
+    # Nothing changed since
+    store.flush()
+    assert writes == [path]
+
+
+def test_flush_keeps_other_keys(
+    tmp_path: Path, legacy: dict[str, Any]
+) -> None:
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"theme": "dark", "launch_timeout": 60}))
+    store = ConfigStore(delay=60)
+    store.init(DEFAULTS, path)
+    assert store.get("theme") == "dark"
+    assert store.get("playlists") == {}
+    # Written by another instance after this one loaded the file
+    path.write_text(json.dumps({"theme": "light", "launch_timeout": 90}))
+    store.set("launch_timeout", 30)
+    store.flush()
+    assert json.loads(path.read_text()) == {
+        "theme": "light", "launch_timeout": 30
+    }
+
+
+def test_migrates_from_pyqt_utils(
+    tmp_path: Path, legacy: dict[str, Any]
+) -> None:
+    legacy.update({"theme": "dark", "launch_timeout": 45})
+    path = tmp_path / "settings.json"
+    store = ConfigStore(delay=60)
+    store.init(DEFAULTS, path)
+    assert json.loads(path.read_text()) == {
+        "theme": "dark", "launch_timeout": 45, "playlists": {}
+    }
+    # Only read once
+    legacy["theme"] = "light"
+    store.init(DEFAULTS, path)
+    assert store.get("theme") == "dark"
+
+
+def test_debounced_write(tmp_path: Path, legacy: dict[str, Any]) -> None:
+    path = tmp_path / "settings.json"
+    store = ConfigStore(delay=0.01)
+    store.init(DEFAULTS, path)
+    store.set("theme", "dark")
+    assert store._timer is not None
+    store._timer.join(5)
+    assert json.loads(path.read_text())["theme"] == "dark"
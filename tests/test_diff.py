@@ -0,0 +1,86 @@
+from pathlib import Path
+from typing import Callable
+
+from udsm import model
+from udsm.diff import Change, SaveDiffer
+from udsm.store import ObjectStore
+
+
+def test_lines_are_named_by_field(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    old = objects.put_bytes(b"Frisk\n1\n0")
+    new = objects.put_bytes(b"Frisk\n20\n0")
+    changes = list(SaveDiffer().diff(
+        (objects, {"file0": old}), (objects, {"file0": new})
+    ))
+    assert changes == [Change("file0", "line 2", "love", "1", "20")]
+
+
+def test_deltarune_fields_count_from_the_end(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    old = objects.put_bytes(b"Kris\n0\n10\n20\n30")
+    new = objects.put_bytes(b"Kris\n0\n11\n20\n31")
+    changes = list(SaveDiffer().diff(
+        (objects, {"filech1_0": old}), (objects, {"filech1_0": new})
+    ))
+    assert [(c.where, c.field) for c in changes] == [
+        ("line 3", "plot"), ("line 5", "time"),
+    ]
+
+
+def test_ini_is_diffed_by_key(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    old = objects.put_bytes(b'[General]\nKills="0"\nName="Frisk"\n')
+    new = objects.put_bytes(b'[General]\nName="Frisk"\nKills="12"\nFun=1\n')
+    changes = list(SaveDiffer().diff(
+        (objects, {"undertale.ini": old}), (objects, {"undertale.ini": new})
+    ))
+    # Keys keep their case
+    assert changes == [
+        Change("undertale.ini", "General.Fun", None, None, "1"),
+        Change("undertale.ini", "General.Kills", None, "0", "12"),
+    ]
+
+
+def test_added_and_removed_files(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    digest = objects.put_bytes(b"data")
+    changes = list(SaveDiffer().diff(
+        (objects, {"file0": digest, "file8": digest}),
+        (objects, {"file0": digest, "file9": digest}),
+    ))
+    assert changes == [
+        Change("file8", "", None, "exists", None),
+        Change("file9", "", None, None, "exists"),
+    ]
+
+
+def test_same_blob_as_ini_and_lines(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    ini = objects.put_bytes(b"[General]\nName=Frisk\n")
+    other = objects.put_bytes(b"[General]\nName=Chara\n")
+    differ = SaveDiffer()
+    assert list(differ.diff(
+        (objects, {"file0": ini}), (objects, {"file0": other})
+    )) == [Change("file0", "line 2", "love", "Name=Frisk", "Name=Chara")]
+    # Parsed again as an ini instead of reusing the lines from the cache
+    assert list(differ.diff(
+        (objects, {"a.ini": ini}), (objects, {"a.ini": other})
+    )) == [Change("a.ini", "General.Name", None, "Frisk", "Chara")]
+
+
+def test_diff_backups(library: Path, write_tree: Callable[..., Path]) -> None:
+    source = write_tree(library / "source", {"file0": b"Frisk\n1"})
+    model.create_undertale_save("Frisk", source)
+    model.backup_save("undertale", source)
+    write_tree(source, {"file0": b"Frisk\n2"})
+    model.backup_save("undertale", source)
+    model.backups.wait_for_prune()
+    results = list(model.diff_backups("undertale", "Frisk"))
+    assert len(results) == 2
+    changes = {
+        snapshot.name: [(c.where, c.old, c.new) for c in diff]
+        for snapshot, diff in results
+    }
+    assert sorted(changes.values()) == [[], [("line 2", "1", "2")]]
+    assert list(model.diff_backups("undertale", "Frisk", lambda: True)) == []
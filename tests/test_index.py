@@ -0,0 +1,63 @@
+import os
+from pathlib import Path
+
+from udsm.index import Game, SaveIndex
+
+
+def make_index(tmp_path: Path) -> SaveIndex:
+    paths: dict[Game, Path] = {
+        "undertale": tmp_path / "undertale_saves",
+        "deltarune": tmp_path / "deltarune_saves",
+    }
+    for path in paths.values():
+        path.mkdir()
+    (paths["undertale"] / "Frisk.json").write_text("{}")
+    (paths["undertale"] / "Asriel.json").write_text("{}")
+    (paths["deltarune"] / "Kris.json").write_text("{}")
+    # Legacy SAVE folders and other files aren't SAVES
+    (paths["deltarune"] / "Susie").mkdir()
+    (paths["deltarune"] / "notes.txt").write_text("")
+    return SaveIndex(paths)
+
+
+def test_scan(tmp_path: Path) -> None:
+    index = make_index(tmp_path)
+    assert index.saves("undertale") == ["Asriel", "Frisk"]
+    assert index.saves("deltarune") == ["Kris"]
+    assert index.game_of("Kris") == "deltarune"
+    assert index.game_of("Susie") is None
+    assert index.name_taken("frisk")
+    assert not index.name_taken("Chara")
+
+
+def test_mutators(tmp_path: Path) -> None:
+    index = make_index(tmp_path)
+    index.add("undertale", "Chara")
+    assert index.saves("undertale") == ["Asriel", "Chara", "Frisk"]
+    index.rename("undertale", "Chara", "Toriel")
+    assert index.saves("undertale") == ["Asriel", "Frisk", "Toriel"]
+    assert not index.name_taken("chara")
+    index.remove("deltarune", "Kris")
+    assert index.saves("deltarune") == []
+    assert index.game_of("Kris") is None
+    # Removing twice is harmless
+    index.remove("deltarune", "Kris")
+
+
+def test_saves_returns_a_copy(tmp_path: Path) -> None:
+    index = make_index(tmp_path)
+    index.saves("undertale").clear()
+    assert index.saves("undertale") == ["Asriel", "Frisk"]
+
+
+def test_invalidate_if_changed(tmp_path: Path) -> None:
+    index = make_index(tmp_path)
+    index.saves("undertale")
+    assert not index.invalidate_if_changed()
+    path = tmp_path / "undertale_saves"
+    (path / "Chara.json").write_text("{}")
+    # Coarse file system timestamps could hide the change otherwise
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert index.invalidate_if_changed()
+    assert index.saves("undertale") == ["Asriel", "Chara", "Frisk"]
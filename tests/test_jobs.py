@@ -0,0 +1,81 @@
+import time
+from threading import Event
+
+import pytest
+
+from udsm.jobs import Job, JobCancelled, JobRunner
+
+
+def test_result_and_progress() -> None:
+    runner = JobRunner()
+    reports: list[tuple[int, int]] = []
+    start = Event()
+
+    def work(job: Job) -> str:
+        start.wait(5)
+        job.report(1, 2)
+        job.report(2, 2)
+        return "done"
+
+    job = runner.submit("Working", work)
+    job.on_progress(lambda done, total: reports.append((done, total)))
+    start.set()
+    assert job.future.result(5) == "done"
+    assert reports == [(1, 2), (2, 2)]
+    runner.shutdown()
+
+
+def test_exception_is_kept() -> None:
+    runner = JobRunner()
+
+    def fail(job: Job) -> None:
+        raise OSError("disk full")
+
+    job = runner.submit("Failing", fail)
+    with pytest.raises(OSError, match="disk full"):
+        job.future.result(5)
+    runner.shutdown()
+
+
+def test_same_key_runs_serially() -> None:
+    runner = JobRunner()
+    running = 0
+    overlapped = False
+
+    def work(job: Job) -> None:
+        nonlocal running, overlapped
+        running += 1
+        overlapped |= running > 1
+        time.sleep(0.05)
+        running -= 1
+
+    submitted = [
+        runner.submit("Working", work, key="undertale") for _ in range(4)
+    ]
+    for job in submitted:
+        job.future.result(5)
+    assert not overlapped
+    runner.shutdown()
+
+
+def test_cancel_while_waiting_for_key() -> None:
+    runner = JobRunner()
+    release = Event()
+    first = runner.submit("Blocking", lambda job: release.wait(5), key="a")
+    second = runner.submit("Waiting", lambda job: None, key="a")
+    second.cancel()
+    release.set()
+    assert first.future.result(5)
+    assert second.future.cancelled() or isinstance(
+        second.future.exception(5), JobCancelled
+    )
+    runner.shutdown()
+
+
+def test_check_cancelled() -> None:
+    job = Job("Working")
+    job.check_cancelled()
+    job.cancel()
+    assert job.cancelled
+    with pytest.raises(JobCancelled):
+        job.check_cancelled()
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+
+from udsm import config, launch
+from udsm.config import DEFAULT_CONFIG, ConfigStore
+from udsm.launch import Launch, launch_timeout
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> ConfigStore:
+    path = tmp_path / "settings.json"
+    path.write_text("{}")
+    store = ConfigStore(delay=60)
+    store.init(DEFAULT_CONFIG, path)
+    monkeypatch.setattr(config, "store", store)
+    return store
+
+
+def test_timeout_adapts(store: ConfigStore) -> None:
+    store.set("launch_timeout", 60)
+    assert launch_timeout("undertale") == 60
+    store.set("undertale_launch_latencies", [2.0, 4.0])
+    assert launch_timeout("undertale") == 15
+    store.set("undertale_launch_latencies", [8.0])
+    assert launch_timeout("undertale") == 24
+    store.set("undertale_launch_latencies", [30.0])
+    assert launch_timeout("undertale") == 60
+    assert launch_timeout("deltarune") == 60
+
+
+def test_states(
+    store: ConfigStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = 100.0
+    monkeypatch.setattr(launch, "monotonic", lambda: now)
+    game = Launch("deltarune", timeout=10)
+    assert game.update(False) == "launched"
+    now = 102.5
+    assert game.update(True) == "running"
+    assert game.latency == 2.5
+    assert store.get("deltarune_launch_latencies") == [2.5]
+    assert game.update(True) == "running"
+    assert not game.finished
+    assert game.update(False) == "exited"
+    assert game.finished
+
+
+def test_timed_out(
+    store: ConfigStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    now = 100.0
+    monkeypatch.setattr(launch, "monotonic", lambda: now)
+    game = Launch("undertale", timeout=10)
+    now = 110.0
+    assert game.update(False) == "timed_out"
+    assert game.update(True) == "timed_out"
+    assert store.get("undertale_launch_latencies") == []
+
+
+def test_latencies_are_capped(store: ConfigStore) -> None:
+    for i in range(15):
+        launch.record_latency("undertale", i)
+    assert store.get("undertale_launch_latencies") == list(range(5, 15))
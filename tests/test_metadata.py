@@ -0,0 +1,70 @@
+import sqlite3
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from udsm import model
+from udsm.metadata import MetadataCache
+from udsm.saveformat import SaveInfo
+
+INFO = SaveInfo(name="Frisk", love=1, room=12, playtime=60.0)
+
+
+def test_put_get(tmp_path: Path) -> None:
+    cache = MetadataCache(tmp_path / "metadata.sqlite3")
+    cache.put("a.json", 10, 20, INFO)
+    assert cache.get("a.json", 10, 20) == INFO
+    # Changed files miss
+    assert cache.get("a.json", 11, 20) is None
+    assert cache.get("a.json", 10, 21) is None
+    cache.rename("a.json", "b.json")
+    assert cache.get("a.json", 10, 20) is None
+    assert cache.paths() == {"b.json"}
+    cache.close()
+
+    reopened = MetadataCache(tmp_path / "metadata.sqlite3")
+    assert reopened.get("b.json", 10, 20) == INFO
+    reopened.delete("b.json")
+    assert reopened.paths() == set()
+    reopened.close()
+
+
+def test_old_schema_is_dropped(tmp_path: Path) -> None:
+    path = tmp_path / "metadata.sqlite3"
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE saves (path TEXT PRIMARY KEY, name TEXT)")
+    db.execute("INSERT INTO saves VALUES ('a.json', 'Frisk')")
+    db.commit()
+    db.close()
+    cache = MetadataCache(path)
+    assert cache.paths() == set()
+    cache.put("a.json", 1, 2, INFO)
+    assert cache.get("a.json", 1, 2) == INFO
+    cache.close()
+
+
+def test_model_reads_through_the_cache(
+    library: Path,
+    write_tree: Callable[..., Path],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    source = write_tree(library / "source", {"filech1_0": b"Kris\n1\n2\n3\n"})
+    model.create_deltarune_save("Kris", source)
+    model.create_deltarune_save("Susie", source)
+    assert model.cache_save_infos() == 2
+    assert model.cache_save_infos() == 0
+
+    def parse(game: str, name: str) -> SaveInfo:
+        raise AssertionError(f"Parsed '{name}' again")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(model, "_parse_save_info", parse)
+        assert model.get_save_info("deltarune", "Kris").name == "Kris"
+
+    # Deleting and renaming keep the cache in sync
+    model.delete_deltarune_save("Susie")
+    model.rename_deltarune_save("Kris", "Ralsei")
+    assert model.metadata.paths() == {
+        str(model._manifest_path("deltarune", "Ralsei"))
+    }
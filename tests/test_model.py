@@ -0,0 +1,167 @@
+from pathlib import Path
+from typing import Callable
+
+from udsm import model
+
+
+def test_create_delete_rename(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    source = write_tree(library / "source", {"file0": b"zero"})
+    model.create_undertale_save("Frisk", source)
+    model.create_deltarune_save("Kris", source)
+    assert model.get_undertale_saves() == ["Frisk"]
+    assert model.get_deltarune_saves() == ["Kris"]
+    digest = model.read_manifest(model._manifest_path("undertale", "Frisk"))[
+        "file0"
+    ]
+    assert model._objects.refcount(digest) == 2
+
+    # Names are unique across both games
+    model.create_deltarune_save("frisk", source)
+    assert model.get_deltarune_saves() == ["Kris"]
+
+    model.rename_undertale_save("Frisk", "Chara")
+    assert model.get_undertale_saves() == ["Chara"]
+    model.copy_undertale_save("Chara", library / "undertale")
+    assert (library / "undertale" / "file0").read_bytes() == b"zero"
+
+    model.delete_undertale_save("Chara")
+    model.delete_deltarune_save("Kris")
+    assert model.get_undertale_saves() == []
+    assert not model._objects.has(digest)
+
+
+def test_migration_keeps_clashing_names(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    write_tree(model.SAVES_PATHS["undertale"] / "King", {"file0": b"ut"})
+    write_tree(model.SAVES_PATHS["deltarune"] / "King", {"filech1_0": b"dr"})
+    model.index.invalidate()
+    model.migrate_legacy_saves()
+    assert model.get_undertale_saves() == ["King"]
+    assert model.get_deltarune_saves() == ["King (deltarune)"]
+    assert not any(path.is_dir() for path in library.glob("*_saves/*"))
+    model.copy_deltarune_save("King (deltarune)", library / "deltarune")
+    assert (library / "deltarune" / "filech1_0").read_bytes() == b"dr"
+
+
+def test_migration_resumes(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    legacy = write_tree(
+        model.SAVES_PATHS["undertale"] / "Frisk", {"file0": b"zero"}
+    )
+    model.create_undertale_save("Frisk", legacy)
+    # Interrupted before the folder was removed
+    model.migrate_legacy_saves()
+    assert model.get_undertale_saves() == ["Frisk"]
+    assert not legacy.exists()
+
+
+def test_bulk_import(library: Path, write_tree: Callable[..., Path]) -> None:
+    drop = library / "drop"
+    write_tree(drop / "Frisk", {"file0": b"frisk", "undertale.ini": b""})
+    write_tree(drop / "Kris", {"filech1_0": b"kris"})
+    write_tree(drop / "Noelle", {"filech1_0": b"kris"})
+    write_tree(drop / "Notes", {"readme.txt": b""})
+    saves = model.find_saves(drop)
+    assert [(game, name) for game, name, _ in saves] == [
+        ("undertale", "Frisk"), ("deltarune", "Kris"),
+        ("deltarune", "Noelle"), (None, "Notes"),
+    ]
+    saves.append(("undertale", "kris", drop / "Frisk"))
+    # One worker imports in order, so the clashing name is the last one
+    results = model.bulk_import(saves, max_workers=1)
+    assert [result.error for result in results] == [
+        None, None, None, "Not a SAVE folder",
+        "A SAVE with this name already exists",
+    ]
+    assert model.get_deltarune_saves() == ["Kris", "Noelle"]
+    # Identical files are stored once and referenced by both SAVES
+    digest = model.read_manifest(
+        model._manifest_path("deltarune", "Noelle")
+    )["filech1_0"]
+    assert model._objects.refcount(digest) == 2
+    assert not list(model._objects.root.glob("??/.*"))
+
+
+def test_bulk_import_cancelled(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    source = write_tree(library / "Frisk", {"file0": b"frisk"})
+    [result] = model.bulk_import(
+        [("undertale", "Frisk", source)], cancelled=lambda: True
+    )
+    assert result.error == "Cancelled"
+    assert model.get_undertale_saves() == []
+
+
+def test_prepared_save(library: Path, write_tree: Callable[..., Path]) -> None:
+    model.create_undertale_save(
+        "Frisk", write_tree(library / "frisk", {"file0": b"frisk"})
+    )
+    save_path = write_tree(library / "UNDERTALE", {"file0": b"old"})
+    prepared = model.prepare_save("undertale", "Frisk", save_path)
+    # Staged next to the SAVE folder, which is left alone until applied
+    assert (save_path / "file0").read_bytes() == b"old"
+    model.apply_prepared(prepared)
+    assert (save_path / "file0").read_bytes() == b"frisk"
+    assert not prepared.staged.exists()
+    assert [s.save for s in model.list_backups("undertale")] == ["Frisk"]
+
+
+def test_prepared_save_changed(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    model.create_undertale_save(
+        "Frisk", write_tree(library / "frisk", {"file0": b"frisk"})
+    )
+    save_path = library / "UNDERTALE"
+    prepared = model.prepare_save("undertale", "Frisk", save_path)
+    model.delete_undertale_save("Frisk")
+    model.create_undertale_save(
+        "Frisk", write_tree(library / "frisk", {"file0": b"changed"})
+    )
+    # The SAVE is copied again instead of applying the stale files
+    model.apply_prepared(prepared)
+    assert (save_path / "file0").read_bytes() == b"changed"
+
+    prepared = model.prepare_save("undertale", "Frisk", save_path)
+    model.discard_prepared(prepared)
+    assert not prepared.staged.exists()
+
+
+def test_restore_backup(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    game_saves = write_tree(library / "game", {"file0": b"Frisk\n1"})
+    first = model.backup_save("undertale", game_saves)
+    write_tree(game_saves, {"file0": b"Frisk\n2", "file9": b"new"})
+    model.backup_save("undertale", game_saves)
+    model.backups.wait_for_prune()
+    assert first is not None
+    model.restore_backup(first.name, game_saves)
+    model.backups.wait_for_prune()
+    assert sorted(path.name for path in game_saves.iterdir()) == ["file0"]
+    assert (game_saves / "file0").read_bytes() == b"Frisk\n1"
+    # The replaced contents are backed up, so the restore can be undone
+    latest = model.backups.latest(model.BACKUP_PREFIXES["undertale"])
+    assert latest is not None and latest.name != first.name
+    model.restore_backup(latest.name, game_saves)
+    assert (game_saves / "file9").read_bytes() == b"new"
+
+
+def test_restore_backs_up_changes(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    game_saves = write_tree(library / "game", {"file0": b"Frisk\n1"})
+    first = model.backup_save("undertale", game_saves)
+    write_tree(game_saves, {"file0": b"Frisk\n2"})
+    assert first is not None
+    model.restore_backup(first.name, game_saves)
+    model.backups.wait_for_prune()
+    latest = model.backups.latest(model.BACKUP_PREFIXES["undertale"])
+    assert latest is not None and latest.save == "restore"
+    model.extract_backup(latest.name, library / "undo")
+    assert (library / "undo" / "file0").read_bytes() == b"Frisk\n2"
@@ -0,0 +1,103 @@
+import json
+import zipfile
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from udsm import model
+from udsm.packs import PACK_MANIFEST, blob_name
+from udsm.store import hash_bytes
+
+
+def _export(library: Path, write_tree: Callable[..., Path]) -> Path:
+    frisk = write_tree(library / "frisk", {"file0": b"frisk", "a/b": b"ab"})
+    kris = write_tree(library / "kris", {"filech1_0": b"kris", "a/b": b"ab"})
+    model.create_undertale_save("Frisk", frisk)
+    model.create_deltarune_save("Kris", kris)
+    model.playlists.set("Route", ["Kris"])
+    model.playlists.commit()
+    path = library / "saves.udsmpack"
+    assert model.export_pack(path, [("undertale", "Frisk")], {
+        "Route": model.playlists.get("Route")
+    })
+    return path
+
+
+def test_round_trip(library: Path, write_tree: Callable[..., Path]) -> None:
+    path = _export(library, write_tree)
+    with zipfile.ZipFile(path) as zf:
+        # Files shared between SAVES are packed once
+        assert len([n for n in zf.namelist() if n != PACK_MANIFEST]) == 3
+    # Nothing stays referenced by the export
+    assert model._objects.refcount(hash_bytes(b"ab")) == 2
+
+    model.delete_undertale_save("Frisk")
+    model.delete_deltarune_save("Kris")
+    result = model.import_pack(path)
+    assert [(s.game, s.name, s.error) for s in result.saves] == [
+        ("undertale", "Frisk", None), ("deltarune", "Kris", None),
+    ]
+    assert result.playlists == {"Route": ["Kris"]}
+    model.copy_deltarune_save("Kris", library / "out")
+    assert (library / "out" / "a" / "b").read_bytes() == b"ab"
+    assert model._objects.refcount(hash_bytes(b"ab")) == 2
+
+
+def test_reimport_and_name_clash(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    path = _export(library, write_tree)
+    model.delete_undertale_save("Frisk")
+    other = write_tree(library / "other", {"file0": b"other"})
+    model.create_undertale_save("Frisk", other)
+    result = model.import_pack(path)
+    # Kris is the same SAVE, importing it again is fine
+    assert [s.error for s in result.saves] == [
+        "A SAVE with this name already exists", None,
+    ]
+    assert model._objects.refcount(hash_bytes(b"kris")) == 1
+    assert not model._objects.has(hash_bytes(b"frisk"))
+    assert model.import_playlists(result.playlists) == ["Route"]
+
+
+def test_corrupt_blob(library: Path, write_tree: Callable[..., Path]) -> None:
+    path = _export(library, write_tree)
+    model.delete_undertale_save("Frisk")
+    model.delete_deltarune_save("Kris")
+    corrupt = library / "corrupt.udsmpack"
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(corrupt, "w") as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename == blob_name(hash_bytes(b"frisk")):
+                data = b"chara"
+            dst.writestr(info, data)
+    result = model.import_pack(corrupt)
+    assert [s.error for s in result.saves] == [
+        "Corrupt or missing file 'file0'", None,
+    ]
+    assert model.get_undertale_saves() == []
+    assert model.get_deltarune_saves() == ["Kris"]
+    # Blobs only used by the failed SAVE are dropped again
+    assert not model._objects.has(hash_bytes(b"chara"))
+    assert model._objects.refcount(hash_bytes(b"ab")) == 1
+
+
+@pytest.mark.parametrize("manifest", [
+    {"version": 1, "saves": [{"game": "undertale", "name": "Frisk"}]},
+    {"version": 1, "saves": [
+        {"game": "undertale", "name": "Frisk", "files": {"../x": "0" * 64}},
+    ]},
+    {"version": 1, "saves": [], "playlists": {"Route": "Kris"}},
+    {"version": 99, "saves": []},
+])
+def test_invalid_manifest(library: Path, manifest: object) -> None:
+    path = library / "bad.udsmpack"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(PACK_MANIFEST, json.dumps(manifest))
+    with pytest.raises(ValueError):
+        model.import_pack(path)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("other.json", "{}")
+    with pytest.raises(ValueError, match="Not a SAVE pack"):
+        model.import_pack(path)
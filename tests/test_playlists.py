@@ -0,0 +1,71 @@
+import json
+from pathlib import Path
+
+from udsm.playlists import PlaylistStore
+
+
+def test_commit_and_reload(tmp_path: Path) -> None:
+    store = PlaylistStore(tmp_path)
+    store.set("Pacifist", ["Frisk", "Toriel"])
+    store.set("Chapter 2", ["Kris"])
+    store.get("Pacifist").append("Papyrus")
+    store.changed("Pacifist")
+    store.commit()
+
+    reopened = PlaylistStore(tmp_path)
+    assert reopened.names() == ["Pacifist", "Chapter 2"]
+    assert "Pacifist" in reopened and len(reopened) == 2
+    assert reopened.get("Pacifist") == ["Frisk", "Toriel", "Papyrus"]
+
+
+def test_rename_and_delete(tmp_path: Path) -> None:
+    store = PlaylistStore(tmp_path)
+    store.set("Pacifist", ["Frisk"])
+    store.set("Genocide", ["Chara"])
+    store.commit()
+    store.rename("Pacifist", "True Pacifist")
+    store.delete("Genocide")
+    store.commit()
+
+    reopened = PlaylistStore(tmp_path)
+    assert reopened.names() == ["True Pacifist"]
+    assert reopened.get("True Pacifist") == ["Frisk"]
+    # The deleted playlist's file is gone, only the index and one are left
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_rollback(tmp_path: Path) -> None:
+    store = PlaylistStore(tmp_path)
+    store.set("Pacifist", ["Frisk"])
+    store.commit()
+    store.set("Neutral", [])
+    store.get("Pacifist").clear()
+    store.changed("Pacifist")
+    store.rollback()
+    assert store.names() == ["Pacifist"]
+    assert store.get("Pacifist") == ["Frisk"]
+
+
+def test_broken_index_is_rebuilt(tmp_path: Path) -> None:
+    store = PlaylistStore(tmp_path)
+    store.set("Pacifist", ["Frisk"])
+    store.commit()
+    store.index_path.write_text("{")
+    reopened = PlaylistStore(tmp_path)
+    assert reopened.names() == ["Pacifist"]
+    reopened.commit()
+    assert json.loads(store.index_path.read_text())["playlists"][0][
+        "name"
+    ] == "Pacifist"
+
+
+def test_migrate(tmp_path: Path) -> None:
+    store = PlaylistStore(tmp_path)
+    store.set("Pacifist", ["Frisk"])
+    store.commit()
+    assert store.migrate({"Pacifist": ["Other"], "Genocide": ["Chara"]})
+    assert not store.migrate({"Pacifist": ["Other"]})
+    reopened = PlaylistStore(tmp_path)
+    # Existing playlists win
+    assert reopened.get("Pacifist") == ["Frisk"]
+    assert reopened.get("Genocide") == ["Chara"]
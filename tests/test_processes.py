@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+import time
+from threading import Event
+
+import psutil
+
+from udsm.processes import ProcessScanner, wait_for_exit
+
+
+def test_wait_for_exit() -> None:
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(0.3)"]
+    )
+    start = time.perf_counter()
+    wait_for_exit(proc.pid, Event(), interval=5)
+    # Returns on exit, not after the poll interval
+    assert time.perf_counter() - start < 4
+    proc.wait()
+
+
+def test_wait_for_exit_stops() -> None:
+    stop = Event()
+    stop.set()
+    wait_for_exit(os.getpid(), stop, interval=0.01)
+
+
+def test_wait_for_missing_process() -> None:
+    proc = subprocess.Popen([sys.executable, "-c", ""])
+    proc.wait()
+    wait_for_exit(proc.pid, Event(), interval=5)
+
+
+def test_scanner_caches_pids() -> None:
+    name = psutil.Process(os.getpid()).name()
+    scanner = ProcessScanner()
+    assert os.getpid() in scanner.scan([name])[name]
+    assert scanner.stats.full_scans == 1
+    # Found in the cache without iterating every process again
+    assert os.getpid() in scanner.scan([name, ""])[name]
+    assert scanner.stats.full_scans == 1
+    assert scanner.stats.hit_rate == 1.0
+
+
+def test_scanner_drops_exited_pids() -> None:
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(5)"]
+    )
+    try:
+        name = psutil.Process(proc.pid).name()
+        scanner = ProcessScanner()
+        assert proc.pid in scanner.scan([name])[name]
+    finally:
+        proc.kill()
+        proc.wait()
+    assert proc.pid not in scanner.scan([name]).get(name, [])
+    assert proc.pid not in scanner._cache
+
+
+def test_scanner_finds_processes_started_later() -> None:
+    name = psutil.Process(os.getpid()).name()
+    scanner = ProcessScanner()
+    assert scanner.scan([name])
+    proc = subprocess.Popen(["sleep", "5"])
+    try:
+        other = psutil.Process(proc.pid).name()
+        # One of them is enough, the cache answers
+        assert scanner.scan([name, other], any_name=True).keys() == {name}
+        assert scanner.stats.full_scans == 1
+        found = scanner.scan([name, other])
+        assert proc.pid in found[other] and os.getpid() in found[name]
+        assert scanner.stats.full_scans == 2
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def test_scan_without_names() -> None:
+    scanner = ProcessScanner()
+    assert scanner.scan(["", ""]) == {}
+    assert scanner.stats.full_scans == 0
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+from udsm.saveformat import LineFile, SaveInfo, read_info
+
+UNDERTALE_FILE0 = "\n".join(
+    ["Frisk", "19"] + ["0"] * 545 + ["236", "81000"]
+) + "\n"
+
+
+def test_line_file(tmp_path: Path) -> None:
+    path = tmp_path / "file"
+    path.write_bytes(b"one\ntwo\n\nfour\n")
+    with LineFile(path) as lines:
+        assert lines.line(1) == "one"
+        assert lines.line(4) == "four"
+        assert lines.line(-1) == "four"
+        assert lines.line(-3) == "two"
+        assert lines.get(5) is None
+        assert lines.get(-5) is None
+    path.write_bytes(b"")
+    with LineFile(path) as lines:
+        assert not lines.get(1)
+        assert lines.get(2) is None
+
+
+def test_undertale(tmp_path: Path) -> None:
+    (tmp_path / "file0").write_text(UNDERTALE_FILE0)
+    (tmp_path / "undertale.ini").write_text(
+        '[General]\nName="Chara"\nKills="20"\n'
+    )
+    info = read_info("undertale", {
+        "file0": tmp_path / "file0",
+        "undertale.ini": tmp_path / "undertale.ini",
+    })
+    # file0 wins over the ini, kills are only in the ini
+    assert info == SaveInfo(
+        name="Frisk", love=19, room=236, kills=20, playtime=2700.0
+    )
+    assert info.summary() == "Frisk, LV 19, Room 236, 20 kills, 0:45:00"
+
+
+def test_undertale_ini_only(tmp_path: Path) -> None:
+    (tmp_path / "undertale.ini").write_text(
+        '[General]\nName="Chara"\nLove="20"\n'
+    )
+    info = read_info(
+        "undertale", {"undertale.ini": tmp_path / "undertale.ini"}
+    )
+    assert (info.name, info.love) == ("Chara", 20)
+
+
+def test_deltarune_picks_furthest_chapter(tmp_path: Path) -> None:
+    (tmp_path / "filech1_0").write_text("Kris\n0\n0\n1\n")
+    (tmp_path / "filech2_1").write_text("Noelle\n0\n0\n1\n")
+    (tmp_path / "filech2_0").write_text("Susie\n0\n150\n34\n1.60456e+06\n")
+    info = read_info("deltarune", {
+        path.name: path for path in tmp_path.iterdir()
+    })
+    assert info == SaveInfo(
+        name="Susie", room=34, playtime=1604560 / 30, chapter=2
+    )
+
+
+def test_unreadable(tmp_path: Path) -> None:
+    assert read_info("deltarune", {}) == SaveInfo()
+    assert read_info("undertale", {"file0": tmp_path / "missing"}) == (
+        SaveInfo()
+    )
+    assert SaveInfo().summary() == ""
@@ -0,0 +1,66 @@
+from PyQt6.QtCore import QModelIndex, Qt
+
+from udsm.savelist import RESET_THRESHOLD, PlaylistModel, SaveListModel
+
+
+def _names(model: SaveListModel) -> list[str]:
+    return [
+        model.data(model.index(row)) for row in range(model.rowCount())
+    ]
+
+
+def test_set_names_updates_rows() -> None:
+    model = SaveListModel()
+    inserted: list[int] = []
+    model.rowsInserted.connect(
+        lambda parent, first, last: inserted.append(first)
+    )
+    model.set_names(["Chara", "Frisk"])
+    model.set_names(["Asriel", "Frisk", "Sans"])
+    assert _names(model) == ["Asriel", "Frisk", "Sans"]
+    # Row-wise updates instead of a reset
+    assert len(inserted) == 4
+    assert model.row("Sans") == 2 and model.row("Chara") == -1
+
+
+def test_many_changes_reset() -> None:
+    model = SaveListModel()
+    resets: list[None] = []
+    model.modelReset.connect(lambda: resets.append(None))
+    names = sorted(f"Save {i:04}" for i in range(RESET_THRESHOLD + 1))
+    model.set_names(names)
+    assert len(resets) == 1 and model.rowCount() == len(names)
+
+
+def test_rename_and_tooltip() -> None:
+    renamed: list[tuple[str, str]] = []
+
+    def rename(name: str, new_name: str) -> bool:
+        renamed.append((name, new_name))
+        return new_name != "Taken"
+
+    model = SaveListModel(rename, lambda name: f"{name} at LOVE 1")
+    model.set_names(["Chara", "Frisk"])
+    index = model.index(1)
+    assert model.flags(index) & Qt.ItemFlag.ItemIsEditable
+    assert model.data(index, Qt.ItemDataRole.ToolTipRole) == (
+        "Frisk at LOVE 1"
+    )
+    assert not model.setData(index, "Taken")
+    assert not model.setData(index, " Frisk ")
+    assert model.setData(index, " Asriel ")
+    assert renamed == [("Frisk", "Taken"), ("Frisk", "Asriel")]
+    assert _names(model) == ["Asriel", "Chara"]
+    assert model.data(QModelIndex()) is None
+
+
+def test_playlist_move() -> None:
+    model = PlaylistModel()
+    model.set_entries(["a", "b", "c", "d"])
+    assert model.move(0, 1)
+    assert model.move(3, 0)
+    assert not model.move(0, 4)
+    assert model.entries == ["d", "b", "a", "c"]
+    model.remove(1)
+    model.append("e")
+    assert model.entries == ["d", "a", "c", "e"]
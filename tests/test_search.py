@@ -0,0 +1,79 @@
+from udsm.saveformat import SaveInfo
+from udsm.search import SearchIndex
+
+
+def make_index() -> SearchIndex:
+    index = SearchIndex()
+    index.add(
+        "undertale", "Toriel Fight", SaveInfo(name="Frisk", love=1, room=31),
+        "Neutral",
+    )
+    index.add(
+        "undertale", "Sans", SaveInfo(name="Chara", love=19, room=236),
+        "Genocide",
+    )
+    index.add("deltarune", "Kris Chapter 2", SaveInfo(name="Kris", chapter=2))
+    return index
+
+
+def search(index: SearchIndex, query: str) -> set[tuple[str, str]]:
+    results = index.search(query)
+    assert results is not None
+    return set(results)
+
+
+def test_words_and_fields() -> None:
+    index = make_index()
+    assert index.search("  ") is None
+    assert search(index, "tor") == {("undertale", "Toriel Fight")}
+    assert search(index, "geno") == {("undertale", "Sans")}
+    assert search(index, "name:chara") == {("undertale", "Sans")}
+    assert search(index, "char:fr") == {("undertale", "Toriel Fight")}
+    assert search(index, "game:deltarune") == {("deltarune", "Kris Chapter 2")}
+    # Field names only match with a field
+    assert search(index, "game") == set()
+    assert search(index, '"toriel fight"') == {("undertale", "Toriel Fight")}
+    assert search(index, "toriel sans") == set()
+
+
+def test_numbers() -> None:
+    index = make_index()
+    assert search(index, "room:31") == {("undertale", "Toriel Fight")}
+    assert search(index, "lv:>1") == {("undertale", "Sans")}
+    assert search(index, "love:<=19") == {
+        ("undertale", "Toriel Fight"), ("undertale", "Sans")
+    }
+    assert search(index, "ch:>=2 kris") == {("deltarune", "Kris Chapter 2")}
+    assert search(index, "room:abc") == set()
+
+
+def test_results() -> None:
+    index = make_index()
+    results = index.search("sans")
+    assert results is not None
+    assert ("undertale", "Sans") in results
+    assert ("deltarune", "Sans") not in results
+    assert "Sans" not in results
+    assert len(results) == 1
+
+
+def test_results_are_snapshots() -> None:
+    index = make_index()
+    results = index.search("sans")
+    names = index.names("undertale")
+    index.add("undertale", "Sans Again", SaveInfo())
+    assert results is not None and len(results) == 1
+    assert names == {"Toriel Fight", "Sans"}
+
+
+def test_remove_and_replace() -> None:
+    index = make_index()
+    index.remove("undertale", "Sans")
+    assert search(index, "geno") == set()
+    assert search(index, "love:>1") == set()
+    assert len(index) == 2
+    index.add("deltarune", "Kris Chapter 2", SaveInfo(name="Susie"))
+    assert search(index, "name:kris") == set()
+    assert search(index, "susie") == {("deltarune", "Kris Chapter 2")}
+    # Removing something that isn't indexed is harmless
+    index.remove("undertale", "Sans")
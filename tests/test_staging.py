@@ -0,0 +1,44 @@
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from udsm.staging import stage_tree, staging_path, swap_in
+from udsm.store import ObjectStore
+
+
+def test_stage_and_swap(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    manifest = objects.put_tree(
+        write_tree(tmp_path / "source", {"file0": b"new", "sub/a": b"a"})
+    )
+    target = write_tree(tmp_path / "undertale", {"file0": b"old"})
+    staged = stage_tree(objects, manifest, target)
+    assert staged == staging_path(target)
+    assert (staged / "sub" / "a").read_bytes() == b"a"
+
+    old = swap_in(staged, target)
+    assert (target / "file0").read_bytes() == b"new"
+    assert old is not None and (old / "file0").read_bytes() == b"old"
+    # The game writing to the SAVE must never change the stored blob
+    (target / "file0").write_bytes(b"changed")
+    assert objects.read(manifest["file0"]) == b"new"
+
+
+def test_swap_into_missing_target(
+    tmp_path: Path, write_tree: Callable[..., Path]
+) -> None:
+    staged = write_tree(tmp_path / "staged", {"file0": b"zero"})
+    assert swap_in(staged, tmp_path / "deltarune") is None
+    assert (tmp_path / "deltarune" / "file0").read_bytes() == b"zero"
+    assert not staged.exists()
+
+
+def test_failed_stage_is_removed(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    target = tmp_path / "undertale"
+    with pytest.raises(FileNotFoundError):
+        stage_tree(objects, {"file0": "0" * 64}, target)
+    assert not staging_path(target).exists()
@@ -0,0 +1,27 @@
+import pytest
+
+from udsm import startup
+from udsm.startup import StartupTrace
+
+
+def test_phases_are_recorded_in_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = 10.0
+    logged: list[str] = []
+    monkeypatch.setattr(startup, "perf_counter", lambda: now)
+    monkeypatch.setattr(
+        startup, "log", lambda message, level: logged.append(message)
+    )
+    trace = StartupTrace()
+    now = 10.5
+    trace.mark("loading config")
+    now = 12.0
+    trace.mark("creating main window")
+    trace.finish()
+    assert trace.phases == [
+        ("loading config", 0.5), ("creating main window", 1.5),
+    ]
+    assert logged == [
+        "Startup: loading config took 500.0 ms",
+        "Startup: creating main window took 1500.0 ms",
+        "Startup: done after 2000.0 ms",
+    ]
@@ -0,0 +1,130 @@
+from pathlib import Path
+
+from udsm.store import (MAX_DELTA_DEPTH, ObjectStore, apply_delta, hash_bytes,
+                        make_delta, read_manifest, write_manifest)
+
+
+def test_put_deduplicates(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    (tmp_path / "a").write_bytes(b"same")
+    (tmp_path / "b").write_bytes(b"same")
+    digest = objects.put_file(tmp_path / "a")
+    assert objects.put_file(tmp_path / "b") == digest == hash_bytes(b"same")
+    assert objects.put_bytes(b"same") == digest
+    assert objects.read(digest) == b"same"
+    assert len(list(objects.root.glob("??/*"))) == 1
+
+
+def test_decref_removes_unused_blobs(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    digest = objects.put_bytes(b"data")
+    objects.incref([digest, digest])
+    assert objects.refcount(digest) == 2
+    assert objects.decref([digest]) == 0
+    assert objects.has(digest)
+    assert objects.decref([digest]) == len(b"data")
+    assert not objects.has(digest)
+    assert objects.refcount(digest) == 0
+
+
+def test_refcounts_persist(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    digests = [objects.put_bytes(bytes([i])) for i in range(3)]
+    with objects.batch():
+        objects.incref(digests)
+        objects.incref(digests[:1])
+    objects.close()
+    reopened = ObjectStore(tmp_path / "objects")
+    assert [reopened.refcount(digest) for digest in digests] == [2, 1, 1]
+
+
+def test_batch_commits_on_exit(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    digest = objects.put_bytes(b"data")
+    with objects.batch():
+        objects.incref([digest])
+        # Not visible to other connections until the batch ends
+        assert ObjectStore(objects.root).refcount(digest) == 0
+    assert ObjectStore(objects.root).refcount(digest) == 1
+
+
+def test_set_refs(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    a, b = objects.put_bytes(b"a"), objects.put_bytes(b"b")
+    objects.incref([a, a])
+    assert objects.count_wrong_refs({a: 1, b: 1}) == 2
+    assert objects.set_refs({a: 1, b: 1}) == 2
+    assert (objects.refcount(a), objects.refcount(b)) == (1, 1)
+    assert objects.count_wrong_refs({a: 1, b: 1}) == 0
+
+
+def test_unreferenced(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    used, unused = objects.put_bytes(b"used"), objects.put_bytes(b"unused")
+    objects.incref([used])
+    assert objects.unreferenced() == [objects.object_path(unused)]
+    assert objects.unreferenced(grace=3600) == []
+    assert objects.remove_unreferenced() == 1
+    assert objects.has(used) and not objects.has(unused)
+
+
+def test_tree_round_trip(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects")
+    source = tmp_path / "source"
+    (source / "sub").mkdir(parents=True)
+    (source / "file0").write_bytes(b"zero")
+    (source / "sub" / "file1").write_bytes(b"one")
+    manifest = objects.put_tree(source)
+    assert sorted(manifest) == ["file0", "sub/file1"]
+    write_manifest(tmp_path / "save.json", manifest)
+    assert read_manifest(tmp_path / "save.json") == manifest
+    objects.checkout(manifest, tmp_path / "dest")
+    assert (tmp_path / "dest" / "sub" / "file1").read_bytes() == b"one"
+
+
+def _version(i: int) -> bytes:
+    return b"".join(
+        b"%d\n" % (i if line == 5 else line) for line in range(100)
+    )
+
+
+def test_delta_round_trip() -> None:
+    base = b"a\nb\n\xff\nc"
+    for data in (b"a\nB\n\xff\nc", b"\xfe\na\nb\n\xff\nc\nd", b""):
+        delta = make_delta(base * 20, data * 20)
+        if delta is not None:
+            assert apply_delta(base * 20, delta) == data * 20
+    # Not worth it when everything changed
+    assert make_delta(b"a\nb", b"c\nd") is None
+
+
+def test_put_delta_chain(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects", compress=True)
+    digests = [objects.put_bytes(_version(0))]
+    objects.incref(digests)
+    for i in range(1, MAX_DELTA_DEPTH + 2):
+        digest = objects.put_delta(_version(i), digests[-1])
+        objects.incref([digest])
+        digests.append(digest)
+    assert [objects.delta_depth(digest) for digest in digests[-3:]] == [
+        MAX_DELTA_DEPTH - 1, MAX_DELTA_DEPTH, 0,
+    ]
+    assert objects.read(digests[MAX_DELTA_DEPTH]) == _version(MAX_DELTA_DEPTH)
+    assert all(objects.verify(digest) for digest in digests)
+    # Each delta holds a reference on its base
+    assert objects.refcount(digests[0]) == 2
+    assert objects.refcount(digests[-1]) == 1
+
+
+def test_decref_releases_delta_bases(tmp_path: Path) -> None:
+    objects = ObjectStore(tmp_path / "objects", compress=True)
+    base = objects.put_bytes(_version(0))
+    objects.incref([base])
+    delta = objects.put_delta(_version(1), base)
+    objects.incref([delta])
+    assert objects.delta_base(delta) == base
+    # The base is only removed once the delta on top of it is gone
+    objects.decref([base])
+    assert objects.read(delta) == _version(1)
+    objects.decref([delta])
+    assert not objects.has(delta) and not objects.has(base)
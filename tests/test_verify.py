@@ -0,0 +1,102 @@
+from pathlib import Path
+from threading import Thread
+from typing import Callable
+
+import pytest
+
+from udsm import model
+from udsm.store import hash_bytes
+
+
+def test_clean_library(library: Path, write_tree: Callable[..., Path]) -> None:
+    source = write_tree(library / "source", {"file0": b"frisk"})
+    model.create_undertale_save("Frisk", source)
+    model.backup_save("undertale", source)
+    model.backups.wait_for_prune()
+    report = model.verify_library()
+    assert report.ok and report.problems() == []
+
+
+def test_repair_from_backups(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    source = write_tree(library / "source", {"file0": b"frisk", "a": b"a"})
+    model.create_undertale_save("Frisk", source)
+    model.backup_save("undertale", source)
+    model.backups.wait_for_prune()
+    digest = hash_bytes(b"frisk")
+    model._objects.object_path(digest).write_bytes(b"chara")
+    model._objects.incref([hash_bytes(b"a")])
+
+    report = model.verify_library()
+    assert report.saves == {("undertale", "Frisk"): ["file0"]}
+    assert report.bad_objects == {digest}
+    assert report.wrong_refs == 1
+    result = model.repair_library(report)
+    assert (result.restored_files, result.fixed_refs) == (1, 1)
+    assert result.unrepaired == []
+    assert model._objects.read(digest) == b"frisk"
+    assert model.verify_library().ok
+
+
+def test_repair_from_premade_saves(
+    library: Path,
+    write_tree: Callable[..., Path],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    premade = library / "premade"
+    monkeypatch.setattr(model, "PREMADE_PATH", premade)
+    source = write_tree(
+        premade / "Undertale" / "Neutral" / "Papyrus", {"file0": b"papyrus"}
+    )
+    model.create_undertale_save("Papyrus", source)
+    model.create_undertale_save("Sans", source)
+    model._objects.object_path(hash_bytes(b"papyrus")).unlink()
+    model._manifest_path("undertale", "Papyrus").write_text("{")
+    model._manifest_path("undertale", "Sans").write_text("{")
+
+    report = model.verify_library()
+    assert report.unreadable_saves == [
+        ("undertale", "Papyrus"), ("undertale", "Sans"),
+    ]
+    result = model.repair_library(report)
+    assert result.restored_files == 0  # Only the unreadable SAVES used it
+    assert result.recreated_saves == ["Papyrus"]
+    assert result.unrepaired == ["UNDERTALE SAVE 'Sans' can't be read"]
+    model.copy_undertale_save("Papyrus", library / "out")
+    assert (library / "out" / "file0").read_bytes() == b"papyrus"
+
+
+def test_orphaned_entries(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    source = write_tree(library / "source", {"file0": b"frisk"})
+    model.create_undertale_save("Frisk", source)
+    model.playlists.set("Route", ["Frisk", "Gone", "Frisk", "Gone"])
+    model.playlists.commit()
+    orphaned = model.orphaned_entries()
+    assert orphaned == {"Route": ["Gone", "Gone"]}
+    assert model.remove_orphaned_entries(orphaned) == 2
+    assert model.playlists.get("Route") == ["Frisk", "Frisk"]
+
+
+def test_repair_waits_for_pack_export(
+    library: Path, write_tree: Callable[..., Path]
+) -> None:
+    source = write_tree(library / "source", {"file0": b"frisk"})
+    model.create_undertale_save("Frisk", source)
+    report = model.verify_library()
+    repair = Thread(target=model.repair_library, args=(report,))
+
+    def progress(done: int, total: int) -> None:
+        # The export holds an extra reference the manifests don't list
+        repair.start()
+        repair.join(0.2)
+        assert repair.is_alive()
+
+    model.export_pack(
+        library / "saves.udsmpack", [("undertale", "Frisk")],
+        progress=progress,
+    )
+    repair.join()
+    assert model._objects.refcount(hash_bytes(b"frisk")) == 1
@@ -1,33 +1,50 @@
 import sys
+from collections import deque
+from concurrent.futures import Future
 from functools import partial
 from pathlib import Path
-from platform import system
-from typing import Any, Literal
+from threading import Event, Thread
+from time import time
+from typing import Any, Callable
 
 import pyqt_utils
 
 if True:  # Makes flake8 shut up
     pyqt_utils.init_app("ut-dr-save-manager", __file__)
 
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import QFileSystemWatcher, QObject, Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QAction, QDragEnterEvent, QDropEvent, QIcon, QKeyEvent
-from PyQt6.QtWidgets import (QApplication, QDialog, QFileDialog,
+from PyQt6.QtWidgets import (QApplication, QDialog, QFileDialog, QInputDialog,
                              QListWidgetItem, QMainWindow, QMenu, QMessageBox,
-                             QWidget)
+                             QProgressBar, QPushButton, QStatusBar,
+                             QTreeWidgetItem, QWidget)
 from pyqt_utils import licenses
-from pyqt_utils.config import (get_config_value, init_config, log,
-                               set_config_value)
+from pyqt_utils.config import log
 from pyqt_utils.styles import find_styles
 from pyqt_utils.utils import open_url
 from pyqt_utils.version import version_string
 
-from . import model
+from . import jobs, model, processes
+from .backups import AUTO_SAVE, Snapshot
+from .config import (DEFAULT_CONFIG, flush_config, get_config_value,
+                     init_config, set_config_value)
+from .diff import Change
+from .index import GAME_TITLES, GAMES, Game
+from .launch import Launch
+from .packs import PACK_SUFFIX
 from .paths import (BACKUP_PATH, DELTARUNE_SAVES_PATH, ICONS_PATH,
                     PREMADE_PATH, UNDERTALE_SAVES_PATH)
+from .playlists import PlaylistStore
+from .savelist import PlaylistModel, SaveListModel
+from .search import SearchIndex
+from .startup import StartupTrace
+from .verify import RepairResult, VerifyReport
 
 try:
     from .ui.about_ui import Ui_About
     from .ui.create_ui import Ui_Create
+    from .ui.diff_ui import Ui_Diff
+    from .ui.history_ui import Ui_History
     from .ui.playlist_runner_ui import Ui_PlaylistRunner
     from .ui.playlists_ui import Ui_Playlists
     from .ui.window_ui import Ui_MainWindow
@@ -47,83 +64,6 @@ except ImportError:
         "WARNING",
     )
 
-type Game = Literal["undertale", "deltarune"]
-
-
-def get_default_undertale_save_path() -> str:
-    match system():
-        case "Linux":
-            return str((
-                Path.home() / ".config" / "UNDERTALE"
-            ).absolute().resolve())
-        case "Windows":
-            return str((
-                Path.home() / "AppData" / "Local" / "UNDERTALE"
-            ).absolute().resolve())
-        case "Darwin":
-            return str(
-                (
-                    Path.home() / "Library" / "Application Support" /
-                    "com.tobyfox.undertale"
-                ).absolute().resolve()
-            )
-        case _:
-            return ""
-
-
-def get_default_deltarune_save_path() -> str:
-    match system():
-        case "Linux":
-            return ""
-        case "Windows":
-            return str((
-                Path.home() / "AppData" / "Local" / "DELTARUNE"
-            ).absolute().resolve())
-        case "Darwin":
-            return str(
-                (
-                    Path.home() / "Library" / "Application Support" /
-                    "com.tobyfox.deltarune"
-                ).absolute().resolve()
-            )
-        case _:
-            return ""
-
-
-def get_default_undertale_proc_name() -> str:
-    match system():
-        case "Linux":
-            return "runner"
-        case "Windows":
-            return "UNDERTALE.exe"
-        case _:
-            return ""
-
-
-def get_default_deltarune_proc_name() -> str:
-    match system():
-        case "Linux":
-            return "DELTARUNE.exe"
-        case "Windows":
-            return "DELTARUNE.exe"
-        case _:
-            return ""
-
-
-DEFAULT_CONFIG: dict[str, bool | str | list[str] | dict[str, list[str]]] = {
-    "first_startup": True,
-    "theme": "",
-    "undertale_file_path": "",
-    "deltarune_file_path": "",
-    "undertale_save_path": get_default_undertale_save_path(),
-    "deltarune_save_path": get_default_deltarune_save_path(),
-    "deltarune_saves": [],
-    "undertale_saves": [],
-    "playlists": {},
-    "undertale_proc_name": get_default_undertale_proc_name(),
-    "deltarune_proc_name": get_default_deltarune_proc_name(),
-}
-
 
 def show_question(parent: QWidget, title: str, desc: str) -> int:
     messagebox = QMessageBox(parent)
@@ -157,42 +97,257 @@ def show_info(parent: QWidget, title: str, desc: str) -> int:
     return messagebox.exec()
 
 
+class JobWatcher(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+    def __init__(
+        self,
+        job: jobs.Job,
+        on_finished: Callable[[Any], None] | None = None,
+        on_failed: Callable[[BaseException], None] | None = None,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.job = job
+        if on_finished is not None:
+            self.finished.connect(on_finished)
+        if on_failed is not None:
+            self.failed.connect(on_failed)
+        job.on_progress(self.progress.emit)
+        # A job that is already done calls done() right away. Waiting for the
+        # event loop lets the caller store the watcher before that.
+        QTimer.singleShot(0, self.watch)
+
+    def watch(self) -> None:
+        self.job.future.add_done_callback(self.done)
+
+    def done(self, future: Future[Any]) -> None:
+        try:
+            if future.cancelled():
+                self.failed.emit(jobs.JobCancelled(self.job.description))
+            elif (e := future.exception()) is not None:
+                self.failed.emit(e)
+            else:
+                self.finished.emit(future.result())
+        except RuntimeError:
+            pass  # The receiver is already gone
+
+
 class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
-    def __init__(self) -> None:
+    def __init__(self, startup_trace: StartupTrace | None = None) -> None:
         super().__init__(None)
-        self.saves_to_items_ut: dict[str, QListWidgetItem] = {}
-        self.saves_to_items_dr: dict[str, QListWidgetItem] = {}
+        self.startup_trace = startup_trace or StartupTrace()
         self.setupUi(self)
-        self.updateUi()
+        self.undertale_model = SaveListModel(
+            partial(self.rename_save, "undertale"),
+            partial(self.describe_save, "undertale"),
+            self,
+        )
+        self.deltarune_model = SaveListModel(
+            partial(self.rename_save, "deltarune"),
+            partial(self.describe_save, "deltarune"),
+            self,
+        )
+        self.undertaleSavesList.setModel(self.undertale_model)
+        self.deltaruneSavesList.setModel(self.deltarune_model)
+        self.job_watchers: list[JobWatcher] = []
+        # Filled on a worker once the metadata cache is warm, until then
+        # searching isn't possible
+        self.search_index: SearchIndex | None = None
+        self.job_progress = QProgressBar(self)
+        self.job_progress.setMaximumWidth(200)
+        self.job_cancel = QPushButton("Cancel", self)
+        self.job_cancel.clicked.connect(self.cancel_jobs)
+        self.status_bar = QStatusBar(self)
+        self.status_bar.addPermanentWidget(self.job_progress)
+        self.status_bar.addPermanentWidget(self.job_cancel)
+        self.setStatusBar(self.status_bar)
+        self.update_job_status()
+        self.setWindowIcon(QIcon(str(ICONS_PATH / "icon.png")))
+        self.undertaleSavePath.setText(get_config_value("undertale_save_path"))
+        self.deltaruneSavePath.setText(get_config_value("deltarune_save_path"))
+        self.undertaleFilePath.setText(get_config_value("undertale_file_path"))
+        self.deltaruneFilePath.setText(get_config_value("deltarune_file_path"))
+        # Menus, themes and the SAVE lists are filled in once the window is
+        # shown, see finish_startup()
+        self.premade_menu_built = False
+        self.all_theme_actions: list[QAction] = []
+        self.auto_snapshotter = AutoSnapshotter(self)
         self.connectSignalsSlots()
+        self.saves_watcher = QFileSystemWatcher(
+            [str(UNDERTALE_SAVES_PATH), str(DELTARUNE_SAVES_PATH)], self
+        )
+        self.saves_refresh_timer = QTimer(self)
+        self.saves_refresh_timer.setSingleShot(True)
+        self.saves_refresh_timer.setInterval(200)
+        self.saves_refresh_timer.timeout.connect(self.updateUi)
+        self.saves_watcher.directoryChanged.connect(self.saves_dir_changed)
         self.resize(0, 0)
         QTimer.singleShot(
             0, lambda: self.resize(self.width(), self.height() + 50)
         )
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self) -> None:
+        self.startup_trace.mark("first event loop iteration")
+        self.build_theme_menu()
+        self.startup_trace.mark("theme discovery")
+        # Not a user facing job, cancelling it would leave the lists empty
+        self.saves_load_watcher = JobWatcher(
+            jobs.runner.submit(
+                "Loading SAVES",
+                lambda job: (
+                    model.get_undertale_saves(), model.get_deltarune_saves()
+                ),
+            ),
+            self.saves_loaded,
+            self.saves_loaded,
+            self,
+        )
+        self.actionAutoSnapshot.setChecked(get_config_value("auto_snapshot"))
+        self.update_auto_snapshot_paths()
         if get_config_value("first_startup"):
             set_config_value("first_startup", False)
             self.import_all_premade_saves()
 
+    def saves_loaded(self, result: Any) -> None:
+        self.updateUi()
+        self.startup_trace.mark("loading SAVES")
+        self.startup_trace.finish()
+
+        # Warm the metadata cache so tooltips and the search index don't
+        # have to parse SAVES on the GUI thread
+        def build_search_index(job: jobs.Job) -> SearchIndex:
+            model.cache_save_infos(lambda: job.cancelled)
+            return model.build_search_index(lambda: job.cancelled)
+
+        self.search_index_watcher = JobWatcher(
+            jobs.runner.submit("Building search index", build_search_index),
+            self.search_index_built,
+            parent=self,
+        )
+
+    def search_index_built(self, search_index: SearchIndex) -> None:
+        self.search_index = search_index
+        self.updateUi()
+        days = get_config_value("verify_interval_days")
+        if days and time() - get_config_value("last_verify") > days * 86400:
+            QTimer.singleShot(
+                VERIFY_IDLE_DELAY * 1000, partial(self.verify_library, True)
+            )
+
     def updateUi(self) -> None:
-        self.setWindowIcon(QIcon(str(ICONS_PATH / "icon.png")))
-        self.undertaleSavePath.setText(get_config_value("undertale_save_path"))
-        self.deltaruneSavePath.setText(get_config_value("deltarune_save_path"))
-        self.undertaleFilePath.setText(get_config_value("undertale_file_path"))
-        self.deltaruneFilePath.setText(get_config_value("deltarune_file_path"))
-        self.undertaleSavesList.clear()
-        self.saves_to_items_ut.clear()
-        self.saves_to_items_dr.clear()
-        self.deltaruneSavesList.clear()
-        for save in model.get_undertale_saves():
-            item = QListWidgetItem(save)
-            self.saves_to_items_ut[save] = item
-            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-            self.undertaleSavesList.addItem(item)
-        for save in model.get_deltarune_saves():
-            item = QListWidgetItem(save)
-            self.saves_to_items_dr[save] = item
-            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-            self.deltaruneSavesList.addItem(item)
+        undertale_saves = model.get_undertale_saves()
+        deltarune_saves = model.get_deltarune_saves()
+        if (search_index := self.search_index) is not None:
+            sync_search_index(search_index, "undertale", undertale_saves)
+            sync_search_index(search_index, "deltarune", deltarune_saves)
+            results = search_index.search(self.searchSaves.text())
+            if results is not None:
+                undertale_saves = [
+                    name for name in undertale_saves
+                    if ("undertale", name) in results
+                ]
+                deltarune_saves = [
+                    name for name in deltarune_saves
+                    if ("deltarune", name) in results
+                ]
+        self.undertale_model.set_names(undertale_saves)
+        self.deltarune_model.set_names(deltarune_saves)
+
+    def describe_save(self, game: Game, name: str) -> str:
+        return model.get_save_info(game, name).summary()
+
+    def selected_save(self, game: Game) -> str | None:
+        if game == "undertale":
+            view, list_model = self.undertaleSavesList, self.undertale_model
+        else:
+            view, list_model = self.deltaruneSavesList, self.deltarune_model
+        try:
+            return list_model.name(view.selectedIndexes()[0])
+        except IndexError:
+            return None
+
+    def submit_job(
+        self,
+        description: str,
+        fn: Callable[[jobs.Job], Any],
+        key: str | None = None,
+        on_finished: Callable[[Any], None] | None = None,
+        on_failed: Callable[[BaseException], None] | None = None,
+    ) -> jobs.Job:
+        job = jobs.runner.submit(description, fn, key)
+        watcher = JobWatcher(
+            job,
+            partial(self.job_finished, job, on_finished),
+            partial(self.job_failed, job, on_failed, description),
+            self,
+        )
+        watcher.progress.connect(self.job_progress_changed)
+        self.job_watchers.append(watcher)
+        self.update_job_status()
+        return job
+
+    def job_done(self, job: jobs.Job) -> None:
+        for watcher in self.job_watchers:
+            if watcher.job is job:
+                self.job_watchers.remove(watcher)
+                watcher.deleteLater()
+                break
+        self.update_job_status()
+
+    def job_finished(
+        self,
+        job: jobs.Job,
+        on_finished: Callable[[Any], None] | None,
+        result: Any,
+    ) -> None:
+        self.job_done(job)
+        if on_finished is not None:
+            on_finished(result)
+
+    def job_failed(
+        self,
+        job: jobs.Job,
+        on_failed: Callable[[BaseException], None] | None,
+        description: str,
+        error: BaseException,
+    ) -> None:
+        self.job_done(job)
+        if isinstance(error, jobs.JobCancelled):
+            return
+        if on_failed is not None:
+            on_failed(error)
+        else:
+            log(f"{description} failed: {error}", "ERROR")
+            show_error(self, "Something went wrong", f"{description} failed.")
+
+    def job_progress_changed(self, done: int, total: int) -> None:
+        self.job_progress.setMaximum(total)
+        self.job_progress.setValue(done)
+
+    def update_job_status(self) -> None:
+        busy = bool(self.job_watchers)
+        self.job_progress.setVisible(busy)
+        self.job_cancel.setVisible(busy)
+        if busy:
+            self.status_bar.showMessage(
+                self.job_watchers[-1].job.description
+            )
+        else:
+            self.job_progress.setMaximum(0)
+            self.status_bar.clearMessage()
+
+    def cancel_jobs(self) -> None:
+        for watcher in self.job_watchers:
+            watcher.job.cancel()
+
+    def build_premade_menu(self) -> None:
+        if self.premade_menu_built:
+            return
+        self.premade_menu_built = True
         self.menuImportPremadeSave.clear()
         ia: QAction = self.menuImportPremadeSave.addAction("Import all")  # type: ignore[assignment]  # noqa
         ia.triggered.connect(partial(self.import_all_premade_saves, None))
@@ -226,9 +381,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
                         )
                     )
 
-        # Themes
+    def build_theme_menu(self) -> None:
         self.menuTheme.clear()
-        self.all_theme_actions: list[QAction] = []
+        self.all_theme_actions = []
         action: QAction = self.menuTheme.addAction("Default")  # type: ignore[assignment]  # noqa
         self.all_theme_actions.append(action)
         action.setCheckable(True)
@@ -248,29 +403,47 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
                 if style.name == configured_theme:
                     self.set_style(style.name, style.stylesheet)
 
+    def saves_dir_changed(self) -> None:
+        if model.index.invalidate_if_changed():
+            self.saves_refresh_timer.start()
+
     def import_all_premade_saves(self, from_dir: str | None = None) -> None:
-        for game in PREMADE_PATH.iterdir():
-            if not game.is_dir():
-                continue
-            for category in game.iterdir():
-                if not category.is_dir():
-                    continue
-                for save in category.iterdir():
-                    if not save.is_dir():
-                        continue
-                    if (
-                        from_dir is None
-                        or from_dir == game.name
-                        or from_dir == category.name
-                    ):
-                        self.create_save(
-                            save,
-                            (
-                                "undertale" if game.name.lower() == "undertale"
-                                else "deltarune"
-                            ),
-                            save.name,
-                        )
+        # Walking the premade tree happens on the worker too
+        self.submit_job(
+            "Importing premade SAVES",
+            lambda job: model.bulk_import(
+                model.find_premade_saves(from_dir),
+                progress=job.report,
+                cancelled=lambda: job.cancelled,
+            ),
+            on_finished=self.bulk_import_finished,
+        )
+
+    def bulk_import(
+        self, saves: list[tuple[Game | None, str, Path]], description: str
+    ) -> None:
+        self.submit_job(
+            description,
+            lambda job: model.bulk_import(
+                saves, progress=job.report, cancelled=lambda: job.cancelled
+            ),
+            on_finished=self.bulk_import_finished,
+        )
+
+    def bulk_import_finished(self, results: list[model.ImportResult]) -> None:
+        self.updateUi()
+        failed = [result for result in results if result.error]
+        if failed:
+            show_error(
+                self, "Some SAVES were not imported",
+                f"{len(results) - len(failed)} of {len(results)} SAVES were "
+                "imported. The following SAVES failed:\n\n"
+                + "\n".join(
+                    f"{result.name}: {result.error}" for result in failed[:20]
+                )
+                + (f"\n... and {len(failed) - 20} more" if len(failed) > 20
+                   else ""),
+            )
 
     def set_style(self, name: str, stylesheet: str) -> None:
         self.setStyleSheet(stylesheet)
@@ -294,6 +467,12 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
                 "deltarune_save_path", self.deltaruneSavePath.text()
             )
         )
+        self.undertaleSavePath.textChanged.connect(
+            self.update_auto_snapshot_paths
+        )
+        self.deltaruneSavePath.textChanged.connect(
+            self.update_auto_snapshot_paths
+        )
         self.undertaleFilePath.textChanged.connect(
             lambda: set_config_value(
                 "undertale_file_path", self.undertaleFilePath.text()
@@ -304,7 +483,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
                 "deltarune_file_path", self.deltaruneFilePath.text()
             )
         )
-        self.openBackup.clicked.connect(model.open_backup_folder)
+        self.menuImportPremadeSave.aboutToShow.connect(
+            self.build_premade_menu
+        )
+        self.searchSaves.textChanged.connect(self.updateUi)
+        self.openBackup.clicked.connect(self.open_backup)
         self.applyUndertale.clicked.connect(self.apply_undertale)
         self.applyDeltarune.clicked.connect(self.apply_deltarune)
         self.deleteUndertale.clicked.connect(self.delete_undertale)
@@ -315,21 +498,15 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
         self.addDeltaruneToSaves.clicked.connect(
             partial(self.add_to_saves, "deltarune")
         )
-        self.undertaleSavesList.itemChanged.connect(
-            partial(self.item_renamed, "undertale")
-        )
-        self.undertaleSavesList.selectionChanged = (
+        self.undertaleSavesList.selectionModel().selectionChanged.connect(
             lambda selected, deselected:
             self.deltaruneSavesList.clearSelection()
-            if self.undertaleSavesList.selectedItems() else None
+            if self.undertaleSavesList.selectedIndexes() else None
         )
-        self.deltaruneSavesList.itemChanged.connect(
-            partial(self.item_renamed, "deltarune")
-        )
-        self.deltaruneSavesList.selectionChanged = (
+        self.deltaruneSavesList.selectionModel().selectionChanged.connect(
             lambda selected, deselected:
             self.undertaleSavesList.clearSelection()
-            if self.deltaruneSavesList.selectedItems() else None
+            if self.deltaruneSavesList.selectedIndexes() else None
         )
         self.launchUTSteam.clicked.connect(model.launch_steam_ut)
         self.launchDRSteam.clicked.connect(model.launch_steam_dr)
@@ -348,6 +525,14 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
             lambda: open_url("https://saveeditor.spamton.com/")
         )
         self.actionOpen_Playlists.triggered.connect(self.open_playlists)
+        self.actionCompareSaves.triggered.connect(self.open_diff)
+        self.actionSaveHistory.triggered.connect(self.open_history)
+        self.actionAutoSnapshot.toggled.connect(self.auto_snapshot_toggled)
+        self.actionImportPack.triggered.connect(self.import_pack)
+        self.actionVerifySaves.triggered.connect(
+            lambda: self.verify_library()
+        )
+        self.actionExportPack.triggered.connect(self.export_pack)
         self.actionView_Licenses.triggered.connect(self.open_licenses)
         self.actionAbout.triggered.connect(self.open_about)
         self.actionImportUTSave.triggered.connect(
@@ -357,15 +542,217 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
             partial(self.import_save, "deltarune")
         )
 
+    def open_backup(self) -> None:
+        backups = model.list_backups()
+        if not backups:
+            model.open_backup_folder()
+            return
+        name, ok = QInputDialog.getItem(
+            self, "Open Backup", "Select the backup to open:",
+            [backup.name for backup in backups], 0, False,
+        )
+        if ok and name:
+            model.open_backup(name)
+
     def import_save(self, game: Game) -> None:
         folder = QFileDialog.getExistingDirectory(self, "Select SAVE Folder")
         if folder:
             self.create_save(folder, game)
 
+    def import_pack(self) -> None:
+        path = QFileDialog.getOpenFileName(
+            self, "Import SAVE Pack", "",
+            f"SAVE packs (*{PACK_SUFFIX});;All files (*)",
+        )[0]
+        if not path:
+            return
+
+        def failed(e: BaseException) -> None:
+            show_error(
+                self, "Failed to import SAVE pack",
+                f"'{path}' could not be read as a SAVE pack.\n\n{e}",
+            )
+
+        self.submit_job(
+            "Importing SAVE pack",
+            lambda job: model.import_pack(
+                path, progress=job.report, cancelled=lambda: job.cancelled
+            ),
+            on_finished=self.import_pack_finished,
+            on_failed=failed,
+        )
+
+    def import_pack_finished(self, result: model.PackImport) -> None:
+        self.bulk_import_finished(result.saves)
+        if skipped := model.import_playlists(result.playlists):
+            show_error(
+                self, "Some playlists were not imported",
+                "Playlists with these names already exist:\n\n"
+                + "\n".join(skipped),
+            )
+
+    def export_pack(self) -> None:
+        path = QFileDialog.getSaveFileName(
+            self, "Export SAVE Pack", f"saves{PACK_SUFFIX}",
+            f"SAVE packs (*{PACK_SUFFIX})",
+        )[0]
+        if not path:
+            return
+        saves = [
+            (game, name) for game in GAMES for name in model.index.saves(game)
+        ]
+        pack_playlists = {
+            name: list(model.playlists.get(name))
+            for name in model.playlists.names()
+        }
+
+        def export(job: jobs.Job) -> None:
+            model.export_pack(
+                path, saves, pack_playlists, job.report,
+                lambda: job.cancelled,
+            )
+            job.check_cancelled()
+
+        def finished(result: None) -> None:
+            show_info(
+                self, "SAVE Pack Exported",
+                f"Exported {len(saves)} SAVES and {len(pack_playlists)} "
+                f"playlists to '{path}'.",
+            )
+
+        self.submit_job("Exporting SAVE pack", export, on_finished=finished)
+
+    def verify_library(self, idle: bool = False) -> None:
+        def verify(job: jobs.Job) -> VerifyReport:
+            report = model.verify_library(
+                progress=job.report, cancelled=lambda: job.cancelled
+            )
+            job.check_cancelled()
+            return report
+
+        self.submit_job(
+            "Verifying SAVES",
+            verify,
+            on_finished=partial(self.verify_finished, idle),
+        )
+
+    def verify_finished(self, idle: bool, report: VerifyReport) -> None:
+        set_config_value("last_verify", int(time()))
+        report.orphaned_entries = model.orphaned_entries()
+        if not (problems := report.problems()):
+            if not idle:
+                show_info(
+                    self, "No Problems Found",
+                    "All SAVES, backups and playlists are intact.",
+                )
+            return
+        if show_question(
+            self, "Problems Found",
+            f"Found {len(problems)} problems:\n\n"
+            + "\n".join(problems[:20])
+            + (f"\n... and {len(problems) - 20} more" if len(problems) > 20
+               else "")
+            + "\n\nRepair them now? Missing SAVES are removed from "
+            "playlists, files are restored from the backups or the "
+            "pre-made SAVES where possible.",
+        ) == QMessageBox.StandardButton.Yes:
+            self.repair_library(report)
+
+    def repair_library(self, report: VerifyReport) -> None:
+        self.submit_job(
+            "Repairing SAVES",
+            lambda job: model.repair_library(report),
+            on_finished=partial(self.repair_finished, report),
+        )
+
+    def repair_finished(
+        self, report: VerifyReport, result: RepairResult
+    ) -> None:
+        result.removed_entries = model.remove_orphaned_entries(
+            report.orphaned_entries
+        )
+        self.updateUi()
+        show_info(
+            self, "Repair Finished",
+            "\n".join(result.summary()) or "Nothing had to be repaired.",
+        )
+
     def open_playlists(self) -> None:
-        dialog = PlaylistsDialog(self, get_config_value("playlists"))
+        dialog = PlaylistsDialog(model.playlists, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            set_config_value("playlists", dialog.playlists_d)
+            model.playlists.commit()
+        else:
+            model.playlists.rollback()
+
+    def open_diff(self) -> None:
+        selected = None
+        for game in GAMES:
+            if (name := self.selected_save(game)) is not None:
+                selected = (game, name)
+        dialog = DiffDialog(self, selected)
+        dialog.exec()
+
+    def open_history(self) -> None:
+        game: Game = (
+            "deltarune" if self.selected_save("deltarune") is not None
+            else "undertale"
+        )
+        dialog = HistoryDialog(self, game)
+        if dialog.exec() == QDialog.DialogCode.Accepted and (
+            dialog.selected_backup is not None
+        ):
+            self.restore_backup(dialog.selected_game, dialog.selected_backup)
+
+    def restore_backup(self, game: Game, name: str) -> None:
+        title = GAME_TITLES[game]
+        if not (cv := get_config_value(f"{game}_save_path")):
+            show_error(
+                self, f"No {title} SAVE path set",
+                f"Please configure the {title} SAVE path first."
+            )
+            return
+        save_path = Path(cv)
+        if not save_path.name.lower().endswith(game):
+            show_error(
+                self, "You IDIOT!",
+                f"Your {title} SAVE path does not end with '{game}'. Are you "
+                "sure you picked the right path?",
+            )
+            return
+
+        def finished(result: None) -> None:
+            show_info(
+                self, "Backup Restored",
+                f"The {title} backup '{name}' was restored. The SAVE it "
+                "replaced is the newest entry of the SAVE history now.",
+            )
+
+        def failed(e: BaseException) -> None:
+            show_error(
+                self, "Failed to restore backup",
+                f"The backup '{name}' could not be restored. Your current "
+                f"SAVE file was left untouched.\n\n{e}",
+            )
+
+        self.submit_job(
+            f"Restoring {title} backup '{name}'",
+            lambda job: model.restore_backup(name, save_path),
+            key=game,
+            on_finished=finished,
+            on_failed=failed,
+        )
+
+    def auto_snapshot_toggled(self, enabled: bool) -> None:
+        set_config_value("auto_snapshot", enabled)
+        self.update_auto_snapshot_paths()
+
+    def update_auto_snapshot_paths(self) -> None:
+        paths: dict[Game, Path] = {}
+        if get_config_value("auto_snapshot"):
+            for game in GAMES:
+                if cv := get_config_value(f"{game}_save_path"):
+                    paths[game] = Path(cv)
+        self.auto_snapshotter.set_paths(paths)
 
     def open_about(self) -> None:
         dialog = About(self)
@@ -390,26 +777,19 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
             return
         model.launch_file(path)
 
-    def item_renamed(self, game: Game, item: QListWidgetItem) -> None:
+    def rename_save(self, game: Game, prev_name: str, new_name: str) -> bool:
+        if not new_name or model.index.name_taken(new_name):
+            return False
         if game == "undertale":
-            prev_name = reverse_lookup(self.saves_to_items_ut, item)
+            model.rename_undertale_save(prev_name, new_name)
         else:
-            prev_name = reverse_lookup(self.saves_to_items_dr, item)
-        if prev_name is None:
-            return
-        new_name = item.text().strip()
-        if not new_name or new_name.lower() in (
-            *map(str.lower, model.get_undertale_saves()),
-            *map(str.lower, model.get_deltarune_saves()),
-        ):
-            item.setText(prev_name)
-        else:
-            item.setText(new_name)
-            if game == "undertale":
-                model.rename_undertale_save(prev_name, new_name)
-            else:
-                model.rename_deltarune_save(prev_name, new_name)
-        self.updateUi()
+            model.rename_deltarune_save(prev_name, new_name)
+        if model.index.game_of(new_name) != game:
+            return False
+        # The list model moves the row once this returns, then the search
+        # index and the filter have to pick up the new name
+        QTimer.singleShot(0, self.updateUi)
+        return True
 
     def add_to_saves(self, game: Game) -> None:
         path = get_config_value(f"{game}_save_path")
@@ -442,10 +822,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
         lines: list[str] = []
         for url in mimeData.urls():
             lines.append(url.toLocalFile())
-        if len(lines) != 1:
-            show_error(self, "Error", "Please drop only one folder at a time.")
+        if len(lines) == 1 and (
+            model.detect_game(Path(lines[0])) is not None
+            or not any(
+                game for game, _name, _path in model.find_saves(Path(lines[0]))
+            )
+        ):
+            self.create_save(lines[0])
             return
-        self.create_save(lines[0])
+        saves: list[tuple[Game | None, str, Path]] = []
+        for line in lines:
+            saves.extend(model.find_saves(Path(line)))
+        self.bulk_import(saves, "Importing SAVES")
 
     def create_save(
         self, path: str | Path,
@@ -453,24 +841,42 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
         name: str | None = None,
     ) -> None:
         create = CreateDialog(self, game)
-        if game and name:
-            if game == "undertale":
-                model.create_undertale_save(name, path)
-            else:
-                model.create_deltarune_save(name, path)
-            self.updateUi()
-        elif create.exec() == QDialog.DialogCode.Accepted:
+        if not (game and name):
+            if create.exec() != QDialog.DialogCode.Accepted:
+                return
             name = create.nameEdit.text()
-            if create.undertaleRadio.isChecked():
-                model.create_undertale_save(name, path)
-            else:
-                model.create_deltarune_save(name, path)
-            self.updateUi()
+            game = "undertale" if create.undertaleRadio.isChecked() else (
+                "deltarune"
+            )
+        if game == "undertale":
+            create_fn = model.create_undertale_save
+        else:
+            create_fn = model.create_deltarune_save
+        save_name = name
+        self.submit_job(
+            f"Creating SAVE '{name}'",
+            lambda job: create_fn(save_name, path),
+            on_finished=lambda result: self.updateUi(),
+        )
+
+    def apply_finished(self, game: Game, name: str, result: None) -> None:
+        show_info(
+            self, "SAVE Applied",
+            f"Your {GAME_TITLES[game]} SAVE '{name}' was applied.\n\n"
+            "This overwrote your previous SAVE file. If this was an "
+            "accident, you can recover your SAVE by clicking on 'Open "
+            "Backup Folder'.",
+        )
+
+    def apply_failed(self, game: Game, name: str, e: BaseException) -> None:
+        show_error(
+            self, "Failed to apply SAVE",
+            f"Your {GAME_TITLES[game]} SAVE '{name}' could not be applied. "
+            f"Your previous SAVE file was left untouched.\n\n{e}",
+        )
 
     def apply_undertale(self) -> None:
-        try:
-            selected = self.undertaleSavesList.selectedItems()[0].text()
-        except IndexError:
+        if (selected := self.selected_save("undertale")) is None:
             return
         undertale_save_path = Path(
             cv := get_config_value("undertale_save_path")
@@ -488,18 +894,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
                 "you sure picked the right path?",
             )
             return
-        model.copy_undertale_save(selected, undertale_save_path)
-        show_info(
-            self, "SAVE Applied",
-            f"Your UNDERTALE SAVE '{selected}' was applied.\n\n"
-            "This overwrote your previous SAVE file. If this was an accident, "
-            "you can recover your SAVE by clicking on 'Open Backup Folder'.",
+        self.submit_job(
+            f"Applying UNDERTALE SAVE '{selected}'",
+            lambda job: model.copy_undertale_save(
+                selected, undertale_save_path
+            ),
+            key="undertale",
+            on_finished=partial(self.apply_finished, "undertale", selected),
+            on_failed=partial(self.apply_failed, "undertale", selected),
         )
 
     def apply_deltarune(self) -> None:
-        try:
-            selected = self.deltaruneSavesList.selectedItems()[0].text()
-        except IndexError:
+        if (selected := self.selected_save("deltarune")) is None:
             return
         deltarune_save_path = Path(
             cv := get_config_value("deltarune_save_path")
@@ -517,53 +923,63 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # type: ignore[misc]
                 "you sure picked the right path?",
             )
             return
-        model.copy_deltarune_save(selected, deltarune_save_path)
-        show_info(
-            self, "SAVE Applied",
-            f"Your deltarune SAVE '{selected}' was applied.\n\n"
-            "This overwrote your previous SAVE file. If this was an accident, "
-            "you can recover your SAVE by clicking on 'Open Backup Folder'.",
+        self.submit_job(
+            f"Applying deltarune SAVE '{selected}'",
+            lambda job: model.copy_deltarune_save(
+                selected, deltarune_save_path
+            ),
+            key="deltarune",
+            on_finished=partial(self.apply_finished, "deltarune", selected),
+            on_failed=partial(self.apply_failed, "deltarune", selected),
         )
 
     def delete_undertale(self) -> None:
         # Nooooooooo
-        try:
-            selected = self.undertaleSavesList.selectedItems()[0].text()
-        except IndexError:
+        if (selected := self.selected_save("undertale")) is None:
             return
         if show_question(
             self, "TRULY ERASE IT?",
             f"Do you really want to delete the UNDERTALE SAVE '{selected}'?",
         ) == QMessageBox.StandardButton.Yes:
-            model.delete_undertale_save(selected)
-            self.updateUi()
+            self.submit_job(
+                f"Deleting UNDERTALE SAVE '{selected}'",
+                lambda job: model.delete_undertale_save(selected),
+                # Deleting can remove files an apply is still staging
+                key="undertale",
+                on_finished=lambda result: self.updateUi(),
+            )
 
     def delete_deltarune(self) -> None:
         # Nooooooooo
-        try:
-            selected = self.deltaruneSavesList.selectedItems()[0].text()
-        except IndexError:
+        if (selected := self.selected_save("deltarune")) is None:
             return
         if show_question(
             self, "TRULY ERASE IT?",
             f"Do you really want to delete the deltarune SAVE '{selected}'?",
         ) == QMessageBox.StandardButton.Yes:
-            model.delete_deltarune_save(selected)
-            self.updateUi()
+            self.submit_job(
+                f"Deleting deltarune SAVE '{selected}'",
+                lambda job: model.delete_deltarune_save(selected),
+                key="deltarune",
+                on_finished=lambda result: self.updateUi(),
+            )
 
 
 class PlaylistsDialog(QDialog, Ui_Playlists):  # type: ignore[misc]
     def __init__(
         self,
+        store: PlaylistStore,
         parent: QWidget | None = None,
-        playlists: dict[str, list[str]] = {},
     ) -> None:
         super().__init__(parent)
-        self.playlists_d = playlists
+        self.store = store
         self.playlists_to_items: dict[str, QListWidgetItem] = {}
         self.selected_playlist: str | None = None
         self.setupUi(self)
+        self.saves_model = PlaylistModel(self)
+        self.savesList.setModel(self.saves_model)
         self.title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.fill_combos()
         self.updateUi()
         self.connectSignalsSlots()
 
@@ -575,51 +991,35 @@ class PlaylistsDialog(QDialog, Ui_Playlists):  # type: ignore[misc]
             self.playlists.item(i).text()  # type: ignore[union-attr]
             for i in range(self.playlists.count())
         ]
-        if list(self.playlists_d.keys()) != list_items:
+        if (names := self.store.names()) != list_items:
             self.playlists_to_items.clear()
             self.playlists.clear()
-            for playlist in self.playlists_d.keys():
+            for playlist in names:
                 item = QListWidgetItem(playlist)
                 item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
                 self.playlists.addItem(item)
                 self.playlists_to_items[playlist] = item
-        self.undertaleCombo.blockSignals(True)
-        self.deltaruneCombo.blockSignals(True)
-        self.undertaleCombo.clear()
-        self.deltaruneCombo.clear()
-        for save in [""] + model.get_undertale_saves():
-            self.undertaleCombo.addItem(save)
-        for save in [""] + model.get_deltarune_saves():
-            self.deltaruneCombo.addItem(save)
-        self.undertaleCombo.setCurrentIndex(0)
-        self.deltaruneCombo.setCurrentIndex(0)
-        self.undertaleCombo.blockSignals(False)
-        self.deltaruneCombo.blockSignals(False)
+        self.reset_combos()
         if not self.selected_playlist:
-            self.savesList.clear()
+            self.saves_model.set_entries([])
             self.savesList.setDisabled(True)
             self.undertaleCombo.setDisabled(True)
             self.deltaruneCombo.setDisabled(True)
         else:
-            self.savesList.clear()
             self.savesList.setDisabled(False)
             self.undertaleCombo.setDisabled(False)
             self.deltaruneCombo.setDisabled(False)
-            all_saves = (
-                model.get_undertale_saves()
-                + model.get_deltarune_saves()
-            )
-            removed_saves = set()
-            for save in self.playlists_d.get(self.selected_playlist, []):
-                if save not in all_saves:
-                    removed_saves.add(save)
-                    continue
-                self.savesList.addItem(save)
+            entries = self.store.get(self.selected_playlist)
+            removed_saves = {
+                save for save in entries if model.index.game_of(save) is None
+            }
             if removed_saves:
-                self.playlists_d[self.selected_playlist] = [
-                    save for save in self.playlists_d[self.selected_playlist]
-                    if save not in removed_saves
+                entries = [
+                    save for save in entries if save not in removed_saves
                 ]
+                self.store.set(self.selected_playlist, entries)
+            self.saves_model.set_entries(entries)
+            if removed_saves:
                 show_error(
                     self, "Removed SAVES",
                     "The following SAVES are no longer available and were "
@@ -627,6 +1027,16 @@ class PlaylistsDialog(QDialog, Ui_Playlists):  # type: ignore[misc]
                     f"{', '.join(removed_saves)}"
                 )
 
+    def fill_combos(self) -> None:
+        self.undertaleCombo.blockSignals(True)
+        self.deltaruneCombo.blockSignals(True)
+        self.undertaleCombo.clear()
+        self.deltaruneCombo.clear()
+        self.undertaleCombo.addItems([""] + model.get_undertale_saves())
+        self.deltaruneCombo.addItems([""] + model.get_deltarune_saves())
+        self.undertaleCombo.blockSignals(False)
+        self.deltaruneCombo.blockSignals(False)
+
     def connectSignalsSlots(self) -> None:
         self.playlists.itemChanged.connect(self.playlist_renamed)
         self.createPlaylist.clicked.connect(self.create_playlist)
@@ -655,7 +1065,7 @@ class PlaylistsDialog(QDialog, Ui_Playlists):  # type: ignore[misc]
     def play_playlist(self, steam: bool) -> None:
         if not self.selected_playlist:
             return
-        if not self.playlists_d.get(self.selected_playlist):
+        if not self.store.get(self.selected_playlist):
             show_error(
                 self, "No SAVES in playlist",
                 f"The playlist '{self.selected_playlist}' is empty."
@@ -699,7 +1109,7 @@ class PlaylistsDialog(QDialog, Ui_Playlists):  # type: ignore[misc]
             return
         dialog = PlaylistRunnerDialog(
             self.selected_playlist,
-            self.playlists_d[self.selected_playlist].copy(),
+            self.store.get(self.selected_playlist),
             ut_proc_name,
             dr_proc_name,
             ut_save_path,
@@ -711,13 +1121,22 @@ class PlaylistsDialog(QDialog, Ui_Playlists):  # type: ignore[misc]
         )
         dialog.exec()
 
+    def reset_combos(self) -> None:
+        self.undertaleCombo.blockSignals(True)
+        self.deltaruneCombo.blockSignals(True)
+        self.undertaleCombo.setCurrentIndex(0)
+        self.deltaruneCombo.setCurrentIndex(0)
+        self.undertaleCombo.blockSignals(False)
+        self.deltaruneCombo.blockSignals(False)
+
     def add_save(self, save: str) -> None:
         if not save:
             return  # Nothing selected
         if not self.selected_playlist:
             return
-        self.playlists_d[self.selected_playlist].append(save)
-        self.updateUi()
+        self.saves_model.append(save)
+        self.store.changed(self.selected_playlist)
+        self.reset_combos()
 
     def remove_save(self) -> None:
         try:
@@ -726,57 +1145,43 @@ class PlaylistsDialog(QDialog, Ui_Playlists):  # type: ignore[misc]
             return
         if not self.selected_playlist:
             return
-        self.playlists_d[self.selected_playlist].pop(selected)
-        self.updateUi()
+        self.saves_model.remove(selected)
+        self.store.changed(self.selected_playlist)
 
-    def move_save_up(self) -> None:
+    def move_save(self, delta: int) -> None:
         try:
-            selected = self.savesList.selectedItems()[0]
+            selected = self.savesList.selectedIndexes()[0].row()
         except IndexError:
             return
         if not self.selected_playlist:
             return
-        index = self.savesList.row(selected)
-        if index > 0:
-            self.playlists_d[self.selected_playlist].insert(
-                index - 1, selected.text()
+        if self.saves_model.move(selected, selected + delta):
+            self.store.changed(self.selected_playlist)
+            self.savesList.setCurrentIndex(
+                self.saves_model.index(selected + delta)
             )
-            self.playlists_d[self.selected_playlist].pop(index + 1)
-            self.updateUi()
+
+    def move_save_up(self) -> None:
+        self.move_save(-1)
 
     def move_save_down(self) -> None:
-        try:
-            selected = self.savesList.selectedItems()[0]
-        except IndexError:
-            return
-        if not self.selected_playlist:
-            return
-        index = self.savesList.row(selected)
-        if index < len(self.playlists_d[self.selected_playlist]) - 1:
-            self.playlists_d[self.selected_playlist].insert(
-                index + 2, selected.text()
-            )
-            self.playlists_d[self.selected_playlist].pop(index)
-            self.updateUi()
+        self.move_save(1)
 
     def playlist_renamed(self, item: QListWidgetItem) -> None:
         prev_name = reverse_lookup(self.playlists_to_items, item)
         if prev_name is None:
             return
         new_name = item.text().strip()
-        if not new_name or new_name.lower() in (
-            *map(str.lower, model.get_undertale_saves()),
-            *map(str.lower, model.get_deltarune_saves()),
-        ):
+        if not new_name or model.index.name_taken(new_name):
             item.setText(prev_name)
         else:
             item.setText(new_name)
-            if prev_name in self.playlists_d:
-                self.playlists_d[new_name] = self.playlists_d.pop(prev_name)
+            if prev_name in self.store and new_name not in self.store:
+                self.store.rename(prev_name, new_name)
         self.updateUi()
 
     def create_playlist(self) -> None:
-        self.playlists_d["New Playlist"] = []
+        self.store.set("New Playlist", [])
         self.updateUi()
 
     def delete_playlist(self) -> None:
@@ -788,8 +1193,8 @@ class PlaylistsDialog(QDialog, Ui_Playlists):  # type: ignore[misc]
             self, "TRULY ERASE IT?",
             f"Do you really want to delete the playlist '{selected}'?",
         ) == QMessageBox.StandardButton.Yes:
-            if selected in self.playlists_d:
-                del self.playlists_d[selected]
+            if selected in self.store:
+                self.store.delete(selected)
                 self.updateUi()
 
     def playlist_selection_changed(self) -> None:
@@ -800,6 +1205,146 @@ class PlaylistsDialog(QDialog, Ui_Playlists):  # type: ignore[misc]
         self.updateUi()
 
 
+class ProcessExitWatcher(QObject):
+    exited = pyqtSignal()
+    failed = pyqtSignal()
+
+    def __init__(self, pid: int, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.pid = pid
+        self.stop_event = Event()
+        self.worker = Thread(target=self.run, daemon=True)
+
+    def start(self) -> None:
+        self.worker.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run(self) -> None:
+        try:
+            processes.wait_for_exit(self.pid, self.stop_event)
+        except Exception as e:
+            log(f"Failed to wait for process {self.pid}: {e}", "WARNING")
+            signal = self.failed
+        else:
+            signal = self.exited
+        try:
+            if not self.stop_event.is_set():
+                signal.emit()
+        except RuntimeError:
+            pass  # The dialog is already gone
+
+
+# Verifying at idle waits this long after startup, in seconds
+VERIFY_IDLE_DELAY = 30
+
+# Games write several files in a row when saving
+AUTO_SNAPSHOT_DELAY = 5.0
+
+
+# Snapshots the live game SAVE folders into the backups while the game is
+# running. The folders are watched by the OS and a snapshot is taken once the
+# game stopped writing for AUTO_SNAPSHOT_DELAY seconds.
+class AutoSnapshotter(QObject):
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.paths: dict[Game, Path] = {}
+        self.job_watchers: dict[Game, JobWatcher] = {}
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.path_changed)
+        self.watcher.fileChanged.connect(self.path_changed)
+        self.timers: dict[Game, QTimer] = {}
+        for game in GAMES:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(int(AUTO_SNAPSHOT_DELAY * 1000))
+            timer.timeout.connect(partial(self.snapshot, game))
+            self.timers[game] = timer
+
+    def set_paths(self, paths: dict[Game, Path]) -> None:
+        if watched := self.watcher.directories() + self.watcher.files():
+            self.watcher.removePaths(watched)
+        for game, timer in self.timers.items():
+            if game not in paths:
+                timer.stop()
+        self.paths = paths
+        for game in paths:
+            self.watch(game)
+
+    def watch(self, game: Game) -> None:
+        path = self.paths[game]
+        # The parent tells when the folder is created or swapped
+        candidates = [path.parent, path]
+        try:
+            candidates.extend(
+                file for file in path.iterdir() if file.is_file()
+            )
+        except OSError:
+            pass
+        watched = set(self.watcher.directories() + self.watcher.files())
+        if new := [
+            str(candidate) for candidate in candidates
+            if str(candidate) not in watched and candidate.exists()
+        ]:
+            self.watcher.addPaths(new)
+
+    def path_changed(self, changed: str) -> None:
+        changed_path = Path(changed)
+        for game, path in self.paths.items():
+            if changed_path == path.parent:
+                self.watch(game)
+            elif path in (changed_path, changed_path.parent):
+                self.watch(game)
+                self.timers[game].start()
+
+    def snapshot(self, game: Game) -> None:
+        if (path := self.paths.get(game)) is None or not path.is_dir():
+            return
+        if game in self.job_watchers:
+            self.timers[game].start()  # Try again once that one is done
+            return
+        proc_name = get_config_value(f"{game}_proc_name")
+
+        # Applying SAVES writes here too, only the game's writes count. Only
+        # checked once the writes settled, listing processes is slow.
+        def run(job: jobs.Job) -> Snapshot | None:
+            if not model.program_running(proc_name):
+                return None
+            return model.backup_save(game, path, AUTO_SAVE)
+
+        job = jobs.runner.submit(
+            f"Snapshotting {GAME_TITLES[game]} SAVE", run, key=game
+        )
+        self.job_watchers[game] = JobWatcher(
+            job,
+            partial(self.snapshot_done, game),
+            partial(self.snapshot_failed, game),
+            self,
+        )
+
+    def snapshot_done(self, game: Game, snapshot: Snapshot | None) -> None:
+        if snapshot is not None:
+            log(
+                f"Snapshotted {GAME_TITLES[game]} SAVE: {snapshot.name}",
+                "INFO",
+            )
+        self.job_watchers.pop(game).deleteLater()
+
+    def snapshot_failed(self, game: Game, error: BaseException) -> None:
+        log(f"Failed to snapshot {GAME_TITLES[game]} SAVE: {error}", "ERROR")
+        self.job_watchers.pop(game).deleteLater()
+
+
+def discard_prefetch_job(job: jobs.Job) -> None:
+    def discard(future: Future[Any]) -> None:
+        if not future.cancelled() and future.exception() is None:
+            model.discard_prepared(future.result())
+
+    job.cancel()
+    job.future.add_done_callback(discard)
+
+
 class PlaylistRunnerDialog(QDialog, Ui_PlaylistRunner):  # type: ignore[misc]
     def __init__(
         self,
@@ -821,7 +1366,7 @@ class PlaylistRunnerDialog(QDialog, Ui_PlaylistRunner):  # type: ignore[misc]
         super().__init__(parent)
         self.should_cancel = False
         self.playlist_name = playlist_name
-        self.playlist = playlist
+        self.playlist = deque(playlist)
         self.ut_proc_name = ut_proc_name
         self.dr_proc_name = dr_proc_name
         self.ut_save_path = ut_save_path
@@ -830,7 +1375,13 @@ class PlaylistRunnerDialog(QDialog, Ui_PlaylistRunner):  # type: ignore[misc]
         self.ut_file_path = ut_file_path
         self.dr_file_path = dr_file_path
         self.current_save: str = ""
-        self.play_cooldown: float = 0.0
+        self.current_launch: Launch | None = None
+        self.exit_watcher: ProcessExitWatcher | None = None
+        self.apply_watcher: JobWatcher | None = None
+        # The next SAVE, staged while the current game is running
+        self.prefetch: tuple[str, jobs.Job] | None = None
+        self.applying = False
+        self.poll_fallback = False
         self.setupUi(self)
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_play)
@@ -850,41 +1401,158 @@ class PlaylistRunnerDialog(QDialog, Ui_PlaylistRunner):  # type: ignore[misc]
     def connectSignalsSlots(self) -> None:
         def set_cancel_true():
             self.should_cancel = True
-        self.cancelBtn.clicked.connect(set_cancel_true)
+        self.cancelBtn.clicked.connect(self.cancel)
         self.close = lambda: set_cancel_true() or True
 
+    def cancel(self) -> None:
+        self.should_cancel = True
+        self.stop_exit_watcher()
+        self.update_play()
+
+    def stop_exit_watcher(self) -> None:
+        if self.exit_watcher is not None:
+            self.exit_watcher.stop()
+            self.exit_watcher = None
+
+    def watch_running_game(self) -> bool:
+        if self.poll_fallback:
+            return processes.programs_running(
+                (self.ut_proc_name, self.dr_proc_name)
+            )
+        pid = processes.find_pid((self.ut_proc_name, self.dr_proc_name))
+        if pid is None:
+            return False
+        # Wait for the exit on a worker thread instead of polling
+        self.timer.stop()
+        self.exit_watcher = ProcessExitWatcher(pid, self)
+        self.exit_watcher.exited.connect(self.game_exited)
+        self.exit_watcher.failed.connect(self.exit_watch_failed)
+        self.exit_watcher.start()
+        return True
+
+    def game_exited(self) -> None:
+        self.exit_watcher = None
+        self.timer.start()
+
+    def exit_watch_failed(self) -> None:
+        self.exit_watcher = None
+        self.poll_fallback = True
+        self.timer.start()
+
     def update_play(self) -> None:
         if self.should_cancel:
             self.timer.stop()
+            self.discard_prefetch()
             self.close()
             return
-        self.play_cooldown -= self.timer.interval() / 1000.0
-        if (
-            model.program_running(self.ut_proc_name)
-            or model.program_running(self.dr_proc_name)
-            or self.play_cooldown > 0.0
-        ):
+        if self.applying:
+            return
+        running = self.watch_running_game()
+        if (launch := self.current_launch) is not None:
+            # Move on as soon as the game exited, or never started
+            match launch.update(running):
+                case "launched" | "running":
+                    return
+                case "timed_out":
+                    log(
+                        f"The game didn't start within {launch.timeout:.0f} "
+                        f"seconds, skipping SAVE '{self.current_save}'",
+                        "WARNING",
+                    )
+            self.current_launch = None
+        elif running:
             return
         if not self.playlist:
             self.timer.stop()
+            self.discard_prefetch()
             self.close()
             return
-        save = self.current_save = self.playlist.pop(0)
+        save = self.current_save = self.playlist.popleft()
         self.updateUi()
-        if save in model.get_undertale_saves():
-            model.copy_undertale_save(save, self.ut_save_path)
+        self.apply_and_launch(save)
+
+    def save_path_of(self, game: Game) -> Path | str:
+        return self.ut_save_path if game == "undertale" else self.dr_save_path
+
+    def prefetch_next(self) -> None:
+        if not self.playlist:
+            return
+        save = self.playlist[0]
+        if (game := model.index.game_of(save)) is None:
+            return
+        save_path = self.save_path_of(game)
+        self.prefetch = (save, jobs.runner.submit(
+            f"Preparing SAVE '{save}'",
+            lambda job: model.prepare_save(game, save, save_path),
+        ))
+
+    def take_prefetch(self, save: str) -> jobs.Job | None:
+        prefetch, self.prefetch = self.prefetch, None
+        if prefetch is None:
+            return None
+        if prefetch[0] != save:
+            discard_prefetch_job(prefetch[1])
+            return None
+        return prefetch[1]
+
+    def discard_prefetch(self) -> None:
+        if self.prefetch is not None:
+            discard_prefetch_job(self.prefetch[1])
+            self.prefetch = None
+
+    def apply_and_launch(self, save: str) -> None:
+        if (game := model.index.game_of(save)) is None:
+            return
+        save_path = self.save_path_of(game)
+        prefetch = self.take_prefetch(save)
+
+        def apply(job: jobs.Job) -> None:
+            prepared = None
+            # Waiting for an unfinished prefetch would hold the game's key
+            # and a worker, applying directly is about as fast
+            if prefetch is not None and not prefetch.future.done():
+                discard_prefetch_job(prefetch)
+            elif prefetch is not None:
+                try:
+                    prepared = prefetch.future.result()
+                except Exception as e:
+                    log(f"Failed to prepare SAVE '{save}': {e}", "WARNING")
+            if prepared is not None:
+                model.apply_prepared(prepared)
+            elif game == "undertale":
+                model.copy_undertale_save(save, save_path)
+            else:
+                model.copy_deltarune_save(save, save_path)
+
+        self.applying = True
+        job = jobs.runner.submit(f"Applying SAVE '{save}'", apply, key=game)
+        self.apply_watcher = JobWatcher(
+            job,
+            partial(self.launch, game),
+            partial(self.apply_failed, save),
+            self,
+        )
+
+    def apply_failed(self, save: str, error: BaseException) -> None:
+        self.applying = False
+        log(f"Failed to apply SAVE '{save}': {error}", "ERROR")
+
+    def launch(self, game: Game, result: Any = None) -> None:
+        self.applying = False
+        if self.should_cancel:
+            return
+        if game == "undertale":
             if self.steam:
                 model.launch_steam_ut()
             else:
                 model.launch_file(self.ut_file_path)
-            self.play_cooldown = 10.0
-        elif save in model.get_deltarune_saves():
-            model.copy_deltarune_save(save, self.dr_save_path)
+        else:
             if self.steam:
                 model.launch_steam_dr()
             else:
                 model.launch_file(self.dr_file_path)
-            self.play_cooldown = 10.0
+        self.current_launch = Launch(game)
+        self.prefetch_next()
 
     def keyPressEvent(self, a0: QKeyEvent | None) -> None:
         if a0 and a0.key() == Qt.Key.Key_Escape:
@@ -928,10 +1596,7 @@ class CreateDialog(QDialog, Ui_Create):  # type: ignore[misc]
             )
             return
         name = self.nameEdit.text().strip()
-        if not name or name.lower() in (
-            *map(str.lower, model.get_undertale_saves()),
-            *map(str.lower, model.get_deltarune_saves()),
-        ):
+        if not name or model.index.name_taken(name):
             show_error(
                 self, "Don't you care enough to give your SAVE a unique name?",
                 "Please give your SAVE a unique name.",
@@ -941,6 +1606,199 @@ class CreateDialog(QDialog, Ui_Create):  # type: ignore[misc]
             self.accept()
 
 
+class DiffDialog(QDialog, Ui_Diff):  # type: ignore[misc]
+    def __init__(
+        self,
+        parent: QWidget | None = None,
+        save: tuple[Game, str] | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.watcher: JobWatcher | None = None
+        self.backup_results: list[tuple[Snapshot, list[Change]]] = []
+        self.shown_results = 0
+        self.setupUi(self)
+        self.fill_combos(save)
+        self.updateUi()
+        self.connectSignalsSlots()
+
+    def updateUi(self) -> None:
+        self.setWindowIcon(QIcon(str(ICONS_PATH / "icon.png")))
+        idle = self.watcher is None and self.saveCombo.count() > 0
+        self.compareBtn.setEnabled(idle)
+        self.compareBackupsBtn.setEnabled(idle)
+
+    def fill_combos(self, selected: tuple[Game, str] | None) -> None:
+        for game in GAMES:
+            for name in model.index.saves(game):
+                text = f"{GAME_TITLES[game]}: {name}"
+                self.saveCombo.addItem(text, (game, name))
+                self.otherCombo.addItem(text, ("save", game, name))
+        for snapshot in model.list_backups():
+            self.otherCombo.addItem(
+                f"Backup: {snapshot.name}", ("backup", None, snapshot.name)
+            )
+        if selected is not None:
+            game, name = selected
+            self.saveCombo.setCurrentText(f"{GAME_TITLES[game]}: {name}")
+
+    def connectSignalsSlots(self) -> None:
+        self.compareBtn.clicked.connect(self.compare)
+        self.compareBackupsBtn.clicked.connect(self.compare_backups)
+
+    def start(self, job: jobs.Job, on_finished: Callable[[Any], None]) -> None:
+        self.diffTree.clear()
+        self.statusLabel.setText("Comparing...")
+        self.watcher = JobWatcher(job, on_finished, self.compare_failed, self)
+        self.updateUi()
+
+    def compare(self) -> None:
+        save = self.saveCombo.currentData()
+        if save is None or (other := self.otherCombo.currentData()) is None:
+            return
+        kind, game, name = other
+
+        def run(job: jobs.Job) -> list[Change]:
+            new = (
+                model.save_tree(game, name) if kind == "save"
+                else model.backup_tree(name)
+            )
+            return model.diff_saves(model.save_tree(*save), new)
+
+        self.start(jobs.runner.submit("Comparing SAVES", run), self.compared)
+
+    def compare_backups(self) -> None:
+        if (save := self.saveCombo.currentData()) is None:
+            return
+        game, name = save
+        results = self.backup_results = []
+        self.shown_results = 0
+
+        # Results are handed over one backup at a time and shown as they
+        # come in
+        def run(job: jobs.Job) -> None:
+            diffs = model.diff_backups(game, name, lambda: job.cancelled)
+            for done, result in enumerate(diffs, 1):
+                results.append(result)
+                job.report(done, 0)
+
+        self.start(
+            jobs.runner.submit("Comparing SAVE with backups", run),
+            self.backups_compared,
+        )
+        if self.watcher is not None:
+            self.watcher.progress.connect(self.show_backup_results)
+
+    def change_item(self, change: Change) -> QTreeWidgetItem:
+        return QTreeWidgetItem([
+            ", ".join(filter(None, (change.file, change.where))),
+            change.field or "",
+            change.old or "(missing)",
+            change.new or "(missing)",
+        ])
+
+    def compared(self, changes: list[Change]) -> None:
+        self.watcher = None
+        self.diffTree.addTopLevelItems(
+            [self.change_item(change) for change in changes]
+        )
+        self.statusLabel.setText(
+            f"{len(changes)} differences" if changes
+            else "The SAVES are identical."
+        )
+        self.updateUi()
+
+    def show_backup_results(self, *args: Any) -> None:
+        for snapshot, changes in self.backup_results[self.shown_results:]:
+            item = QTreeWidgetItem(
+                [snapshot.name, f"{len(changes)} differences"]
+            )
+            item.addChildren([self.change_item(change) for change in changes])
+            self.diffTree.addTopLevelItem(item)
+        self.shown_results = len(self.backup_results)
+
+    def backups_compared(self, result: Any) -> None:
+        self.watcher = None
+        self.show_backup_results()
+        self.statusLabel.setText(f"Compared with {self.shown_results} backups")
+        self.updateUi()
+
+    def compare_failed(self, error: BaseException) -> None:
+        self.watcher = None
+        self.statusLabel.setText(f"Failed to compare: {error}")
+        self.updateUi()
+
+    def done(self, a0: int) -> None:
+        if self.watcher is not None:
+            self.watcher.job.cancel()
+        super().done(a0)
+
+
+class HistoryDialog(QDialog, Ui_History):  # type: ignore[misc]
+    def __init__(
+        self, parent: QWidget | None = None, game: Game = "undertale"
+    ) -> None:
+        super().__init__(parent)
+        self.selected_game = game
+        self.selected_backup: str | None = None
+        self.setupUi(self)
+        for g in GAMES:
+            self.gameCombo.addItem(GAME_TITLES[g], g)
+        self.gameCombo.setCurrentText(GAME_TITLES[game])
+        self.updateUi()
+        self.connectSignalsSlots()
+
+    def updateUi(self) -> None:
+        self.setWindowIcon(QIcon(str(ICONS_PATH / "icon.png")))
+        self.versionsTree.clear()
+        items = []
+        for snapshot in model.list_backups(self.gameCombo.currentData()):
+            item = QTreeWidgetItem([
+                f"{snapshot.created:%Y-%m-%d %H:%M:%S}",
+                snapshot.save,
+                f"{snapshot.size / 1024:.1f} KiB",
+            ])
+            item.setData(0, Qt.ItemDataRole.UserRole, snapshot.name)
+            items.append(item)
+        self.versionsTree.addTopLevelItems(items)
+        self.update_buttons()
+
+    def update_buttons(self) -> None:
+        selected = self.selected_name() is not None
+        self.openBtn.setEnabled(selected)
+        self.restoreBtn.setEnabled(selected)
+
+    def connectSignalsSlots(self) -> None:
+        self.gameCombo.currentIndexChanged.connect(self.updateUi)
+        self.versionsTree.itemSelectionChanged.connect(self.update_buttons)
+        self.versionsTree.itemDoubleClicked.connect(self.open_version)
+        self.openBtn.clicked.connect(self.open_version)
+        self.restoreBtn.clicked.connect(self.restore_version)
+
+    def selected_name(self) -> str | None:
+        try:
+            item = self.versionsTree.selectedItems()[0]
+        except IndexError:
+            return None
+        name: str = item.data(0, Qt.ItemDataRole.UserRole)
+        return name
+
+    def open_version(self) -> None:
+        if (name := self.selected_name()) is not None:
+            model.open_backup(name)
+
+    def restore_version(self) -> None:
+        if (name := self.selected_name()) is None:
+            return
+        if show_question(
+            self, "Restore backup?",
+            f"Do you want to put the backup '{name}' back into the game "
+            "SAVE folder?",
+        ) == QMessageBox.StandardButton.Yes:
+            self.selected_game = self.gameCombo.currentData()
+            self.selected_backup = name
+            self.accept()
+
+
 class About(QDialog, Ui_About):  # type: ignore[misc]
     def __init__(self, parent: QWidget) -> None:
         super().__init__(parent)
@@ -961,6 +1819,20 @@ class About(QDialog, Ui_About):  # type: ignore[misc]
         )
 
 
+def sync_search_index(
+    search_index: SearchIndex, game: Game, names: list[str]
+) -> None:
+    indexed = search_index.names(game)
+    current = set(names)
+    for name in indexed - current:
+        search_index.remove(game, name)
+    categories = model.premade_categories()
+    for name in current - indexed:
+        search_index.add(
+            game, name, model.get_save_info(game, name), categories.get(name)
+        )
+
+
 def reverse_lookup(d: dict[Any, Any], value: Any) -> Any:
     for k, v in d.items():
         if v == value:
@@ -969,10 +1841,27 @@ def reverse_lookup(d: dict[Any, Any], value: Any) -> Any:
 
 
 def main() -> None:
+    startup_trace = StartupTrace()
     init_config(DEFAULT_CONFIG)
+    startup_trace.mark("loading config")
     UNDERTALE_SAVES_PATH.mkdir(parents=True, exist_ok=True)
     DELTARUNE_SAVES_PATH.mkdir(parents=True, exist_ok=True)
     BACKUP_PATH.mkdir(parents=True, exist_ok=True)
+    # Scans every SAVE folder, only needed once after updating
+    if not get_config_value("migrated_saves"):
+        model.migrate_legacy_saves()
+        set_config_value("migrated_saves", True)
+    # Clearing the key on every start would rewrite the config each time
+    if model.migrate_legacy_playlists(get_config_value("playlists")):
+        set_config_value("playlists", {})
+    model.set_backup_policy(
+        get_config_value("backup_keep_last"),
+        get_config_value("backup_keep_days"),
+        get_config_value("backup_max_bytes"),
+        get_config_value("backup_keep_auto"),
+    )
+    model.migrate_legacy_backups()
+    startup_trace.mark("migrations")
 
     app = QApplication(sys.argv)
     app.setApplicationName("ut-dr-save-manager")
@@ -980,9 +1869,15 @@ def main() -> None:
     font = app.font()
     font.setFamily("Liberation Sans")
     app.setFont(font)
-    win = MainWindow()
+    startup_trace.mark("creating application")
+    win = MainWindow(startup_trace)
+    startup_trace.mark("creating main window")
     win.show()
-    sys.exit(app.exec())
+    startup_trace.mark("showing main window")
+    exit_code = app.exec()
+    jobs.runner.shutdown()
+    flush_config()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+import json
+import re
+import shutil
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Any
+
+from .store import Manifest, ObjectStore, atomic_write, hash_file
+
+LEGACY_BACKUP_RE = re.compile(
+    r"^(UNDERTALE|DELTARUNE)_(.*)_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})$"
+)
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+# Snapshots taken while the game is running, see AutoSnapshotter
+AUTO_SAVE = "auto"
+# Characters of a SAVE name that can't be part of a snapshot file name
+UNSAFE_NAME_RE = re.compile(r'[\\/:*?"<>|\0]')
+
+
+@dataclass
+class RetentionPolicy:
+    keep_last: int = 50
+    keep_days: int = 14
+    max_bytes: int = 256 * 1024 * 1024
+    # Auto snapshots come in much more often, they don't count towards
+    # keep_last so they can't push out the other backups
+    keep_auto: int = 20
+
+
+@dataclass
+class Snapshot:
+    name: str
+    game: str
+    save: str
+    created: datetime
+    size: int
+    files: Manifest
+    stats: dict[str, list[int]]
+
+    @classmethod
+    def load(cls, path: Path) -> "Snapshot":
+        data = json.loads(path.read_text("utf-8"))
+        return cls(
+            name=path.stem,
+            game=data["game"],
+            save=data["save"],
+            created=datetime.fromisoformat(data["created"]),
+            size=data["size"],
+            files=data["files"],
+            stats=data.get("stats", {}),
+        )
+
+    def dump(self) -> dict[str, Any]:
+        return {
+            "version": 1,
+            "game": self.game,
+            "save": self.save,
+            "created": self.created.isoformat(),
+            "size": self.size,
+            "files": self.files,
+            "stats": self.stats,
+        }
+
+
+class BackupArchive:
+    def __init__(self, root: Path, policy: RetentionPolicy) -> None:
+        self.root = root
+        self.policy = policy
+        self.objects = ObjectStore(root / "objects", compress=True)
+        self._prune_lock = Lock()
+        self._prune_thread: Thread | None = None
+        self._prune_again = False
+
+    @property
+    def snapshots_path(self) -> Path:
+        return self.root / "snapshots"
+
+    def list_snapshots(self, game: str | None = None) -> list[Snapshot]:
+        try:
+            paths = list(self.snapshots_path.glob("*.json"))
+        except FileNotFoundError:
+            return []
+        snapshots = []
+        for path in paths:
+            try:
+                snapshot = Snapshot.load(path)
+            except (OSError, ValueError, KeyError):
+                continue
+            if game is None or snapshot.game == game:
+                snapshots.append(snapshot)
+        snapshots.sort(key=lambda s: (s.created, s.name), reverse=True)
+        return snapshots
+
+    def latest(self, game: str) -> Snapshot | None:
+        snapshots = self.list_snapshots(game)
+        return snapshots[0] if snapshots else None
+
+    def _scan(
+        self, path: Path, previous: Snapshot | None
+    ) -> tuple[Manifest, dict[str, list[int]], int]:
+        files: Manifest = {}
+        stats: dict[str, list[int]] = {}
+        size = 0
+        for file in sorted(path.rglob("*")):
+            if not file.is_file():
+                continue
+            rel = file.relative_to(path).as_posix()
+            st = file.stat()
+            stat = [st.st_size, st.st_mtime_ns]
+            # Unchanged files don't need to be read again
+            if previous and previous.stats.get(rel) == stat:
+                files[rel] = previous.files[rel]
+            else:
+                files[rel] = hash_file(file)
+            stats[rel] = stat
+            size += st.st_size
+        return files, stats, size
+
+    def snapshot(
+        self,
+        game: str,
+        save: str,
+        path: Path,
+        created: datetime | None = None,
+    ) -> Snapshot | None:
+        with self.objects.lock:
+            previous = self.latest(game)
+            files, stats, size = self._scan(path, previous)
+            if previous and previous.files == files:
+                return None
+            for rel, digest in files.items():
+                if self.objects.has(digest):
+                    continue
+                # Most versions only change a few lines of the previous one
+                if previous and (base := previous.files.get(rel)):
+                    files[rel] = self.objects.put_delta(
+                        (path / rel).read_bytes(), base
+                    )
+                else:
+                    files[rel] = self.objects.put_file(path / rel)
+            created = created or datetime.now()
+            snapshot = Snapshot(
+                name=(
+                    f"{game}_{UNSAFE_NAME_RE.sub('_', save)}_"
+                    f"{created.strftime(TIMESTAMP_FORMAT)}"
+                ),
+                game=game,
+                save=save,
+                created=created,
+                size=size,
+                files=files,
+                stats=stats,
+            )
+            snapshot_path = self.snapshots_path / f"{snapshot.name}.json"
+            index = 1
+            while snapshot_path.exists():
+                snapshot_path = (
+                    self.snapshots_path / f"{snapshot.name}_{index}.json"
+                )
+                index += 1
+            snapshot.name = snapshot_path.stem
+            atomic_write(
+                snapshot_path,
+                json.dumps(snapshot.dump(), indent=2).encode("utf-8"),
+            )
+            self.objects.incref(files.values())
+        self.prune_async()
+        return snapshot
+
+    def get(self, name: str) -> Snapshot:
+        return Snapshot.load(self.snapshots_path / f"{name}.json")
+
+    def checkout(self, name: str, dest: Path) -> None:
+        self.objects.checkout(self.get(name).files, dest)
+
+    def delete(self, name: str) -> int:
+        path = self.snapshots_path / f"{name}.json"
+        with self.objects.lock:
+            try:
+                snapshot = Snapshot.load(path)
+                path.unlink()
+            except FileNotFoundError:
+                return 0
+            return self.objects.decref(snapshot.files.values())
+
+    def _expired(self, snapshots: list[Snapshot]) -> list[Snapshot]:
+        policy = self.policy
+        auto = [s for s in snapshots if s.save == AUTO_SAVE]
+        other = [s for s in snapshots if s.save != AUTO_SAVE]
+        keep = {s.name for s in other[:policy.keep_last]}
+        keep.update(s.name for s in auto[:policy.keep_auto])
+        days: set[str] = set()
+        for snapshot in snapshots:
+            day = snapshot.created.date().isoformat()
+            if day not in days and len(days) < policy.keep_days:
+                days.add(day)
+                keep.add(snapshot.name)
+        return [s for s in snapshots if s.name not in keep]
+
+    def prune(self) -> None:
+        with self.objects.lock:
+            snapshots = self.list_snapshots()
+            for snapshot in self._expired(snapshots):
+                self.delete(snapshot.name)
+                snapshots.remove(snapshot)
+            total = self.objects.total_size()
+            # Always keep the most recent snapshot of each game
+            newest = {s.game: s.name for s in reversed(snapshots)}
+            for snapshot in reversed(snapshots):
+                if total <= self.policy.max_bytes:
+                    break
+                if snapshot.name in newest.values():
+                    continue
+                total -= self.delete(snapshot.name)
+
+    def _prune_worker(self) -> None:
+        while True:
+            self.prune()
+            with self._prune_lock:
+                if not self._prune_again:
+                    self._prune_thread = None
+                    return
+                self._prune_again = False
+
+    def prune_async(self) -> None:
+        with self._prune_lock:
+            if self._prune_thread is not None:
+                self._prune_again = True
+                return
+            self._prune_thread = Thread(
+                target=self._prune_worker, daemon=True
+            )
+            self._prune_thread.start()
+
+    def wait_for_prune(self) -> None:
+        with self._prune_lock:
+            thread = self._prune_thread
+        if thread is not None:
+            thread.join()
+
+    def migrate_legacy_backups(self) -> None:
+        # Backups used to be plain timestamped copies of the save folder
+        for path in sorted(self.root.iterdir(), key=lambda x: x.name):
+            match = LEGACY_BACKUP_RE.match(path.name)
+            if not path.is_dir() or not match:
+                continue
+            game, save, timestamp = match.groups()
+            self.snapshot(
+                game, save, path,
+                datetime.strptime(timestamp, TIMESTAMP_FORMAT),
+            )
+            shutil.rmtree(path)
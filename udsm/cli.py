@@ -0,0 +1,519 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+from threading import Event
+from typing import TYPE_CHECKING
+
+from .index import GAME_TITLES, GAMES, Game
+
+if TYPE_CHECKING:
+    from .diff import Change
+
+# Everything touching pyqt_utils, psutil or the SAVES store is imported inside
+# the commands. This keeps `--help` and argument errors instant and never
+# pulls in Qt.
+
+# How often to look for the game process while it's starting
+LAUNCH_POLL_INTERVAL = 0.2
+
+
+class CommandError(Exception):
+    pass
+
+
+def get_save_path(game: Game, override: str | None) -> Path:
+    from .config import get_config_value
+    if not (save_path := override or get_config_value(f"{game}_save_path")):
+        raise CommandError(f"No {GAME_TITLES[game]} SAVE path set")
+    if not Path(save_path).name.lower().endswith(game):
+        raise CommandError(
+            f"The {GAME_TITLES[game]} SAVE path does not end with '{game}'"
+        )
+    return Path(save_path)
+
+
+def get_game(name: str) -> Game:
+    from . import model
+    if (game := model.index.game_of(name)) is None:
+        raise CommandError(f"No SAVE named '{name}'")
+    return game
+
+
+def copy_save(game: Game, name: str, save_path: Path) -> None:
+    from . import model
+    if game == "undertale":
+        model.copy_undertale_save(name, save_path)
+    else:
+        model.copy_deltarune_save(name, save_path)
+
+
+def cmd_list(args: argparse.Namespace) -> None:
+    from . import model
+    results = (
+        model.build_search_index().search(args.search) if args.search
+        else None
+    )
+    for game in GAMES:
+        if args.game not in (None, game):
+            continue
+        for name in model.index.saves(game):
+            if results is not None and (game, name) not in results:
+                continue
+            line = name if args.game else f"{game}\t{name}"
+            if args.long:
+                line += f"\t{model.get_save_info(game, name).summary()}"
+            print(line)
+
+
+def cmd_apply(args: argparse.Namespace) -> None:
+    game = get_game(args.name)
+    copy_save(game, args.name, get_save_path(game, args.save_path))
+    print(f"Applied {GAME_TITLES[game]} SAVE '{args.name}'")
+
+
+def cmd_create(args: argparse.Namespace) -> None:
+    from . import model
+    name = args.name.strip()
+    path = Path(args.path)
+    if not name:
+        raise CommandError("Invalid name")
+    if model.index.name_taken(name):
+        raise CommandError(f"A SAVE named '{name}' already exists")
+    if not path.is_dir():
+        raise CommandError(f"'{path}' is not a directory")
+    if (game := args.game or model.detect_game(path)) is None:
+        raise CommandError(
+            f"Can't tell which game '{path}' belongs to, pass --game"
+        )
+    if game == "undertale":
+        model.create_undertale_save(name, path)
+    else:
+        model.create_deltarune_save(name, path)
+    print(f"Created {GAME_TITLES[game]} SAVE '{name}'")
+
+
+def cmd_delete(args: argparse.Namespace) -> None:
+    from . import model
+    game = get_game(args.name)
+    if game == "undertale":
+        model.delete_undertale_save(args.name)
+    else:
+        model.delete_deltarune_save(args.name)
+    print(f"Deleted {GAME_TITLES[game]} SAVE '{args.name}'")
+
+
+def cmd_rename(args: argparse.Namespace) -> None:
+    from . import model
+    game = get_game(args.name)
+    new_name = args.new_name.strip()
+    if not new_name:
+        raise CommandError("Invalid name")
+    if model.index.name_taken(new_name):
+        raise CommandError(f"A SAVE named '{new_name}' already exists")
+    if game == "undertale":
+        model.rename_undertale_save(args.name, new_name)
+    else:
+        model.rename_deltarune_save(args.name, new_name)
+    print(f"Renamed {GAME_TITLES[game]} SAVE '{args.name}' to '{new_name}'")
+
+
+def cmd_backup_list(args: argparse.Namespace) -> None:
+    from . import model
+    for snapshot in model.list_backups(args.game):
+        print(
+            f"{snapshot.name}\t{snapshot.created:%Y-%m-%d %H:%M:%S}\t"
+            f"{snapshot.size}"
+        )
+
+
+def cmd_backup_create(args: argparse.Namespace) -> None:
+    from . import model
+    save_path = get_save_path(args.game, args.save_path)
+    if not save_path.is_dir():
+        raise CommandError(f"'{save_path}' does not exist")
+    if (snapshot := model.backup_save(args.game, save_path)) is None:
+        print("Nothing changed since the last backup")
+    else:
+        print(snapshot.name)
+
+
+def cmd_backup_extract(args: argparse.Namespace) -> None:
+    from . import model
+    dest = Path(args.dest)
+    if dest.exists():
+        raise CommandError(f"'{dest}' already exists")
+    try:
+        model.extract_backup(args.name, dest)
+    except FileNotFoundError:
+        raise CommandError(f"No backup named '{args.name}'")
+    print(f"Extracted backup '{args.name}' to '{dest}'")
+
+
+def cmd_backup_restore(args: argparse.Namespace) -> None:
+    from . import model
+    try:
+        snapshot = model.backups.get(args.name)
+    except FileNotFoundError:
+        raise CommandError(f"No backup named '{args.name}'")
+    if (game := model.backup_game(snapshot)) is None:
+        raise CommandError(f"Backup '{args.name}' belongs to no known game")
+    model.restore_backup(args.name, get_save_path(game, args.save_path))
+    print(f"Restored {GAME_TITLES[game]} backup '{args.name}'")
+
+
+def format_change(change: "Change") -> str:
+    where = " ".join(filter(None, (
+        change.file, change.where, change.field and f"({change.field})"
+    )))
+    return f"{where}: {change.old or '-'} -> {change.new or '-'}"
+
+
+def cmd_diff(args: argparse.Namespace) -> None:
+    from . import model
+    game = get_game(args.name)
+    if args.other is None:
+        for snapshot, changes in model.diff_backups(game, args.name):
+            print(f"{snapshot.name}\t{len(changes)} changes")
+            if args.long:
+                for change in changes:
+                    print(f"    {format_change(change)}")
+        return
+    if (other_game := model.index.game_of(args.other)) is not None:
+        other = model.save_tree(other_game, args.other)
+    else:
+        try:
+            other = model.backup_tree(args.other)
+        except FileNotFoundError:
+            raise CommandError(f"No SAVE or backup named '{args.other}'")
+    for change in model.diff_saves(model.save_tree(game, args.name), other):
+        print(format_change(change))
+
+
+def cmd_pack_export(args: argparse.Namespace) -> None:
+    from . import model
+    saves = [(get_game(name), name) for name in args.names]
+    for name in args.playlists:
+        if name not in model.playlists:
+            raise CommandError(f"No playlist named '{name}'")
+    names = args.playlists
+    if not saves and not names:
+        saves = [
+            (game, name) for game in GAMES for name in model.index.saves(game)
+        ]
+        names = model.playlists.names()
+    model.export_pack(
+        args.path, saves, {name: model.playlists.get(name) for name in names}
+    )
+    print(f"Exported SAVE pack '{args.path}'")
+
+
+def cmd_pack_import(args: argparse.Namespace) -> None:
+    import zipfile
+
+    from . import model
+    try:
+        result = model.import_pack(args.path)
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise CommandError(f"Can't read SAVE pack '{args.path}': {e}")
+    failed = [save for save in result.saves if save.error]
+    for save in failed:
+        print(f"{save.name}: {save.error}", file=sys.stderr)
+    for name in model.import_playlists(result.playlists):
+        print(
+            f"{name}: A playlist with this name already exists",
+            file=sys.stderr,
+        )
+    print(
+        f"Imported {len(result.saves) - len(failed)} of "
+        f"{len(result.saves)} SAVES"
+    )
+
+
+def cmd_verify(args: argparse.Namespace) -> None:
+    from . import model
+    report = model.verify_library()
+    report.orphaned_entries = model.orphaned_entries()
+    if not (problems := report.problems()):
+        print("No problems found")
+        return
+    for problem in problems:
+        print(problem)
+    if not args.repair:
+        raise CommandError(
+            f"Found {len(problems)} problems, run with --repair to fix them"
+        )
+    result = model.repair_library(report)
+    result.removed_entries = model.remove_orphaned_entries(
+        report.orphaned_entries
+    )
+    for line in result.summary():
+        print(line)
+    if result.unrepaired:
+        raise CommandError(f"{len(result.unrepaired)} problems remain")
+
+
+def cmd_run_playlist(args: argparse.Namespace) -> None:
+    from . import model, processes
+    from .config import get_config_value
+    from .launch import Launch
+    if args.name not in model.playlists:
+        raise CommandError(f"No playlist named '{args.name}'")
+    playlist = model.playlists.get(args.name)
+    if not playlist:
+        raise CommandError(f"The playlist '{args.name}' is empty")
+    save_paths = {game: get_save_path(game, None) for game in GAMES}
+    file_paths: dict[Game, str] = {}
+    if not args.steam:
+        for game in GAMES:
+            if not (path := get_config_value(f"{game}_file_path")):
+                raise CommandError(
+                    f"No {GAME_TITLES[game]} file path set, or pass --steam"
+                )
+            file_paths[game] = path
+    proc_names = []
+    for game in GAMES:
+        if not (proc_name := get_config_value(f"{game}_proc_name")):
+            raise CommandError(f"No {GAME_TITLES[game]} process name set")
+        proc_names.append(proc_name)
+
+    def prepare(save: str) -> model.PreparedSave | None:
+        if (game := model.index.game_of(save)) is None:
+            return None
+        try:
+            return model.prepare_save(game, save, save_paths[game])
+        except (OSError, ValueError) as e:
+            print(f"Failed to prepare SAVE '{save}': {e}", file=sys.stderr)
+            return None
+
+    stop = Event()
+    prepared: model.PreparedSave | None = None
+    try:
+        for i, save in enumerate(playlist, 1):
+            if prepared is not None and prepared.name != save:
+                model.discard_prepared(prepared)
+                prepared = None
+            if (save_game := model.index.game_of(save)) is None:
+                print(f"Skipping missing SAVE '{save}'", file=sys.stderr)
+                continue
+            print(f"[{i}/{len(playlist)}] {save}")
+            try:
+                if prepared is not None:
+                    model.apply_prepared(prepared)
+                else:
+                    copy_save(save_game, save, save_paths[save_game])
+            except OSError as e:
+                print(f"Failed to apply SAVE '{save}': {e}", file=sys.stderr)
+                continue
+            finally:
+                prepared = None
+            if args.steam and save_game == "undertale":
+                model.launch_steam_ut()
+            elif args.steam:
+                model.launch_steam_dr()
+            else:
+                model.launch_file(file_paths[save_game])
+            launch = Launch(save_game)
+            # Stage the next SAVE while the game is starting
+            if i < len(playlist):
+                prepared = prepare(playlist[i])
+            while launch.update(
+                processes.find_pid(proc_names) is not None
+            ) == "launched":
+                time.sleep(LAUNCH_POLL_INTERVAL)
+            if launch.state == "timed_out":
+                print(
+                    f"The game didn't start within {launch.timeout:.0f} "
+                    f"seconds, skipping SAVE '{save}'",
+                    file=sys.stderr,
+                )
+                continue
+            while (pid := processes.find_pid(proc_names)) is not None:
+                processes.wait_for_exit(pid, stop)
+    finally:
+        if prepared is not None:
+            model.discard_prepared(prepared)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="udsm-cli",
+        description="Manage UNDERTALE/deltarune SAVES without the GUI.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="List SAVES")
+    list_parser.add_argument("--game", choices=GAMES)
+    list_parser.add_argument(
+        "-l", "--long", action="store_true",
+        help="Also show the character, LOVE, room and play time",
+    )
+    list_parser.add_argument(
+        "-s", "--search", metavar="QUERY",
+        help="Only list matching SAVES, e.g. 'room:31 love:>10'",
+    )
+    list_parser.set_defaults(func=cmd_list)
+
+    apply_parser = commands.add_parser("apply", help="Apply a SAVE")
+    apply_parser.add_argument("name")
+    apply_parser.add_argument(
+        "--save-path", help="Game SAVE folder, defaults to the configured one"
+    )
+    apply_parser.set_defaults(func=cmd_apply)
+
+    create_parser = commands.add_parser(
+        "create", help="Create a SAVE from a folder"
+    )
+    create_parser.add_argument("name")
+    create_parser.add_argument("path")
+    create_parser.add_argument(
+        "--game", choices=GAMES, help="Detected from the files if omitted"
+    )
+    create_parser.set_defaults(func=cmd_create)
+
+    delete_parser = commands.add_parser("delete", help="Delete a SAVE")
+    delete_parser.add_argument("name")
+    delete_parser.set_defaults(func=cmd_delete)
+
+    rename_parser = commands.add_parser("rename", help="Rename a SAVE")
+    rename_parser.add_argument("name")
+    rename_parser.add_argument("new_name")
+    rename_parser.set_defaults(func=cmd_rename)
+
+    backup_parser = commands.add_parser("backup", help="Manage backups")
+    backup_commands = backup_parser.add_subparsers(
+        dest="backup_command", required=True
+    )
+    backup_list_parser = backup_commands.add_parser(
+        "list", help="List backups, newest first"
+    )
+    backup_list_parser.add_argument("--game", choices=GAMES)
+    backup_list_parser.set_defaults(func=cmd_backup_list)
+    backup_create_parser = backup_commands.add_parser(
+        "create", help="Back up the current game SAVE folder"
+    )
+    backup_create_parser.add_argument("game", choices=GAMES)
+    backup_create_parser.add_argument("--save-path")
+    backup_create_parser.set_defaults(func=cmd_backup_create)
+    backup_extract_parser = backup_commands.add_parser(
+        "extract", help="Extract a backup into a new folder"
+    )
+    backup_extract_parser.add_argument("name")
+    backup_extract_parser.add_argument("dest")
+    backup_extract_parser.set_defaults(func=cmd_backup_extract)
+    backup_restore_parser = backup_commands.add_parser(
+        "restore", help="Put a backup back into the game SAVE folder"
+    )
+    backup_restore_parser.add_argument("name")
+    backup_restore_parser.add_argument("--save-path")
+    backup_restore_parser.set_defaults(func=cmd_backup_restore)
+
+    diff_parser = commands.add_parser(
+        "diff", help="Show how a SAVE differs from another SAVE or backup"
+    )
+    diff_parser.add_argument("name")
+    diff_parser.add_argument(
+        "other", nargs="?",
+        help="SAVE or backup name, compares with every backup if omitted",
+    )
+    diff_parser.add_argument(
+        "-l", "--long", action="store_true",
+        help="Show the changes to every backup, not only their number",
+    )
+    diff_parser.set_defaults(func=cmd_diff)
+
+    pack_parser = commands.add_parser(
+        "pack", help="Share SAVES and playlists as a single file"
+    )
+    pack_commands = pack_parser.add_subparsers(
+        dest="pack_command", required=True
+    )
+    pack_export_parser = pack_commands.add_parser(
+        "export", help="Export SAVES into a SAVE pack"
+    )
+    pack_export_parser.add_argument("path")
+    pack_export_parser.add_argument(
+        "names", nargs="*",
+        help="SAVES to export, everything if neither these nor playlists "
+        "are given",
+    )
+    pack_export_parser.add_argument(
+        "-p", "--playlist", action="append", default=[], dest="playlists",
+        metavar="NAME", help="Also export a playlist and its SAVES",
+    )
+    pack_export_parser.set_defaults(func=cmd_pack_export)
+    pack_import_parser = pack_commands.add_parser(
+        "import", help="Import the SAVES and playlists of a SAVE pack"
+    )
+    pack_import_parser.add_argument("path")
+    pack_import_parser.set_defaults(func=cmd_pack_import)
+
+    verify_parser = commands.add_parser(
+        "verify", help="Check SAVES, backups and playlists for corruption"
+    )
+    verify_parser.add_argument(
+        "--repair", action="store_true",
+        help="Restore files from backups or pre-made SAVES, remove missing "
+        "SAVES from playlists and fix the reference counts",
+    )
+    verify_parser.set_defaults(func=cmd_verify)
+
+    run_parser = commands.add_parser(
+        "run-playlist", help="Apply and play every SAVE of a playlist"
+    )
+    run_parser.add_argument("name")
+    run_parser.add_argument(
+        "--steam", action="store_true", help="Launch the games through Steam"
+    )
+    run_parser.set_defaults(func=cmd_run_playlist)
+    return parser
+
+
+def setup() -> None:
+    import pyqt_utils
+    pyqt_utils.init_app("ut-dr-save-manager", __file__)
+
+    from . import model
+    from .config import (DEFAULT_CONFIG, get_config_value, init_config,
+                         set_config_value)
+    from .paths import BACKUP_PATH, DELTARUNE_SAVES_PATH, UNDERTALE_SAVES_PATH
+    init_config(DEFAULT_CONFIG)
+    UNDERTALE_SAVES_PATH.mkdir(parents=True, exist_ok=True)
+    DELTARUNE_SAVES_PATH.mkdir(parents=True, exist_ok=True)
+    BACKUP_PATH.mkdir(parents=True, exist_ok=True)
+    # Scans every SAVE folder, only needed once after updating
+    if not get_config_value("migrated_saves"):
+        model.migrate_legacy_saves()
+        set_config_value("migrated_saves", True)
+    # Clearing the key on every start would rewrite the config each time
+    if model.migrate_legacy_playlists(get_config_value("playlists")):
+        set_config_value("playlists", {})
+    # Only prune when a command adds a backup, listing should stay fast
+    model.set_backup_policy(
+        get_config_value("backup_keep_last"),
+        get_config_value("backup_keep_days"),
+        get_config_value("backup_max_bytes"),
+        get_config_value("backup_keep_auto"),
+        prune=False,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    setup()
+    from . import model
+    try:
+        args.func(args)
+        # Don't let the daemon prune thread die halfway through
+        model.backups.wait_for_prune()
+    # ValueError covers corrupt manifests and backups of unknown games
+    except (CommandError, OSError, ValueError) as e:
+        print(f"udsm-cli: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
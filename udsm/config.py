@@ -0,0 +1,184 @@
+import atexit
+import json
+from pathlib import Path
+from platform import system
+from threading import Lock, Timer
+from typing import Any
+
+from .store import atomic_write
+
+# Writes are collected for this long before they go to disk
+WRITE_DELAY = 1.0
+
+
+def get_default_undertale_save_path() -> str:
+    match system():
+        case "Linux":
+            return str((
+                Path.home() / ".config" / "UNDERTALE"
+            ).absolute().resolve())
+        case "Windows":
+            return str((
+                Path.home() / "AppData" / "Local" / "UNDERTALE"
+            ).absolute().resolve())
+        case "Darwin":
+            return str(
+                (
+                    Path.home() / "Library" / "Application Support" /
+                    "com.tobyfox.undertale"
+                ).absolute().resolve()
+            )
+        case _:
+            return ""
+
+
+def get_default_deltarune_save_path() -> str:
+    match system():
+        case "Linux":
+            return ""
+        case "Windows":
+            return str((
+                Path.home() / "AppData" / "Local" / "DELTARUNE"
+            ).absolute().resolve())
+        case "Darwin":
+            return str(
+                (
+                    Path.home() / "Library" / "Application Support" /
+                    "com.tobyfox.deltarune"
+                ).absolute().resolve()
+            )
+        case _:
+            return ""
+
+
+def get_default_undertale_proc_name() -> str:
+    match system():
+        case "Linux":
+            return "runner"
+        case "Windows":
+            return "UNDERTALE.exe"
+        case _:
+            return ""
+
+
+def get_default_deltarune_proc_name() -> str:
+    match system():
+        case "Linux":
+            return "DELTARUNE.exe"
+        case "Windows":
+            return "DELTARUNE.exe"
+        case _:
+            return ""
+
+
+DEFAULT_CONFIG: dict[
+    str, bool | int | str | list[str] | list[float] | dict[str, list[str]]
+] = {
+    "first_startup": True,
+    "theme": "",
+    "undertale_file_path": "",
+    "deltarune_file_path": "",
+    "undertale_save_path": get_default_undertale_save_path(),
+    "deltarune_save_path": get_default_deltarune_save_path(),
+    "deltarune_saves": [],
+    "undertale_saves": [],
+    "playlists": {},
+    "undertale_proc_name": get_default_undertale_proc_name(),
+    "deltarune_proc_name": get_default_deltarune_proc_name(),
+    "backup_keep_last": 50,
+    "backup_keep_days": 14,
+    "backup_max_bytes": 256 * 1024 * 1024,
+    "backup_keep_auto": 20,
+    "launch_timeout": 60,
+    "auto_snapshot": False,
+    "migrated_saves": False,
+    "verify_interval_days": 7,
+    "last_verify": 0,
+    "undertale_launch_latencies": [],
+    "deltarune_launch_latencies": [],
+}
+
+
+# In-memory copy of the config. Reads never touch the disk and writes are
+# coalesced, so typing into a path field writes the config once instead of
+# once per character. A flush merges the changed keys into the file and
+# replaces it in one write.
+class ConfigStore:
+    def __init__(self, delay: float = WRITE_DELAY) -> None:
+        self.delay = delay
+        self.lock = Lock()
+        self.path: Path | None = None
+        self._values: dict[str, Any] = {}
+        self._dirty: set[str] = set()
+        self._timer: Timer | None = None
+
+    def init(self, defaults: dict[str, Any], path: Path) -> None:
+        with self.lock:
+            self.path = path
+            try:
+                values = json.loads(path.read_text("utf-8"))
+            except FileNotFoundError:
+                # The config used to be kept by pyqt_utils.config
+                from pyqt_utils import config
+                config.init_config(defaults)
+                values = {
+                    key: config.get_config_value(key) for key in defaults
+                }
+                self._dirty.update(values)
+            except ValueError:
+                values = {}
+            self._values = {**defaults, **values}
+        self.flush()
+        atexit.register(self.flush)
+
+    def get(self, key: str) -> Any:
+        with self.lock:
+            return self._values.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        with self.lock:
+            self._values[key] = value
+            self._dirty.add(key)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty or self.path is None:
+                return
+            # Keys written by another instance in the meantime are kept
+            try:
+                values = json.loads(self.path.read_text("utf-8"))
+            except (OSError, ValueError):
+                values = {}
+            values.update((key, self._values[key]) for key in self._dirty)
+            atomic_write(
+                self.path, json.dumps(values, indent=2).encode("utf-8")
+            )
+            self._dirty.clear()
+
+
+store = ConfigStore()
+
+
+def init_config(defaults: dict[str, Any]) -> None:
+    from .paths import CONFIG_PATH
+    store.init(defaults, CONFIG_PATH)
+
+
+def get_config_value(key: str) -> Any:
+    return store.get(key)
+
+
+def set_config_value(key: str, value: Any) -> None:
+    store.set(key, value)
+
+
+def flush_config() -> None:
+    store.flush()
@@ -0,0 +1,123 @@
+from configparser import ConfigParser, Error
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Iterator
+
+from .saveformat import (DELTARUNE_FILE_RE, DELTARUNE_LINES, UNDERTALE_FILE_RE,
+                         UNDERTALE_LINES)
+from .store import Manifest, ObjectStore
+
+# Parsed files kept around, diffing against many backups mostly reads the
+# same few blobs again
+MAX_CACHED = 1024
+
+type Tree = tuple[ObjectStore, Manifest]
+type Parsed = list[str] | dict[str, str]
+
+
+@dataclass(frozen=True)
+class Change:
+    file: str
+    where: str  # "line 548" or "General.Kills", empty for the whole file
+    field: str | None
+    old: str | None  # None if it doesn't exist on that side
+    new: str | None
+
+
+def _line_fields(name: str) -> dict[int, str]:
+    if UNDERTALE_FILE_RE.match(name):
+        return {line: field for field, line in UNDERTALE_LINES.items()}
+    if DELTARUNE_FILE_RE.match(name):
+        return {line: field for field, line in DELTARUNE_LINES.items()}
+    return {}
+
+
+# Keeps the case of keys, ConfigParser lowercases them
+class _CaseParser(ConfigParser):
+    def optionxform(self, optionstr: str) -> str:
+        return optionstr
+
+
+def _parse_ini(text: str) -> dict[str, str] | None:
+    parser = _CaseParser(interpolation=None)
+    try:
+        parser.read_string(text)
+    except Error:
+        return None
+    return {
+        f"{section}.{key}": value.strip('"')
+        for section in parser.sections()
+        for key, value in parser[section].items()
+    }
+
+
+def _diff_lines(rel: str, old: list[str], new: list[str]) -> Iterator[Change]:
+    # Save files keep every value on a fixed line, so lines are compared by
+    # position instead of looking for insertions
+    fields = _line_fields(PurePosixPath(rel).name.lower())
+    for i in range(max(len(old), len(new))):
+        a = old[i] if i < len(old) else None
+        b = new[i] if i < len(new) else None
+        if a == b:
+            continue
+        total = len(new) if b is not None else len(old)
+        field = fields.get(i + 1) or fields.get(i - total)
+        yield Change(rel, f"line {i + 1}", field, a, b)
+
+
+def _diff_keys(
+    rel: str, old: dict[str, str], new: dict[str, str]
+) -> Iterator[Change]:
+    for key in sorted(old.keys() | new.keys()):
+        if (a := old.get(key)) != (b := new.get(key)):
+            yield Change(rel, key, None, a, b)
+
+
+def _as_lines(parsed: Parsed) -> list[str]:
+    if isinstance(parsed, dict):
+        return [f"{key}={value}" for key, value in parsed.items()]
+    return parsed
+
+
+# Compares SAVE trees file by file. Files with the same hash are skipped
+# without being read, the others are compared line by line or, for ini
+# files, key by key.
+class SaveDiffer:
+    def __init__(self) -> None:
+        # The same blob parses differently as an ini and as plain lines
+        self._cache: dict[tuple[str, bool], Parsed] = {}
+
+    def _parse(self, objects: ObjectStore, digest: str, ini: bool) -> Parsed:
+        if (parsed := self._cache.get((digest, ini))) is None:
+            text = objects.read(digest).decode("utf-8", "replace")
+            parsed = (_parse_ini(text) if ini else None) or [
+                line.strip() for line in text.splitlines()
+            ]
+            if len(self._cache) >= MAX_CACHED:
+                self._cache.clear()
+            self._cache[digest, ini] = parsed
+        return parsed
+
+    def diff(self, old: Tree, new: Tree) -> Iterator[Change]:
+        old_objects, old_files = old
+        new_objects, new_files = new
+        for rel in sorted(old_files.keys() | new_files.keys()):
+            a, b = old_files.get(rel), new_files.get(rel)
+            if a == b:
+                continue
+            if a is None or b is None:
+                yield Change(
+                    rel, "", None,
+                    None if a is None else "exists",
+                    None if b is None else "exists",
+                )
+                continue
+            ini = rel.lower().endswith(".ini")
+            old_parsed = self._parse(old_objects, a, ini)
+            new_parsed = self._parse(new_objects, b, ini)
+            if isinstance(old_parsed, dict) and isinstance(new_parsed, dict):
+                yield from _diff_keys(rel, old_parsed, new_parsed)
+            else:
+                yield from _diff_lines(
+                    rel, _as_lines(old_parsed), _as_lines(new_parsed)
+                )
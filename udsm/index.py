@@ -0,0 +1,119 @@
+from bisect import bisect_left, insort
+from pathlib import Path
+from threading import RLock
+from typing import Literal
+
+type Game = Literal["undertale", "deltarune"]
+
+GAMES: tuple[Game, ...] = ("undertale", "deltarune")
+GAME_TITLES: dict[Game, str] = {
+    "undertale": "UNDERTALE",
+    "deltarune": "deltarune",
+}
+
+
+def scan_saves(saves_path: Path) -> list[str]:
+    return sorted(
+        path.name.removesuffix(".json") for path in saves_path.iterdir()
+        if path.is_file() and path.suffix == ".json"
+    )
+
+
+# In-memory view of the SAVES folders. Mutators in model keep it up to date,
+# anything else (e.g. a file system watcher) calls invalidate().
+class SaveIndex:
+    def __init__(self, paths: dict[Game, Path]) -> None:
+        self.paths = paths
+        self.lock = RLock()
+        self._saves: dict[Game, list[str]] | None = None
+        self._games: dict[str, Game] = {}
+        self._lower: dict[str, int] = {}
+        self._mtimes: dict[Game, int] = {}
+
+    def _mtime(self, game: Game) -> int:
+        try:
+            return self.paths[game].stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self._saves = None
+
+    # Cheap check for watchers, our own mutations don't count as a change
+    def invalidate_if_changed(self) -> bool:
+        with self.lock:
+            if self._saves is None:
+                return True
+            if any(
+                self._mtimes.get(game) != self._mtime(game)
+                for game in self.paths
+            ):
+                self._saves = None
+                return True
+            return False
+
+    def _load(self) -> dict[Game, list[str]]:
+        with self.lock:
+            if self._saves is None:
+                saves: dict[Game, list[str]] = {}
+                self._games.clear()
+                self._lower.clear()
+                for game, path in self.paths.items():
+                    self._mtimes[game] = self._mtime(game)
+                    saves[game] = scan_saves(path)
+                    for name in saves[game]:
+                        self._add_lookup(game, name)
+                # Only publish a complete scan, a failed one is retried
+                self._saves = saves
+            return self._saves
+
+    def _add_lookup(self, game: Game, name: str) -> None:
+        self._games[name] = game
+        lower = name.lower()
+        self._lower[lower] = self._lower.get(lower, 0) + 1
+
+    def _remove_lookup(self, name: str) -> None:
+        self._games.pop(name, None)
+        lower = name.lower()
+        count = self._lower.get(lower, 0) - 1
+        if count > 0:
+            self._lower[lower] = count
+        else:
+            self._lower.pop(lower, None)
+
+    def saves(self, game: Game) -> list[str]:
+        with self.lock:
+            return self._load()[game].copy()
+
+    def game_of(self, name: str) -> Game | None:
+        with self.lock:
+            self._load()
+            return self._games.get(name)
+
+    def name_taken(self, name: str) -> bool:
+        with self.lock:
+            self._load()
+            return name.lower() in self._lower
+
+    def add(self, game: Game, name: str) -> None:
+        with self.lock:
+            saves = self._load()[game]
+            if self._games.get(name) != game:
+                insort(saves, name)
+                self._add_lookup(game, name)
+            self._mtimes[game] = self._mtime(game)
+
+    def remove(self, game: Game, name: str) -> None:
+        with self.lock:
+            saves = self._load()[game]
+            i = bisect_left(saves, name)
+            if i < len(saves) and saves[i] == name:
+                saves.pop(i)
+                self._remove_lookup(name)
+            self._mtimes[game] = self._mtime(game)
+
+    def rename(self, game: Game, name: str, new_name: str) -> None:
+        with self.lock:
+            self.remove(game, name)
+            self.add(game, new_name)
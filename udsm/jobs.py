@@ -0,0 +1,81 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Event, Lock
+from typing import Any, Callable
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, description: str) -> None:
+        self.description = description
+        self.future: Future[Any] = Future()
+        self._cancel_event = Event()
+        self._progress_callbacks: list[Callable[[int, int], None]] = []
+
+    def on_progress(self, callback: Callable[[int, int], None]) -> None:
+        self._progress_callbacks.append(callback)
+
+    def report(self, done: int, total: int) -> None:
+        for callback in self._progress_callbacks:
+            callback(done, total)
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+        self.future.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.description)
+
+
+# Runs file system work off the GUI thread. Jobs sharing a key (e.g. the game
+# whose save folder they write to) never run at the same time.
+class JobRunner:
+    def __init__(self, max_workers: int = 4) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="udsm-job"
+        )
+        self._locks: dict[str, Lock] = {}
+        self._locks_lock = Lock()
+
+    def _lock(self, key: str) -> Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, Lock())
+
+    def submit(
+        self,
+        description: str,
+        fn: Callable[[Job], Any],
+        key: str | None = None,
+    ) -> Job:
+        job = Job(description)
+
+        def run() -> None:
+            if not job.future.set_running_or_notify_cancel():
+                return
+            try:
+                if key is None:
+                    result = fn(job)
+                else:
+                    with self._lock(key):
+                        job.check_cancelled()
+                        result = fn(job)
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+
+        self._executor.submit(run)
+        return job
+
+    def shutdown(self, cancel: bool = False) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+
+
+runner = JobRunner()
@@ -0,0 +1,55 @@
+from time import monotonic
+from typing import Literal
+
+from .config import get_config_value, set_config_value
+from .index import Game
+
+type LaunchState = Literal["launched", "running", "exited", "timed_out"]
+
+# The launch timeout adapts to how long the game took to show up recently,
+# within these bounds. The upper bound is the launch_timeout config value.
+MIN_LAUNCH_TIMEOUT = 15.0
+LATENCY_MARGIN = 3.0
+LATENCY_SAMPLES = 10
+
+
+def launch_timeout(game: Game) -> float:
+    limit = float(get_config_value("launch_timeout"))
+    if not (latencies := get_config_value(f"{game}_launch_latencies")):
+        return limit
+    adaptive = float(max(latencies)) * LATENCY_MARGIN
+    return min(limit, max(MIN_LAUNCH_TIMEOUT, adaptive))
+
+
+def record_latency(game: Game, latency: float) -> None:
+    key = f"{game}_launch_latencies"
+    latencies = list(get_config_value(key)) + [round(latency, 2)]
+    set_config_value(key, latencies[-LATENCY_SAMPLES:])
+
+
+# Tracks one launch of a game: launched -> running once its process shows
+# up -> exited once it's gone. If the process never shows up within the
+# timeout the launch is considered failed.
+class Launch:
+    def __init__(self, game: Game, timeout: float | None = None) -> None:
+        self.game = game
+        self.timeout = launch_timeout(game) if timeout is None else timeout
+        self.state: LaunchState = "launched"
+        self.started = monotonic()
+        self.latency: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("exited", "timed_out")
+
+    def update(self, running: bool) -> LaunchState:
+        match self.state:
+            case "launched" if running:
+                self.state = "running"
+                self.latency = monotonic() - self.started
+                record_latency(self.game, self.latency)
+            case "launched" if monotonic() - self.started >= self.timeout:
+                self.state = "timed_out"
+            case "running" if not running:
+                self.state = "exited"
+        return self.state
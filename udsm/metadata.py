@@ -0,0 +1,128 @@
+import sqlite3
+from dataclasses import astuple
+from pathlib import Path
+from threading import Lock
+from typing import Iterable
+
+from .saveformat import SaveInfo
+
+SCHEMA_VERSION = 1
+
+type Row = tuple[int, int, SaveInfo]
+
+
+# Parsed SAVE metadata keyed by SAVE path, size and mtime, so SAVES only
+# have to be parsed again after they changed. All rows are loaded into memory
+# on first use, writes go through to the database.
+class MetadataCache:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock = Lock()
+        self._db: sqlite3.Connection | None = None
+        self._rows: dict[str, Row] | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            # Losing the last writes on power loss is fine for a cache
+            db.execute("PRAGMA synchronous=NORMAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != (
+                SCHEMA_VERSION
+            ):
+                db.execute("DROP TABLE IF EXISTS saves")
+                db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS saves ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, "
+                "name TEXT, love INTEGER, room INTEGER, kills INTEGER, "
+                "playtime REAL, chapter INTEGER)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _load(self) -> dict[str, Row]:
+        if self._rows is None:
+            try:
+                rows = self._connect().execute("SELECT * FROM saves")
+                self._rows = {
+                    path: (size, mtime, SaveInfo(*info))
+                    for path, size, mtime, *info in rows
+                }
+            except sqlite3.Error:
+                self._rows = {}
+        return self._rows
+
+    def get(self, path: str, size: int, mtime: int) -> SaveInfo | None:
+        with self.lock:
+            row = self._load().get(path)
+        if row is None or row[:2] != (size, mtime):
+            return None
+        return row[2]
+
+    def put_many(self, rows: Iterable[tuple[str, Row]]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        with self.lock:
+            self._load().update(rows)
+            try:
+                with self._connect() as db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO saves VALUES "
+                        "(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (path, size, mtime, *astuple(info))
+                            for path, (size, mtime, info) in rows
+                        ],
+                    )
+            except sqlite3.Error:
+                pass  # It's only a cache
+
+    def put(self, path: str, size: int, mtime: int, info: SaveInfo) -> None:
+        self.put_many([(path, (size, mtime, info))])
+
+    def delete_many(self, paths: Iterable[str]) -> None:
+        with self.lock:
+            rows = self._load()
+            paths = [path for path in paths if rows.pop(path, None)]
+            if not paths:
+                return
+            try:
+                with self._connect() as db:
+                    db.executemany(
+                        "DELETE FROM saves WHERE path = ?",
+                        [(path,) for path in paths],
+                    )
+            except sqlite3.Error:
+                pass
+
+    def delete(self, path: str) -> None:
+        self.delete_many([path])
+
+    def rename(self, path: str, new_path: str) -> None:
+        with self.lock:
+            rows = self._load()
+            if (row := rows.pop(path, None)) is None:
+                return
+            rows[new_path] = row
+            try:
+                with self._connect() as db:
+                    db.execute(
+                        "UPDATE OR REPLACE saves SET path = ? WHERE path = ?",
+                        (new_path, path),
+                    )
+            except sqlite3.Error:
+                pass
+
+    def paths(self) -> set[str]:
+        with self.lock:
+            return set(self._load())
+
+    def close(self) -> None:
+        with self.lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,101 +1,867 @@
 import shutil
-from datetime import datetime
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import cache
+from itertools import chain, count
 from pathlib import Path
 from subprocess import getoutput
-from threading import Thread
+from threading import RLock, Thread
+from typing import Callable, Iterator
+
+from .backups import BackupArchive, RetentionPolicy, Snapshot
+from .diff import Change, SaveDiffer, Tree
+from .index import GAME_TITLES, GAMES, Game, SaveIndex
+from .metadata import MetadataCache, Row
+from .packs import Pack, PackSave, read_pack, unpack_objects, write_pack
+from .paths import (BACKUP_PATH, DELTARUNE_SAVES_PATH, METADATA_PATH,
+                    OBJECTS_PATH, PLAYLISTS_PATH, PREMADE_PATH,
+                    UNDERTALE_SAVES_PATH)
+from .playlists import PlaylistStore
+from .saveformat import SaveInfo, read_info
+from .search import SearchIndex
+from .staging import prefetch_path, stage_tree, swap_in
+from .store import (Manifest, ObjectStore, hash_file, read_manifest,
+                    write_manifest)
+from .verify import (ORPHAN_GRACE, RepairResult, VerifyReport, check_objects,
+                     count_backup_refs, count_refs, hash_tree)
+
+SAVES_PATHS: dict[Game, Path] = {
+    "undertale": UNDERTALE_SAVES_PATH,
+    "deltarune": DELTARUNE_SAVES_PATH,
+}
+BACKUP_PREFIXES: dict[Game, str] = {
+    "undertale": "UNDERTALE",
+    "deltarune": "DELTARUNE",
+}
+
+_objects = ObjectStore(OBJECTS_PATH)
+backups = BackupArchive(BACKUP_PATH, RetentionPolicy())
+index = SaveIndex(SAVES_PATHS)
+metadata = MetadataCache(METADATA_PATH)
+playlists = PlaylistStore(PLAYLISTS_PATH)
+# Held by jobs that keep references the manifests don't list, like a pack
+# export, or that take a while to reference what they added. repair_library()
+# recounts the references from the manifests and must not run meanwhile.
+_library_lock = RLock()
+
+
+def _manifest_path(game: Game, name: str) -> Path:
+    return SAVES_PATHS[game] / f"{name}.json"
+
+
+def _copy_save(game: Game, name: str, save_path: Path | str) -> None:
+    save_path = Path(save_path)
+    manifest = read_manifest(_manifest_path(game, name))
+    staged = stage_tree(_objects, manifest, save_path)
+    _swap_staged(game, name, staged, save_path)
+
+
+def _swap_staged(
+    game: Game, name: str, staged: Path, save_path: Path
+) -> None:
+    try:
+        if save_path.is_dir():
+            backups.snapshot(BACKUP_PREFIXES[game], name, save_path)
+        old = swap_in(staged, save_path)
+    except BaseException:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+@dataclass
+class PreparedSave:
+    game: Game
+    name: str
+    save_path: Path
+    staged: Path
+    manifest: Manifest
+
+
+# Stages a SAVE next to the save path ahead of time, e.g. while the game is
+# still running, so applying it later is only a swap
+def prepare_save(
+    game: Game, name: str, save_path: Path | str
+) -> PreparedSave:
+    save_path = Path(save_path)
+    manifest = read_manifest(_manifest_path(game, name))
+    staged = stage_tree(
+        _objects, manifest, save_path, prefetch_path(save_path)
+    )
+    try:
+        for rel, digest in manifest.items():
+            if hash_file(staged / rel) != digest:
+                raise ValueError(f"SAVE '{name}' has a corrupt file '{rel}'")
+    except BaseException:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    return PreparedSave(game, name, save_path, staged, manifest)
+
+
+def apply_prepared(prepared: PreparedSave) -> None:
+    game, name = prepared.game, prepared.name
+    try:
+        current = read_manifest(_manifest_path(game, name))
+    except FileNotFoundError:
+        discard_prepared(prepared)
+        raise
+    if current != prepared.manifest or not prepared.staged.is_dir():
+        # The SAVE changed since it was prepared
+        discard_prepared(prepared)
+        _copy_save(game, name, prepared.save_path)
+    else:
+        _swap_staged(game, name, prepared.staged, prepared.save_path)
+
+
+def discard_prepared(prepared: PreparedSave) -> None:
+    shutil.rmtree(prepared.staged, ignore_errors=True)
+
+
+def _create_save(game: Game, name: str, path: Path | str) -> None:
+    manifest_path = _manifest_path(game, name)
+    if manifest_path.exists():
+        raise FileExistsError(manifest_path)
+    path = Path(path)
+    if not path.is_dir():
+        raise NotADirectoryError(path)
+    # Copying the blobs doesn't need the store lock, only registering does
+    manifest = _objects.put_tree(path)
+    with _objects.lock:
+        if manifest_path.exists() or index.name_taken(name):
+            raise FileExistsError(manifest_path)
+        for rel, digest in manifest.items():
+            if not _objects.has(digest):
+                # Dropped by a concurrent delete in the meantime
+                manifest[rel] = _objects.put_file(path / rel)
+        write_manifest(manifest_path, manifest)
+        _objects.incref(manifest.values())
+        index.add(game, name)
+    metadata.delete(str(manifest_path))
+
+
+def _delete_save(game: Game, name: str) -> None:
+    manifest_path = _manifest_path(game, name)
+    with _objects.lock:
+        try:
+            manifest = read_manifest(manifest_path)
+            manifest_path.unlink()
+        except FileNotFoundError:
+            index.remove(game, name)
+            return
+        index.remove(game, name)
+        _objects.decref(manifest.values())
+    metadata.delete(str(manifest_path))
+
+
+def _rename_save(game: Game, name: str, new_name: str) -> None:
+    new_path = _manifest_path(game, new_name)
+    with _objects.lock:
+        if new_path.exists():
+            return
+        try:
+            _manifest_path(game, name).rename(new_path)
+        except FileNotFoundError:
+            index.remove(game, name)
+            return
+        index.rename(game, name, new_name)
+    # A rename keeps size and mtime, so the cached row stays valid
+    metadata.rename(str(_manifest_path(game, name)), str(new_path))
+
+
+def _already_migrated(game: Game, name: str, path: Path) -> bool:
+    try:
+        manifest = read_manifest(_manifest_path(game, name))
+    except (OSError, ValueError, KeyError):
+        return False
+    return manifest == {
+        file.relative_to(path).as_posix(): hash_file(file)
+        for file in path.rglob("*") if file.is_file()
+    }
+
+
+# Names are unique across both games, so e.g. a deltarune SAVE named like an
+# UNDERTALE one is imported as "King (deltarune)"
+def _free_name(game: Game, name: str) -> str:
+    candidates = chain(
+        [name, f"{name} ({game})"],
+        (f"{name} ({game} {i})" for i in count(2)),
+    )
+    return next(
+        candidate for candidate in candidates
+        if not index.name_taken(candidate)
+        and not _manifest_path(game, candidate).exists()
+    )
+
 
-import psutil
-from pyqt_utils.utils import open_file
+def migrate_legacy_saves() -> None:
+    # SAVES used to be stored as plain directories
+    for game, saves_path in SAVES_PATHS.items():
+        for path in saves_path.iterdir():
+            if not path.is_dir():
+                continue
+            # Left behind by an interrupted migration
+            if not _already_migrated(game, path.name, path):
+                _create_save(game, _free_name(game, path.name), path)
+            shutil.rmtree(path)
 
-from .paths import BACKUP_PATH, DELTARUNE_SAVES_PATH, UNDERTALE_SAVES_PATH
+
+def migrate_legacy_playlists(legacy: dict[str, list[str]]) -> bool:
+    return bool(legacy) and playlists.migrate(legacy)
 
 
 def get_undertale_saves() -> list[str]:
-    return list(map(str, map(
-        lambda x: x.stem,
-        sorted(UNDERTALE_SAVES_PATH.iterdir(), key=lambda x: x.name)
-    )))
+    return index.saves("undertale")
 
 
 def get_deltarune_saves() -> list[str]:
-    return list(map(str, map(
-        lambda x: x.stem,
-        sorted(DELTARUNE_SAVES_PATH.iterdir(), key=lambda x: x.name)
-    )))
+    return index.saves("deltarune")
 
 
-def copy_undertale_save(name: str, save_path: Path | str) -> None:
+def _parse_save_info(game: Game, name: str) -> SaveInfo:
     try:
-        shutil.move(save_path, BACKUP_PATH / datetime.now().strftime(
-            f"UNDERTALE_{name}_%Y-%m-%d_%H-%M-%S"))
-        shutil.copytree(UNDERTALE_SAVES_PATH / name, save_path)
-    except (FileExistsError, FileNotFoundError, shutil.Error):
-        pass
+        manifest = read_manifest(_manifest_path(game, name))
+    except (OSError, ValueError, KeyError):
+        return SaveInfo()
+    # Blobs are stored uncompressed, so they're parsed in place
+    return read_info(game, {
+        rel: _objects.object_path(digest) for rel, digest in manifest.items()
+    })
 
 
-def copy_deltarune_save(name: str, save_path: Path | str) -> None:
+def get_save_info(game: Game, name: str) -> SaveInfo:
+    path = _manifest_path(game, name)
     try:
-        shutil.move(save_path, BACKUP_PATH / datetime.now().strftime(
-            f"DELTARUNE_{name}_%Y-%m-%d_%H-%M-%S"))
-        shutil.copytree(DELTARUNE_SAVES_PATH / name, save_path)
-    except (FileExistsError, FileNotFoundError, shutil.Error):
-        pass
+        stat = path.stat()
+    except OSError:
+        return SaveInfo()
+    info = metadata.get(str(path), stat.st_size, stat.st_mtime_ns)
+    if info is None:
+        info = _parse_save_info(game, name)
+        metadata.put(str(path), stat.st_size, stat.st_mtime_ns, info)
+    return info
+
+
+def cache_save_infos(
+    cancelled: Callable[[], bool] | None = None, batch_size: int = 256
+) -> int:
+    # Parses every SAVE missing from the metadata cache and drops rows of
+    # SAVES that are gone. Returns the number of SAVES parsed.
+    stale = metadata.paths()
+    rows: list[tuple[str, Row]] = []
+    parsed = 0
+    for game in GAMES:
+        for name in index.saves(game):
+            if cancelled is not None and cancelled():
+                metadata.put_many(rows)
+                return parsed
+            path = _manifest_path(game, name)
+            stale.discard(str(path))
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if metadata.get(
+                str(path), stat.st_size, stat.st_mtime_ns
+            ) is not None:
+                continue
+            info = _parse_save_info(game, name)
+            rows.append((str(path), (stat.st_size, stat.st_mtime_ns, info)))
+            parsed += 1
+            if len(rows) >= batch_size:
+                metadata.put_many(rows)
+                rows.clear()
+    metadata.put_many(rows)
+    metadata.delete_many(stale)
+    return parsed
+
+
+def copy_undertale_save(name: str, save_path: Path | str) -> None:
+    _copy_save("undertale", name, save_path)
+
+
+def copy_deltarune_save(name: str, save_path: Path | str) -> None:
+    _copy_save("deltarune", name, save_path)
 
 
 def create_undertale_save(name: str, path: Path | str) -> None:
     try:
-        shutil.copytree(path, UNDERTALE_SAVES_PATH / name)
+        _create_save("undertale", name, path)
     except FileExistsError:
         pass
 
 
 def create_deltarune_save(name: str, path: Path | str) -> None:
     try:
-        shutil.copytree(path, DELTARUNE_SAVES_PATH / name)
+        _create_save("deltarune", name, path)
     except FileExistsError:
         pass
 
 
-def delete_undertale_save(name: str) -> None:
+def detect_game(path: Path) -> Game | None:
+    try:
+        names = [child.name.lower() for child in path.iterdir()]
+    except OSError:
+        return None
+    if any(name.startswith("filech") for name in names):
+        return "deltarune"
+    if "undertale.ini" in names or "file0" in names:
+        return "undertale"
+    return None
+
+
+def find_saves(path: Path) -> list[tuple[Game | None, str, Path]]:
+    # Either a SAVE folder itself or a folder containing SAVE folders
+    if (game := detect_game(path)) is not None:
+        return [(game, path.name, path)]
     try:
-        shutil.rmtree(UNDERTALE_SAVES_PATH / name)
+        children = sorted(child for child in path.iterdir() if child.is_dir())
+    except OSError:
+        return []
+    return [(detect_game(child), child.name, child) for child in children]
+
+
+def find_premade_saves(
+    from_dir: str | None = None,
+) -> list[tuple[Game | None, str, Path]]:
+    # Premade SAVES that weren't imported yet, optionally only those of one
+    # game or category folder
+    saves: list[tuple[Game | None, str, Path]] = []
+    for game in PREMADE_PATH.iterdir():
+        if not game.is_dir():
+            continue
+        for category in game.iterdir():
+            if not category.is_dir():
+                continue
+            for save in category.iterdir():
+                if not save.is_dir():
+                    continue
+                if index.name_taken(save.name):
+                    continue  # Already imported
+                if (
+                    from_dir is None
+                    or from_dir == game.name
+                    or from_dir == category.name
+                ):
+                    saves.append((
+                        (
+                            "undertale" if game.name.lower() == "undertale"
+                            else "deltarune"
+                        ),
+                        save.name,
+                        save,
+                    ))
+    return saves
+
+
+@cache
+def premade_categories() -> dict[str, str]:
+    return {
+        save.name: category.name
+        for category in PREMADE_PATH.glob("*/*") if category.is_dir()
+        for save in category.iterdir() if save.is_dir()
+    }
+
+
+def build_search_index(
+    cancelled: Callable[[], bool] | None = None,
+) -> SearchIndex:
+    search_index = SearchIndex()
+    categories = premade_categories()
+    for game in GAMES:
+        for name in index.saves(game):
+            if cancelled is not None and cancelled():
+                return search_index
+            search_index.add(
+                game, name, get_save_info(game, name), categories.get(name)
+            )
+    return search_index
+
+
+@dataclass
+class ImportResult:
+    game: Game | None
+    name: str
+    source: Path
+    error: str | None = None
+
+
+def bulk_import(
+    saves: list[tuple[Game | None, str, Path]],
+    max_workers: int = 4,
+    progress: Callable[[int, int], None] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+) -> list[ImportResult]:
+    results = [
+        ImportResult(game, name, source) for game, name, source in saves
+    ]
+
+    def import_one(result: ImportResult) -> None:
+        if cancelled is not None and cancelled():
+            result.error = "Cancelled"
+        elif result.game is None:
+            result.error = "Not a SAVE folder"
+        elif not result.name.strip():
+            result.error = "Invalid name"
+        else:
+            try:
+                _create_save(result.game, result.name, result.source)
+            except FileExistsError:
+                result.error = "A SAVE with this name already exists"
+            except OSError as e:
+                result.error = str(e)
+
+    with _objects.batch(), ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(import_one, result) for result in results]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            if progress is not None:
+                progress(done, len(results))
+    return results
+
+
+@dataclass
+class PackImport:
+    saves: list[ImportResult]
+    playlists: dict[str, list[str]]
+
+
+# Playlist entries are packed with their SAVES
+def export_pack(
+    path: Path | str,
+    saves: list[tuple[Game, str]],
+    pack_playlists: dict[str, list[str]] | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+) -> bool:
+    with _library_lock:
+        pack = Pack(playlists=pack_playlists or {})
+        wanted = dict.fromkeys(saves)
+        for entries in pack.playlists.values():
+            for name in entries:
+                if (game := index.game_of(name)) is not None:
+                    wanted[game, name] = None
+        # Referenced while exporting, deleting a SAVE meanwhile can't remove
+        # the files
+        with _objects.lock:
+            for game, name in wanted:
+                pack.saves.append(PackSave(
+                    game, name, read_manifest(_manifest_path(game, name))
+                ))
+            digests = pack.digests()
+            _objects.incref(digests)
+        try:
+            return write_pack(Path(path), _objects, pack, progress, cancelled)
+        finally:
+            _objects.decref(digests)
+
+
+def _valid_name(name: str) -> bool:
+    return bool(name.strip()) and not any(char in name for char in "/\\\0")
+
+
+def _same_save(save: PackSave) -> bool:
+    try:
+        return index.game_of(save.name) == save.game and read_manifest(
+            _manifest_path(save.game, save.name)
+        ) == save.files
     except FileNotFoundError:
-        pass
+        return False
+
+
+# Imports every SAVE of a pack in one pass. Files already in the store are
+# never read from the pack, the others are verified in parallel while being
+# streamed in. Playlists are returned for import_playlists().
+def import_pack(
+    path: Path | str,
+    max_workers: int = 4,
+    progress: Callable[[int, int], None] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+) -> PackImport:
+    with _library_lock:
+        path = Path(path)
+        with zipfile.ZipFile(path) as zf:
+            pack = read_pack(zf)
+            results = [
+                ImportResult(save.game, save.name, path) for save in pack.saves
+            ]
+            pending: list[tuple[ImportResult, PackSave]] = []
+            seen: set[str] = set()
+            for result, save in zip(results, pack.saves):
+                if not _valid_name(save.name):
+                    result.error = "Invalid name"
+                elif save.name.lower() in seen:
+                    result.error = "Listed twice in the pack"
+                elif index.name_taken(save.name):
+                    # Importing the same pack again is fine
+                    if not _same_save(save):
+                        result.error = "A SAVE with this name already exists"
+                else:
+                    pending.append((result, save))
+                seen.add(save.name.lower())
+            needed = {
+                digest for _, save in pending for digest in save.files.values()
+                if not _objects.has(digest)
+            }
+            failed = unpack_objects(
+                zf, _objects, needed, max_workers, progress, cancelled
+            )
+        imported = []
+        with _objects.lock, _objects.batch():
+            for result, save in pending:
+                manifest_path = _manifest_path(save.game, save.name)
+                if cancelled is not None and cancelled():
+                    result.error = "Cancelled"
+                elif manifest_path.exists() or index.name_taken(save.name):
+                    result.error = "A SAVE with this name already exists"
+                elif bad := [
+                    rel for rel, digest in save.files.items()
+                    if digest in failed or not _objects.has(digest)
+                ]:
+                    result.error = f"Corrupt or missing file '{bad[0]}'"
+                else:
+                    write_manifest(manifest_path, save.files)
+                    _objects.incref(save.files.values())
+                    imported.append(str(manifest_path))
+            # Files only used by SAVES that failed
+            _objects.decref([
+                digest for digest in needed
+                if _objects.has(digest) and not _objects.refcount(digest)
+            ])
+            # One rescan instead of inserting every SAVE
+            index.invalidate()
+        metadata.delete_many(imported)
+        return PackImport(results, pack.playlists)
+
+
+# Returns the playlists that were skipped because the name is taken. Has to
+# run on the thread using the playlists, the GUI thread.
+def import_playlists(pack_playlists: dict[str, list[str]]) -> list[str]:
+    skipped = []
+    for name, entries in pack_playlists.items():
+        if name in playlists:
+            skipped.append(name)
+        else:
+            playlists.set(name, list(entries))
+    playlists.commit()
+    return skipped
+
+
+def _read_manifests() -> tuple[
+    dict[tuple[Game, str], Manifest], list[tuple[Game, str]]
+]:
+    manifests: dict[tuple[Game, str], Manifest] = {}
+    unreadable: list[tuple[Game, str]] = []
+    for game in GAMES:
+        for name in index.saves(game):
+            try:
+                manifests[game, name] = read_manifest(
+                    _manifest_path(game, name)
+                )
+            except (OSError, ValueError, KeyError, TypeError):
+                unreadable.append((game, name))
+    return manifests, unreadable
+
+
+# Checks the files of every SAVE and backup against their hashes, and the
+# reference counts of both stores. Only reads, see repair_library().
+def verify_library(
+    max_workers: int = 4,
+    progress: Callable[[int, int], None] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+) -> VerifyReport:
+    report = VerifyReport()
+    with _objects.lock, backups.objects.lock:
+        manifests, report.unreadable_saves = _read_manifests()
+        snapshots = backups.list_snapshots()
+        refs = count_refs(manifests.values())
+        backup_refs = count_backup_refs(
+            backups.objects, (snapshot.files for snapshot in snapshots)
+        )
+        report.wrong_refs = (
+            _objects.count_wrong_refs(refs)
+            + backups.objects.count_wrong_refs(backup_refs)
+        )
+        report.unreferenced = (
+            len(_objects.unreferenced(ORPHAN_GRACE))
+            + len(backups.objects.unreferenced(ORPHAN_GRACE))
+        )
+    total = len(refs) + len(backup_refs)
+
+    def report_from(offset: int) -> Callable[[int, int], None] | None:
+        if progress is None:
+            return None
+        return lambda done, _: progress(offset + done, total)
+
+    # Hashing happens without the locks, the SAVES stay usable meanwhile
+    bad = check_objects(
+        _objects, refs, max_workers, report_from(0), cancelled
+    )
+    bad_backups = check_objects(
+        backups.objects, backup_refs, max_workers, report_from(len(refs)),
+        cancelled,
+    )
+    with _objects.lock, backups.objects.lock:
+        # Skip what was deleted while it was checked
+        for (game, name), manifest in manifests.items():
+            if _manifest_path(game, name).exists() and (files := [
+                rel for rel, digest in manifest.items() if digest in bad
+            ]):
+                report.saves[game, name] = files
+                report.bad_objects.update(manifest[rel] for rel in files)
+        for snapshot in snapshots:
+            snapshot_path = backups.snapshots_path / f"{snapshot.name}.json"
+            if snapshot_path.exists() and (files := [
+                rel for rel, digest in snapshot.files.items()
+                if digest in bad_backups
+            ]):
+                report.backups[snapshot.name] = files
+        # Including delta bases no snapshot lists directly
+        report.bad_backup_objects = {
+            digest for digest in bad_backups
+            if backups.objects.refcount(digest)
+        }
+    return report
+
+
+def _premade_save(game: Game, name: str) -> Path | None:
+    for category in PREMADE_PATH.glob("*/*"):
+        is_undertale = category.parent.name.lower() == "undertale"
+        path = Path(category, name)
+        if is_undertale == (game == "undertale") and path.is_dir():
+            return path
+    return None
+
+
+# Restores missing and corrupt files from the other store or the pre-made
+# SAVES, recreates unreadable pre-made SAVES and recounts the references.
+# Playlists are left to remove_orphaned_entries().
+def repair_library(report: VerifyReport) -> RepairResult:
+    result = RepairResult()
+    premade: dict[str, Path] | None = None
+
+    def find(digest: str, other: ObjectStore) -> bytes | None:
+        nonlocal premade
+        if other.has(digest) and other.verify(digest):
+            return other.read(digest)
+        if premade is None:
+            premade = hash_tree(PREMADE_PATH)
+        if (path := premade.get(digest)) is not None:
+            return path.read_bytes()
+        return None
+
+    with _library_lock, _objects.lock, backups.objects.lock:
+        pending = (
+            (_objects, backups.objects, set(report.bad_objects)),
+            (backups.objects, _objects, set(report.bad_backup_objects)),
+        )
+        # A backup delta can need a base that is restored from a SAVE first
+        restored = True
+        while restored:
+            restored = False
+            for objects, other, digests in pending:
+                for digest in sorted(digests):
+                    if objects.verify(digest):
+                        digests.discard(digest)  # Its delta base was fixed
+                    elif (data := find(digest, other)) is not None:
+                        objects.repair(digest, data)
+                        digests.discard(digest)
+                        result.restored_files += 1
+                        restored = True
+        for game, name in report.unreadable_saves:
+            if (source := _premade_save(game, name)) is None:
+                result.unrepaired.append(
+                    f"{GAME_TITLES[game]} SAVE '{name}' can't be read"
+                )
+                continue
+            _manifest_path(game, name).unlink(missing_ok=True)
+            index.remove(game, name)
+            _create_save(game, name, source)
+            result.recreated_saves.append(name)
+        manifests, _ = _read_manifests()
+        snapshots = backups.list_snapshots()
+        result.fixed_refs = _objects.set_refs(
+            count_refs(manifests.values())
+        ) + backups.objects.set_refs(count_backup_refs(
+            backups.objects, (snapshot.files for snapshot in snapshots)
+        ))
+        result.removed_files = (
+            _objects.remove_unreferenced(ORPHAN_GRACE)
+            + backups.objects.remove_unreferenced(ORPHAN_GRACE)
+        )
+        for (game, name), files in report.saves.items():
+            if (manifest := manifests.get((game, name))) and (bad := [
+                rel for rel in files
+                if rel in manifest and not _objects.verify(manifest[rel])
+            ]):
+                result.unrepaired.append(
+                    f"{GAME_TITLES[game]} SAVE '{name}' has missing or "
+                    f"corrupt files: {', '.join(bad)}"
+                )
+        for snapshot in snapshots:
+            if (listed := report.backups.get(snapshot.name)) and (bad := [
+                rel for rel in listed
+                if not backups.objects.verify(snapshot.files[rel])
+            ]):
+                result.unrepaired.append(
+                    f"Backup '{snapshot.name}' has missing or corrupt "
+                    f"files: {', '.join(bad)}"
+                )
+    return result
+
+
+# Playlist entries whose SAVE doesn't exist. Has to run on the thread using
+# the playlists, the GUI thread.
+def orphaned_entries() -> dict[str, list[str]]:
+    orphaned = {}
+    for name in playlists.names():
+        if missing := [
+            entry for entry in playlists.get(name)
+            if index.game_of(entry) is None
+        ]:
+            orphaned[name] = missing
+    return orphaned
+
+
+def remove_orphaned_entries(orphaned: dict[str, list[str]]) -> int:
+    removed = 0
+    for name, missing in orphaned.items():
+        if name not in playlists:
+            continue
+        entries = playlists.get(name)
+        kept = [
+            entry for entry in entries
+            if entry not in missing or index.game_of(entry) is not None
+        ]
+        removed += len(entries) - len(kept)
+        entries[:] = kept
+        playlists.changed(name)
+    playlists.commit()
+    return removed
+
+
+def delete_undertale_save(name: str) -> None:
+    _delete_save("undertale", name)
 
 
 def delete_deltarune_save(name: str) -> None:
-    try:
-        shutil.rmtree(DELTARUNE_SAVES_PATH / name)
-    except FileNotFoundError:
-        pass
+    _delete_save("deltarune", name)
 
 
 def rename_undertale_save(name: str, new_name: str) -> None:
-    try:
-        shutil.move(
-            UNDERTALE_SAVES_PATH / name, UNDERTALE_SAVES_PATH / new_name
-        )
-    except FileNotFoundError:
-        pass
-    except FileExistsError:
-        pass
+    _rename_save("undertale", name, new_name)
 
 
 def rename_deltarune_save(name: str, new_name: str) -> None:
-    try:
-        shutil.move(
-            DELTARUNE_SAVES_PATH / name, DELTARUNE_SAVES_PATH / new_name
+    _rename_save("deltarune", name, new_name)
+
+
+def set_backup_policy(
+    keep_last: int,
+    keep_days: int,
+    max_bytes: int,
+    keep_auto: int,
+    prune: bool = True,
+) -> None:
+    backups.policy = RetentionPolicy(
+        keep_last, keep_days, max_bytes, keep_auto
+    )
+    if prune:
+        backups.prune_async()
+
+
+def list_backups(game: Game | None = None) -> list[Snapshot]:
+    return backups.list_snapshots(
+        BACKUP_PREFIXES[game] if game is not None else None
+    )
+
+
+def backup_game(snapshot: Snapshot) -> Game | None:
+    for game, prefix in BACKUP_PREFIXES.items():
+        if prefix == snapshot.game:
+            return game
+    return None
+
+
+# Puts a backup back into the game SAVE folder in one swap. The current
+# contents are backed up first, so a restore can be undone the same way.
+def restore_backup(name: str, save_path: Path | str) -> None:
+    with _library_lock:
+        save_path = Path(save_path)
+        snapshot = backups.get(name)
+        if (game := backup_game(snapshot)) is None:
+            raise ValueError(f"Backup '{name}' belongs to no known game")
+        with backups.objects.lock:
+            staged = stage_tree(backups.objects, snapshot.files, save_path)
+        _swap_staged(game, "restore", staged, save_path)
+
+
+def migrate_legacy_backups() -> None:
+    thread = Thread(target=backups.migrate_legacy_backups, daemon=True)
+    thread.start()
+
+
+def backup_save(
+    game: Game, save_path: Path | str, save: str = "manual"
+) -> Snapshot | None:
+    with _library_lock:
+        return backups.snapshot(
+            BACKUP_PREFIXES[game], save, Path(save_path)
         )
-    except FileNotFoundError:
-        pass
-    except FileExistsError:
-        pass
 
 
+def extract_backup(name: str, dest: Path | str) -> None:
+    backups.checkout(name, Path(dest))
+
+
+def save_tree(game: Game, name: str) -> Tree:
+    return _objects, read_manifest(_manifest_path(game, name))
+
+
+def backup_tree(name: str) -> Tree:
+    return backups.objects, backups.get(name).files
+
+
+def diff_saves(old: Tree, new: Tree) -> list[Change]:
+    return list(SaveDiffer().diff(old, new))
+
+
+# Yields the changes from a SAVE to each backup of its game, newest first
+def diff_backups(
+    game: Game, name: str, cancelled: Callable[[], bool] | None = None
+) -> Iterator[tuple[Snapshot, list[Change]]]:
+    base = save_tree(game, name)
+    differ = SaveDiffer()
+    for snapshot in backups.list_snapshots(BACKUP_PREFIXES[game]):
+        if cancelled is not None and cancelled():
+            return
+        try:
+            changes = list(
+                differ.diff(base, (backups.objects, snapshot.files))
+            )
+        except OSError:
+            continue  # Pruned in the meantime
+        yield snapshot, changes
+
+
+# pyqt_utils.utils and psutil are imported on demand so the CLI starts fast
 def open_backup_folder() -> None:
+    from pyqt_utils.utils import open_file
     open_file(BACKUP_PATH)
 
 
+def open_backup(name: str) -> None:
+    from pyqt_utils.utils import open_file
+    restored_path = BACKUP_PATH / "restored"
+    shutil.rmtree(restored_path, ignore_errors=True)
+    try:
+        extract_backup(name, restored_path / name)
+    except FileNotFoundError:
+        return
+    open_file(restored_path / name)
+
+
 def launch_steam_ut() -> None:
     thread = Thread(target=getoutput, args=("steam steam://rungameid/391540",))
     thread.start()
@@ -118,10 +884,5 @@ def launch_file(path: str | Path) -> None:
 
 
 def program_running(program: str) -> bool:
-    try:
-        is_running = program in (
-            p.name() for p in psutil.process_iter(attrs=['name'])
-        )
-    except Exception:
-        is_running = False
-    return is_running
+    from .processes import programs_running
+    return programs_running((program,))
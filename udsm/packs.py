@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Iterable
+
+from .index import GAMES, Game
+from .store import Manifest, ObjectStore
+
+PACK_VERSION = 1
+PACK_SUFFIX = ".udsmpack"
+PACK_MANIFEST = "pack.json"
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+@dataclass
+class PackSave:
+    game: Game
+    name: str
+    files: Manifest
+
+
+@dataclass
+class Pack:
+    saves: list[PackSave] = field(default_factory=list)
+    playlists: dict[str, list[str]] = field(default_factory=dict)
+
+    def digests(self) -> set[str]:
+        return {
+            digest for save in self.saves for digest in save.files.values()
+        }
+
+    def dump(self) -> dict[str, Any]:
+        return {
+            "version": PACK_VERSION,
+            "saves": [
+                {"game": save.game, "name": save.name, "files": save.files}
+                for save in self.saves
+            ],
+            "playlists": self.playlists,
+        }
+
+
+def blob_name(digest: str) -> str:
+    return f"objects/{digest}"
+
+
+def _safe_rel(rel: str) -> bool:
+    # The files are checked out below the game SAVE folder later
+    path = PurePosixPath(rel)
+    return (
+        bool(rel) and not path.is_absolute() and ".." not in path.parts
+        and not any(char in rel for char in "\\:\0")
+    )
+
+
+def _parse_save(data: Any) -> PackSave:
+    game, name, files = data["game"], data["name"], data["files"]
+    if game not in GAMES or not isinstance(name, str):
+        raise ValueError(f"Invalid SAVE entry: {game!r} {name!r}")
+    if not isinstance(files, dict) or not all(
+        isinstance(rel, str) and _safe_rel(rel)
+        and isinstance(digest, str) and DIGEST_RE.match(digest)
+        for rel, digest in files.items()
+    ):
+        raise ValueError(f"SAVE '{name}' has invalid file entries")
+    return PackSave(game, name, files)
+
+
+# A SAVE pack is a zip archive holding pack.json, which lists the SAVES with
+# the hashes of their files and the playlists, and every distinct file once
+# as objects/<sha256>
+def read_pack(zf: zipfile.ZipFile) -> Pack:
+    try:
+        data = json.loads(zf.read(PACK_MANIFEST))
+    except KeyError:
+        raise ValueError("Not a SAVE pack")
+    try:
+        if data["version"] > PACK_VERSION:
+            raise ValueError("The SAVE pack was made by a newer version")
+        playlists = data.get("playlists", {})
+        if not all(
+            isinstance(name, str) and isinstance(entries, list)
+            and all(isinstance(entry, str) for entry in entries)
+            for name, entries in playlists.items()
+        ):
+            raise ValueError("Invalid playlists")
+        return Pack([_parse_save(save) for save in data["saves"]], playlists)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid SAVE pack manifest: {e}")
+
+
+def write_pack(
+    path: Path,
+    objects: ObjectStore,
+    pack: Pack,
+    progress: Callable[[int, int], None] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+) -> bool:
+    digests = sorted(pack.digests())
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(PACK_MANIFEST, json.dumps(pack.dump(), indent=2))
+            for done, digest in enumerate(digests, 1):
+                if cancelled is not None and cancelled():
+                    return False
+                # Streamed from the store, identical files are written once
+                zf.write(objects.object_path(digest), blob_name(digest))
+                if progress is not None:
+                    progress(done, len(digests))
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return True
+
+
+# Streams the blobs from the pack into the store, hashing them on the way.
+# Returns the digests that are missing from the pack, corrupt or were
+# skipped because of cancellation.
+def unpack_objects(
+    zf: zipfile.ZipFile,
+    objects: ObjectStore,
+    digests: Iterable[str],
+    max_workers: int = 4,
+    progress: Callable[[int, int], None] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+) -> set[str]:
+    pending = list(digests)
+    failed: set[str] = set()
+
+    def unpack(digest: str) -> None:
+        if cancelled is not None and cancelled():
+            failed.add(digest)
+            return
+        try:
+            with zf.open(blob_name(digest)) as fp:
+                objects.put_stream(fp, digest)
+        except (KeyError, ValueError, zipfile.BadZipFile, zlib.error):
+            failed.add(digest)
+
+    # Members can be read concurrently, inflating and hashing release the GIL
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(unpack, digest) for digest in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            if progress is not None:
+                progress(done, len(pending))
+    return failed
@@ -3,5 +3,9 @@ from pyqt_utils.paths import CONFIG_DIR, ROOT_PATH
 UNDERTALE_SAVES_PATH = CONFIG_DIR / "undertale_saves"
 DELTARUNE_SAVES_PATH = CONFIG_DIR / "deltarune_saves"
 BACKUP_PATH = CONFIG_DIR / "backups"
+OBJECTS_PATH = CONFIG_DIR / "objects"
+METADATA_PATH = CONFIG_DIR / "metadata.sqlite3"
+PLAYLISTS_PATH = CONFIG_DIR / "playlists"
+CONFIG_PATH = CONFIG_DIR / "settings.json"
 PREMADE_PATH = ROOT_PATH / "premade_saves"
 ICONS_PATH = ROOT_PATH / "icons"
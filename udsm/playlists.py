@@ -0,0 +1,156 @@
+import json
+from pathlib import Path
+from uuid import uuid4
+
+from .store import atomic_write
+
+
+# Playlists are stored one file per playlist, next to an index holding their
+# order and file names. A playlist is only read once it's opened. Changes
+# stay in memory until commit(), rollback() discards them.
+class PlaylistStore:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._order: list[str] | None = None
+        self._files: dict[str, str] = {}
+        self._entries: dict[str, list[str]] = {}
+        self._dirty: set[str] = set()
+        self._index_dirty = False
+        self._deleted_files: set[str] = set()
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "index.json"
+
+    def _load_index(self) -> list[str]:
+        if self._order is None:
+            try:
+                data = json.loads(self.index_path.read_text("utf-8"))
+                playlists = [
+                    (entry["name"], entry["file"])
+                    for entry in data["playlists"]
+                ]
+            except FileNotFoundError:
+                playlists = []
+            except (OSError, ValueError, KeyError, TypeError):
+                playlists = self._scan()
+            self._order = [name for name, _ in playlists]
+            self._files = dict(playlists)
+        return self._order
+
+    def _scan(self) -> list[tuple[str, str]]:
+        # Rebuilds the index from the playlist files if it's unreadable
+        playlists = []
+        for path in sorted(self.root.glob("*.json")):
+            if path == self.index_path:
+                continue
+            try:
+                name = json.loads(path.read_text("utf-8"))["name"]
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            playlists.append((name, path.name))
+        self._index_dirty = True
+        return playlists
+
+    def names(self) -> list[str]:
+        return list(self._load_index())
+
+    def __contains__(self, name: object) -> bool:
+        self._load_index()
+        return name in self._files
+
+    def __len__(self) -> int:
+        return len(self._load_index())
+
+    # The returned list is live, call changed() after modifying it
+    def get(self, name: str) -> list[str]:
+        self._load_index()
+        if (entries := self._entries.get(name)) is None:
+            path = self.root / self._files[name]
+            try:
+                entries = json.loads(path.read_text("utf-8"))["saves"]
+            except (OSError, ValueError, KeyError, TypeError):
+                entries = []
+            self._entries[name] = entries
+        return entries
+
+    def changed(self, name: str) -> None:
+        self._dirty.add(name)
+
+    def set(self, name: str, saves: list[str]) -> None:
+        order = self._load_index()
+        if name not in self._files:
+            order.append(name)
+            self._files[name] = f"{uuid4().hex}.json"
+            self._index_dirty = True
+        self._entries[name] = saves
+        self._dirty.add(name)
+
+    def rename(self, name: str, new_name: str) -> None:
+        order = self._load_index()
+        if new_name in self._files:
+            raise KeyError(new_name)
+        entries = self.get(name)
+        order[order.index(name)] = new_name
+        self._files[new_name] = self._files.pop(name)
+        del self._entries[name]
+        self._entries[new_name] = entries
+        self._dirty.discard(name)
+        # The file keeps its name but stores the playlist name too
+        self._dirty.add(new_name)
+        self._index_dirty = True
+
+    def delete(self, name: str) -> None:
+        self._load_index().remove(name)
+        self._deleted_files.add(self._files.pop(name))
+        self._entries.pop(name, None)
+        self._dirty.discard(name)
+        self._index_dirty = True
+
+    def commit(self) -> None:
+        if not (self._dirty or self._index_dirty or self._deleted_files):
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        for name in self._dirty:
+            atomic_write(
+                self.root / self._files[name],
+                json.dumps({
+                    "version": 1, "name": name, "saves": self._entries[name]
+                }).encode("utf-8"),
+            )
+        if self._index_dirty:
+            atomic_write(
+                self.index_path,
+                json.dumps({
+                    "version": 1,
+                    "playlists": [
+                        {"name": name, "file": self._files[name]}
+                        for name in self._load_index()
+                    ],
+                }, indent=2).encode("utf-8"),
+            )
+        # Only after the index no longer points at them
+        for file in self._deleted_files:
+            (self.root / file).unlink(missing_ok=True)
+        self._dirty.clear()
+        self._index_dirty = False
+        self._deleted_files.clear()
+
+    def rollback(self) -> None:
+        self._order = None
+        self._files.clear()
+        self._entries.clear()
+        self._dirty.clear()
+        self._index_dirty = False
+        self._deleted_files.clear()
+
+    # Returns whether any playlist was imported
+    def migrate(self, playlists: dict[str, list[str]]) -> bool:
+        # Playlists used to be stored in the config
+        imported = False
+        for name, saves in playlists.items():
+            if name not in self:
+                self.set(name, list(saves))
+                imported = True
+        self.commit()
+        return imported
@@ -0,0 +1,161 @@
+import os
+import select
+import sys
+from dataclasses import dataclass
+from threading import Event, Lock
+from time import perf_counter
+from typing import Iterable
+
+import psutil
+
+
+@dataclass
+class ScanStats:
+    full_scans: int = 0
+    scan_time: float = 0.0
+    last_scan_time: float = 0.0
+    cache_checks: int = 0
+    cache_hits: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        if not self.cache_checks:
+            return 0.0
+        return self.cache_hits / self.cache_checks
+
+
+def _proc_stat(pid: int) -> tuple[str, str] | None:
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as fp:
+            stat = fp.read().decode("utf-8", "replace")
+    except OSError:
+        return None
+    # Format is "pid (comm) state ...", comm may contain spaces and parens
+    comm = stat[stat.find("(") + 1:stat.rfind(")")]
+    state = stat[stat.rfind(")") + 2:stat.rfind(")") + 3]
+    return comm, state
+
+
+def _is_alive(pid: int, name: str) -> bool:
+    if sys.platform == "linux":
+        stat = _proc_stat(pid)
+        if stat is None or stat[1] == "Z":
+            return False
+        comm = stat[0]
+        # comm is truncated to 15 characters by the kernel
+        return comm == name or (len(comm) == 15 and name.startswith(comm))
+    try:
+        proc = psutil.Process(pid)
+        return bool(
+            proc.name() == name and proc.status() != psutil.STATUS_ZOMBIE
+        )
+    except psutil.Error:
+        return False
+
+
+# Finds processes by name in a single pass over all processes. PIDs found
+# are remembered and checked first next time, which is much cheaper than
+# iterating all processes again.
+class ProcessScanner:
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.stats = ScanStats()
+        self._cache: dict[int, str] = {}
+
+    def _check_cache(self, names: set[str]) -> dict[str, list[int]]:
+        found: dict[str, list[int]] = {}
+        for pid, name in list(self._cache.items()):
+            if name not in names:
+                continue
+            if _is_alive(pid, name):
+                found.setdefault(name, []).append(pid)
+            else:
+                del self._cache[pid]
+        return found
+
+    def _full_scan(self, names: set[str]) -> dict[str, list[int]]:
+        start = perf_counter()
+        found: dict[str, list[int]] = {}
+        try:
+            for proc in psutil.process_iter(attrs=["name", "status"]):
+                name = proc.info["name"]
+                if (
+                    name in names
+                    and proc.info["status"] != psutil.STATUS_ZOMBIE
+                ):
+                    found.setdefault(name, []).append(proc.pid)
+                    self._cache[proc.pid] = name
+        except Exception:
+            pass
+        self.stats.full_scans += 1
+        self.stats.last_scan_time = perf_counter() - start
+        self.stats.scan_time += self.stats.last_scan_time
+        return found
+
+    # Names without a live cached PID are looked up with a full scan, unless
+    # any_name is set and the cache already found one of the names
+    def scan(
+        self, names: Iterable[str], any_name: bool = False
+    ) -> dict[str, list[int]]:
+        names = {name for name in names if name}
+        if not names:
+            return {}
+        with self.lock:
+            found: dict[str, list[int]] = {}
+            if any(name in names for name in self._cache.values()):
+                self.stats.cache_checks += 1
+                if found := self._check_cache(names):
+                    self.stats.cache_hits += 1
+                    if any_name or found.keys() == names:
+                        return found
+            return found | self._full_scan(names - found.keys())
+
+
+scanner = ProcessScanner()
+
+
+def find_pid(names: Iterable[str]) -> int | None:
+    for pids in scanner.scan(names, any_name=True).values():
+        return pids[0]
+    return None
+
+
+def programs_running(names: Iterable[str]) -> bool:
+    return bool(scanner.scan(names, any_name=True))
+
+
+def _wait_pidfd(pid: int, stop: Event, interval: float) -> bool:
+    try:
+        fd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return True
+    except (AttributeError, OSError):
+        return False
+    try:
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        # The pidfd becomes readable once the process exits. The timeout is
+        # only there so a stop request isn't missed.
+        while not stop.is_set():
+            if poller.poll(int(interval * 1000)):
+                break
+    finally:
+        os.close(fd)
+    return True
+
+
+def wait_for_exit(pid: int, stop: Event, interval: float = 0.5) -> None:
+    if hasattr(os, "pidfd_open") and _wait_pidfd(pid, stop, interval):
+        return
+    try:
+        proc = psutil.Process(pid)
+    except psutil.NoSuchProcess:
+        return
+    while not stop.is_set():
+        try:
+            proc.wait(timeout=interval)
+            return
+        except psutil.TimeoutExpired:
+            continue
+        except psutil.NoSuchProcess:
+            return
@@ -0,0 +1,271 @@
+import mmap
+import os
+import re
+from configparser import ConfigParser, Error
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Mapping
+
+from .index import Game
+
+FPS = 30
+UNDERTALE_FILE_RE = re.compile(r"^file\d$")
+DELTARUNE_FILE_RE = re.compile(r"^filech(\d+)_(\d+)$")
+# Lines of the fields read from save files, negative ones count from the end
+UNDERTALE_LINES = {"name": 1, "love": 2, "room": 548, "time": 549}
+DELTARUNE_LINES = {"name": 1, "plot": -3, "room": -2, "time": -1}
+
+
+@dataclass(frozen=True)
+class SaveInfo:
+    name: str | None = None
+    love: int | None = None
+    room: int | None = None
+    kills: int | None = None
+    playtime: float | None = None  # Seconds
+    chapter: int | None = None
+
+    def summary(self) -> str:
+        parts = []
+        if self.name:
+            parts.append(self.name)
+        if self.chapter is not None:
+            parts.append(f"Chapter {self.chapter}")
+        if self.love is not None:
+            parts.append(f"LV {self.love}")
+        if self.room is not None:
+            parts.append(f"Room {self.room}")
+        if self.kills is not None:
+            parts.append(f"{self.kills} kills")
+        if self.playtime is not None:
+            minutes, seconds = divmod(int(self.playtime), 60)
+            hours, minutes = divmod(minutes, 60)
+            parts.append(f"{hours}:{minutes:02}:{seconds:02}")
+        return ", ".join(parts)
+
+
+# Read-only view of a newline separated save file. The file is memory mapped
+# and line offsets are only searched as far as the requested line, from the
+# front for positive and from the back for negative line numbers.
+class LineFile:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path, "rb") as fp:
+            size = os.fstat(fp.fileno()).st_size
+            self._data: mmap.mmap | bytes = (
+                mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                if size else b""
+            )
+        # A trailing newline doesn't start another line
+        self._end = size - 1 if self._data[-1:] == b"\n" else size
+        self._starts = [0]
+        self._tail_starts = [self._end + 1]
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self) -> "LineFile":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _head(self, i: int) -> bytes:
+        starts = self._starts
+        while len(starts) <= i + 1:
+            pos = starts[-1]
+            if pos > self._end:
+                raise IndexError(i)
+            nl = self._data.find(b"\n", pos, self._end)
+            starts.append((nl if nl >= 0 else self._end) + 1)
+        return self._data[starts[i]:starts[i + 1] - 1]
+
+    def _tail(self, k: int) -> bytes:
+        starts = self._tail_starts
+        while len(starts) <= k:
+            end = starts[-1] - 1
+            if end < 0:
+                raise IndexError(-k)
+            starts.append(self._data.rfind(b"\n", 0, end) + 1)
+        return self._data[starts[k]:starts[k - 1] - 1]
+
+    # 1-based like the save file documentation, negative counts from the end
+    def line(self, n: int) -> str:
+        if n == 0:
+            raise IndexError(n)
+        raw = self._head(n - 1) if n > 0 else self._tail(-n)
+        return raw.decode("utf-8", "replace").strip()
+
+    def get(self, n: int) -> str | None:
+        try:
+            return self.line(n)
+        except IndexError:
+            return None
+
+
+def _int(value: str | None) -> int | None:
+    if not value:
+        return None
+    try:
+        # deltarune sometimes writes numbers like 1.60456e+06
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def _seconds(frames: str | None) -> float | None:
+    if (value := _int(frames)) is None:
+        return None
+    return value / FPS
+
+
+class UndertaleSave:
+    def __init__(self, file0: Path | None, ini: Path | None) -> None:
+        self.file0_path = file0
+        self.ini_path = ini
+
+    @cached_property
+    def _file0(self) -> LineFile | None:
+        if self.file0_path is None:
+            return None
+        try:
+            return LineFile(self.file0_path)
+        except OSError:
+            return None
+
+    @cached_property
+    def _ini(self) -> dict[str, str]:
+        if self.ini_path is None:
+            return {}
+        parser = ConfigParser(interpolation=None)
+        try:
+            parser.read(self.ini_path, encoding="utf-8")
+            section = parser["General"]
+        except (Error, KeyError, OSError, UnicodeDecodeError):
+            return {}
+        return {key: value.strip('"') for key, value in section.items()}
+
+    def _line(self, n: int) -> str | None:
+        return self._file0.get(n) if self._file0 is not None else None
+
+    def close(self) -> None:
+        if "_file0" in self.__dict__ and self._file0 is not None:
+            self._file0.close()
+
+    @property
+    def name(self) -> str | None:
+        return self._line(UNDERTALE_LINES["name"]) or self._ini.get("name")
+
+    @property
+    def love(self) -> int | None:
+        return _int(
+            self._line(UNDERTALE_LINES["love"]) or self._ini.get("love")
+        )
+
+    @property
+    def room(self) -> int | None:
+        return _int(
+            self._line(UNDERTALE_LINES["room"]) or self._ini.get("room")
+        )
+
+    @property
+    def kills(self) -> int | None:
+        return _int(self._ini.get("kills"))
+
+    @property
+    def playtime(self) -> float | None:
+        return _seconds(
+            self._line(UNDERTALE_LINES["time"]) or self._ini.get("time")
+        )
+
+    def info(self) -> SaveInfo:
+        return SaveInfo(
+            name=self.name,
+            love=self.love,
+            room=self.room,
+            kills=self.kills,
+            playtime=self.playtime,
+        )
+
+
+class DeltaruneSave:
+    def __init__(self, path: Path, chapter: int) -> None:
+        self.path = path
+        self.chapter = chapter
+
+    @cached_property
+    def _file(self) -> LineFile | None:
+        try:
+            return LineFile(self.path)
+        except OSError:
+            return None
+
+    def _line(self, n: int) -> str | None:
+        return self._file.get(n) if self._file is not None else None
+
+    def close(self) -> None:
+        if "_file" in self.__dict__ and self._file is not None:
+            self._file.close()
+
+    @property
+    def name(self) -> str | None:
+        return self._line(DELTARUNE_LINES["name"])
+
+    @property
+    def plot(self) -> int | None:
+        return _int(self._line(DELTARUNE_LINES["plot"]))
+
+    @property
+    def room(self) -> int | None:
+        return _int(self._line(DELTARUNE_LINES["room"]))
+
+    @property
+    def playtime(self) -> float | None:
+        return _seconds(self._line(DELTARUNE_LINES["time"]))
+
+    def info(self) -> SaveInfo:
+        return SaveInfo(
+            name=self.name,
+            room=self.room,
+            playtime=self.playtime,
+            chapter=self.chapter,
+        )
+
+
+def _deltarune_file(files: Mapping[str, Path]) -> tuple[Path, int] | None:
+    # The furthest chapter wins, within it the first slot
+    best: tuple[int, int, Path] | None = None
+    for rel, path in files.items():
+        if not (match := DELTARUNE_FILE_RE.match(Path(rel).name.lower())):
+            continue
+        chapter, slot = int(match[1]), int(match[2])
+        if best is None or (-chapter, slot) < (-best[0], best[1]):
+            best = (chapter, slot, path)
+    return (best[2], best[0]) if best is not None else None
+
+
+# files maps the relative paths inside a SAVE folder to where their contents
+# can be read from
+def read_info(game: Game, files: Mapping[str, Path]) -> SaveInfo:
+    save: UndertaleSave | DeltaruneSave
+    if game == "undertale":
+        lower = {Path(rel).name.lower(): path for rel, path in files.items()}
+        save = UndertaleSave(lower.get("file0"), lower.get("undertale.ini"))
+    elif (found := _deltarune_file(files)) is not None:
+        save = DeltaruneSave(*found)
+    else:
+        return SaveInfo()
+    try:
+        return save.info()
+    finally:
+        save.close()
+
+
+def read_folder_info(game: Game, path: Path) -> SaveInfo:
+    try:
+        files = {child.name: child for child in path.iterdir()}
+    except OSError:
+        return SaveInfo()
+    return read_info(game, files)
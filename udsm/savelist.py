@@ -0,0 +1,153 @@
+from bisect import bisect_left
+from typing import Any, Callable
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QObject, Qt
+
+# Above this many changes a single reset is cheaper than row-wise updates
+RESET_THRESHOLD = 256
+
+
+class SaveListModel(QAbstractListModel):
+    def __init__(
+        self,
+        rename: Callable[[str, str], bool] | None = None,
+        describe: Callable[[str], str] | None = None,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.rename = rename
+        self.describe = describe
+        self.names: list[str] = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(
+        self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole
+    ) -> Any:
+        if not index.isValid() or index.row() >= len(self.names):
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self.names[index.row()]
+        if role == Qt.ItemDataRole.ToolTipRole and self.describe is not None:
+            return self.describe(self.names[index.row()]) or None
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        flags = super().flags(index)
+        if self.rename is not None and index.isValid():
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(
+        self,
+        index: QModelIndex,
+        value: Any,
+        role: int = Qt.ItemDataRole.EditRole,
+    ) -> bool:
+        if (
+            self.rename is None
+            or role != Qt.ItemDataRole.EditRole
+            or not index.isValid()
+        ):
+            return False
+        prev_name = self.names[index.row()]
+        new_name = str(value).strip()
+        if new_name == prev_name or not self.rename(prev_name, new_name):
+            return False
+        self.remove(prev_name)
+        self.insert(new_name)
+        return True
+
+    def name(self, index: QModelIndex) -> str:
+        return self.names[index.row()]
+
+    def row(self, name: str) -> int:
+        row = bisect_left(self.names, name)
+        if row < len(self.names) and self.names[row] == name:
+            return row
+        return -1
+
+    def insert(self, name: str) -> None:
+        row = bisect_left(self.names, name)
+        if row < len(self.names) and self.names[row] == name:
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.names.insert(row, name)
+        self.endInsertRows()
+
+    def remove(self, name: str) -> None:
+        row = self.row(name)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.names.pop(row)
+        self.endRemoveRows()
+
+    def set_names(self, names: list[str]) -> None:
+        # names must be sorted
+        current = set(self.names)
+        new = set(names)
+        removed = current - new
+        added = new - current
+        if len(removed) + len(added) > RESET_THRESHOLD:
+            self.beginResetModel()
+            self.names = list(names)
+            self.endResetModel()
+            return
+        for name in removed:
+            self.remove(name)
+        for name in added:
+            self.insert(name)
+
+
+class PlaylistModel(QAbstractListModel):
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.entries: list[str] = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(
+        self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole
+    ) -> Any:
+        if not index.isValid() or index.row() >= len(self.entries):
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.entries[index.row()]
+        return None
+
+    def set_entries(self, entries: list[str]) -> None:
+        self.beginResetModel()
+        self.entries = entries
+        self.endResetModel()
+
+    def append(self, entry: str) -> None:
+        row = len(self.entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.entries.append(entry)
+        self.endInsertRows()
+
+    def remove(self, row: int) -> None:
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.entries.pop(row)
+        self.endRemoveRows()
+
+    def move(self, row: int, dest: int) -> bool:
+        if row == dest or not (
+            0 <= row < len(self.entries) and 0 <= dest < len(self.entries)
+        ):
+            return False
+        # beginMoveRows wants the row the item is inserted before
+        self.beginMoveRows(
+            QModelIndex(), row, row, QModelIndex(),
+            dest + 1 if dest > row else dest,
+        )
+        entries = self.entries
+        if abs(dest - row) == 1:
+            entries[row], entries[dest] = entries[dest], entries[row]
+        else:
+            entries.insert(dest, entries.pop(row))
+        self.endMoveRows()
+        return True
@@ -0,0 +1,245 @@
+import operator
+import re
+import shlex
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Set
+from typing import Callable, Iterator
+
+from .index import GAMES, Game
+from .saveformat import SaveInfo
+
+NUMERIC_FIELDS = ("love", "room", "kills", "chapter")
+TEXT_FIELDS = ("name", "category", "game")
+FIELD_ALIASES = {"lv": "love", "ch": "chapter", "char": "name"}
+WORD_RE = re.compile(r"[^\W_]+")
+FIELD_RE = re.compile(r"^(\w+):(>=|<=|>|<|=)?(.*)$")
+COMPARISONS: dict[str, Callable[[int, int], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+type Key = tuple[Game, str]
+type Range = tuple[str, str, int]
+
+
+def words(text: str) -> list[str]:
+    return WORD_RE.findall(text.lower())
+
+
+# Matched documents of a search. Keys are only resolved when asked for, large
+# result sets would otherwise cost more than the search itself.
+class SearchResults:
+    def __init__(self, docs: frozenset[int], index: "SearchIndex") -> None:
+        self._docs = docs
+        self._index = index
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, tuple):
+            return False
+        doc = self._index._ids.get(key)
+        return doc is not None and doc in self._docs
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __iter__(self) -> Iterator[Key]:
+        return (self._index._keys[doc] for doc in self._docs)
+
+
+# Inverted index over SAVE names, premade categories and parsed fields.
+# Bare words match any word of the SAVE name, category or character name by
+# prefix, `field:value` matches one field and numeric fields also take
+# comparisons, e.g. `toriel room:31 love:>10`. All terms must match.
+class SearchIndex:
+    def __init__(self) -> None:
+        self._ids: dict[Key, int] = {}
+        self._keys: dict[int, Key] = {}
+        self._next_id = 0
+        self._names: dict[Game, set[str]] = {game: set() for game in GAMES}
+        # Text terms are either a bare word or "field:word"
+        self._terms: dict[str, set[int]] = {}
+        self._sorted_terms: list[str] = []
+        self._numbers: dict[str, dict[int, set[int]]] = {
+            field: {} for field in NUMERIC_FIELDS
+        }
+        self._sorted_numbers: dict[str, list[int]] = {
+            field: [] for field in NUMERIC_FIELDS
+        }
+        self._doc_terms: dict[int, list[str]] = {}
+        self._doc_numbers: dict[int, dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def names(self, game: Game) -> frozenset[str]:
+        return frozenset(self._names[game])
+
+    def add(
+        self,
+        game: Game,
+        name: str,
+        info: SaveInfo,
+        category: str | None = None,
+    ) -> None:
+        key = (game, name)
+        if key in self._ids:
+            self.remove(game, name)
+        doc = self._next_id
+        self._next_id += 1
+        self._ids[key] = doc
+        self._keys[doc] = key
+        self._names[game].add(name)
+
+        terms = set(words(name))
+        terms.add(f"game:{game}")
+        for field, value in (("category", category), ("name", info.name)):
+            for word in words(value or ""):
+                terms.add(word)
+                terms.add(f"{field}:{word}")
+        for term in terms:
+            if (postings := self._terms.get(term)) is None:
+                postings = self._terms[term] = set()
+                insort(self._sorted_terms, term)
+            postings.add(doc)
+        self._doc_terms[doc] = list(terms)
+
+        numbers = {
+            field: value for field in NUMERIC_FIELDS
+            if (value := getattr(info, field)) is not None
+        }
+        for field, value in numbers.items():
+            values = self._numbers[field]
+            if (postings := values.get(value)) is None:
+                postings = values[value] = set()
+                insort(self._sorted_numbers[field], value)
+            postings.add(doc)
+        self._doc_numbers[doc] = numbers
+
+    def remove(self, game: Game, name: str) -> None:
+        if (doc := self._ids.pop((game, name), None)) is None:
+            return
+        del self._keys[doc]
+        self._names[game].discard(name)
+        for term in self._doc_terms.pop(doc):
+            postings = self._terms[term]
+            postings.discard(doc)
+            if not postings:
+                del self._terms[term]
+                i = bisect_left(self._sorted_terms, term)
+                del self._sorted_terms[i]
+        for field, value in self._doc_numbers.pop(doc).items():
+            postings = self._numbers[field][value]
+            postings.discard(doc)
+            if not postings:
+                del self._numbers[field][value]
+                values = self._sorted_numbers[field]
+                del values[bisect_left(values, value)]
+
+    # The postings returned by the lookups below may be the index's own sets,
+    # search() copies the result before handing it out
+    def _prefix(self, prefix: str, bare: bool) -> Set[int]:
+        terms = self._sorted_terms
+        start = bisect_left(terms, prefix)
+        end = bisect_left(terms, prefix + "\uffff", start)
+        matches = [
+            self._terms[term] for term in terms[start:end]
+            if not bare or ":" not in term
+        ]
+        if len(matches) == 1:
+            return matches[0]
+        return set().union(*matches)
+
+    def _in_range(self, field: str, op: str, value: int) -> list[int]:
+        values = self._sorted_numbers[field]
+        match op:
+            case ">":
+                return values[bisect_right(values, value):]
+            case ">=":
+                return values[bisect_left(values, value):]
+            case "<":
+                return values[:bisect_left(values, value)]
+            case _:
+                return values[:bisect_right(values, value)]
+
+    def _filter(
+        self, docs: Set[int], field: str, op: str, value: int
+    ) -> set[int]:
+        compare = COMPARISONS[op]
+        return {
+            doc for doc in docs
+            if (number := self._doc_numbers[doc].get(field)) is not None
+            and compare(number, value)
+        }
+
+    def _all_words(self, prefixes: list[str], bare: bool) -> Set[int]:
+        result: Set[int] | None = None
+        for prefix in prefixes:
+            docs = self._prefix(prefix, bare)
+            result = docs if result is None else result & docs
+            if not result:
+                return set()
+        return result if result is not None else set()
+
+    def _range(self, term: str) -> Range | None:
+        if not (match := FIELD_RE.match(term)):
+            return None
+        field, op, value = match.groups()
+        field = FIELD_ALIASES.get(field, field)
+        if field not in NUMERIC_FIELDS or op not in COMPARISONS:
+            return None
+        try:
+            return field, op, int(value)
+        except ValueError:
+            return None
+
+    def _match(self, term: str) -> Set[int]:
+        if match := FIELD_RE.match(term):
+            field, op, value = match.groups()
+            field = FIELD_ALIASES.get(field, field)
+            if field in NUMERIC_FIELDS:
+                try:
+                    return self._numbers[field].get(int(value), set())
+                except ValueError:
+                    return set()
+            if field in TEXT_FIELDS:
+                return self._all_words(
+                    [f"{field}:{word}" for word in words(value)], False
+                )
+        return self._all_words(words(term), True)
+
+    # None means the query doesn't filter anything
+    def search(self, query: str) -> SearchResults | None:
+        try:
+            terms = shlex.split(query.lower())
+        except ValueError:
+            terms = query.lower().split()
+        if not terms:
+            return None
+        ranges: list[Range] = []
+        matches: list[Set[int]] = []
+        for term in terms:
+            if (range_ := self._range(term)) is not None:
+                ranges.append(range_)
+            else:
+                matches.append(self._match(term))
+        result: Set[int] | None = None
+        # Start with the most selective term to keep intersections small
+        for docs in sorted(matches, key=len):
+            result = docs if result is None else result & docs
+            if not result:
+                return SearchResults(frozenset(), self)
+        for field, op, value in ranges:
+            postings = [
+                self._numbers[field][number]
+                for number in self._in_range(field, op, value)
+            ]
+            # Comparisons can match most of the index, then checking the
+            # documents found so far is cheaper than building the union
+            if result is None or sum(map(len, postings)) < len(result):
+                docs = set().union(*postings)
+                result = docs if result is None else result & docs
+            else:
+                result = self._filter(result, field, op, value)
+        return SearchResults(frozenset(result or ()), self)
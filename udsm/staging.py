@@ -0,0 +1,105 @@
+import ctypes
+import os
+import shutil
+import sys
+from pathlib import Path
+
+from .store import Manifest, ObjectStore
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int)
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2  # Linux renameat2
+RENAME_SWAP = 2  # macOS renamex_np
+
+_libc: ctypes.CDLL | None = None
+
+
+def _get_libc() -> ctypes.CDLL | None:
+    global _libc
+    if _libc is None and sys.platform in ("linux", "darwin"):
+        try:
+            _libc = ctypes.CDLL(None, use_errno=True)
+        except OSError:
+            pass
+    return _libc
+
+
+def clone_file(src: Path, dest: Path) -> None:
+    # Reflinks share the data blocks copy-on-write, so the game writing to
+    # the save later never touches the blob. Hardlinks would.
+    if sys.platform == "linux":
+        import fcntl
+        try:
+            with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+                fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dest)
+
+
+def staging_path(target: Path) -> Path:
+    return target.with_name(f".{target.name}.staging")
+
+
+def prefetch_path(target: Path) -> Path:
+    return target.with_name(f".{target.name}.prefetch")
+
+
+def stage_tree(
+    objects: ObjectStore,
+    manifest: Manifest,
+    target: Path,
+    staged: Path | None = None,
+) -> Path:
+    staged = staged or staging_path(target)
+    shutil.rmtree(staged, ignore_errors=True)
+    try:
+        staged.mkdir(parents=True)
+        for rel, digest in manifest.items():
+            dest = staged / rel
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if objects.compress:
+                objects.copy_to(digest, dest)
+            else:
+                clone_file(objects.object_path(digest), dest)
+    except BaseException:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    return staged
+
+
+def _exchange(a: Path, b: Path) -> bool:
+    libc = _get_libc()
+    if libc is None:
+        return False
+    a_bytes, b_bytes = os.fsencode(a), os.fsencode(b)
+    try:
+        if sys.platform == "linux":
+            result = libc.renameat2(
+                AT_FDCWD, a_bytes, AT_FDCWD, b_bytes, RENAME_EXCHANGE
+            )
+        else:
+            result = libc.renamex_np(a_bytes, b_bytes, RENAME_SWAP)
+    except AttributeError:
+        return False
+    return int(result) == 0
+
+
+# Returns where the previous target now lives, for the caller to remove
+def swap_in(staged: Path, target: Path) -> Path | None:
+    if not target.exists():
+        os.rename(staged, target)
+        return None
+    if _exchange(staged, target):
+        return staged
+    # No atomic exchange available, fall back to two renames
+    old = target.with_name(f".{target.name}.old")
+    shutil.rmtree(old, ignore_errors=True)
+    os.rename(target, old)
+    try:
+        os.rename(staged, target)
+    except OSError:
+        os.rename(old, target)
+        raise
+    return old
@@ -0,0 +1,20 @@
+from time import perf_counter
+
+from pyqt_utils.config import log
+
+
+# Records how long each startup phase took and logs it
+class StartupTrace:
+    def __init__(self) -> None:
+        self.start = self.last = perf_counter()
+        self.phases: list[tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        now = perf_counter()
+        self.phases.append((phase, now - self.last))
+        log(f"Startup: {phase} took {(now - self.last) * 1000:.1f} ms", "INFO")
+        self.last = now
+
+    def finish(self) -> None:
+        total = (perf_counter() - self.start) * 1000
+        log(f"Startup: done after {total:.1f} ms", "INFO")
@@ -0,0 +1,415 @@
+import difflib
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from threading import RLock
+from typing import IO, Iterable, Iterator
+
+type Manifest = dict[str, str]
+
+CHUNK_SIZE = 1024 * 1024
+
+# Deltas are applied on top of each other when reading, this bounds how many
+MAX_DELTA_DEPTH = 32
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as fp:
+        fp.write(data)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp, path)
+
+
+def hash_file(path: Path) -> str:
+    with open(path, "rb") as fp:
+        return hashlib.file_digest(fp, "sha256").hexdigest()
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# Line-level delta from base to data, None if storing data is smaller.
+# Lines are kept as latin-1 so any bytes survive the JSON round trip.
+def make_delta(base: bytes, data: bytes) -> bytes | None:
+    old = base.splitlines(keepends=True)
+    new = data.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    ops = [
+        [i1, i2, [line.decode("latin-1") for line in new[j1:j2]]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+    ]
+    delta = json.dumps(ops, separators=(",", ":")).encode("utf-8")
+    return delta if len(delta) < len(data) else None
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    lines = base.splitlines(keepends=True)
+    parts = []
+    pos = 0
+    for i1, i2, new in json.loads(delta):
+        parts.extend(lines[pos:i1])
+        parts.extend(line.encode("latin-1") for line in new)
+        pos = i2
+    parts.extend(lines[pos:])
+    return b"".join(parts)
+
+
+# Blobs are named by the sha256 of their uncompressed content and shared
+# between all manifests referencing them. A blob is removed once its
+# reference count drops to zero.
+#
+# Compressed stores can also keep a blob as a delta against another blob,
+# see put_delta(). The delta holds a reference to its base until it's
+# removed itself.
+class ObjectStore:
+    def __init__(self, root: Path, compress: bool = False) -> None:
+        self.root = root
+        self.compress = compress
+        self.lock = RLock()
+        self._db: sqlite3.Connection | None = None
+        self._batch_depth = 0
+
+    @property
+    def refs_path(self) -> Path:
+        return self.root / "refs.sqlite3"
+
+    # Reference counts live in SQLite so a change only touches its own rows
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.refs_path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS refs ("
+                "digest TEXT PRIMARY KEY, count INTEGER NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _commit(self) -> None:
+        if not self._batch_depth:
+            self._connect().commit()
+
+    def _load_refs(self) -> dict[str, int]:
+        refs: dict[str, int] = dict(
+            self._connect().execute("SELECT digest, count FROM refs")
+        )
+        return refs
+
+    def close(self) -> None:
+        with self.lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # Commit the reference counts once at the end instead of per change
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self.lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self._batch_depth -= 1
+                self._commit()
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def delta_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest[2:]}.delta"
+
+    def has(self, digest: str) -> bool:
+        return (
+            self.object_path(digest).is_file()
+            or self.delta_path(digest).is_file()
+        )
+
+    def refcount(self, digest: str) -> int:
+        with self.lock:
+            row = self._connect().execute(
+                "SELECT count FROM refs WHERE digest = ?", (digest,)
+            ).fetchone()
+        return 0 if row is None else int(row[0])
+
+    def stored_size(self, digest: str) -> int:
+        for path in (self.object_path(digest), self.delta_path(digest)):
+            try:
+                return path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return 0
+
+    def total_size(self) -> int:
+        with self.lock:
+            return sum(map(self.stored_size, self._load_refs()))
+
+    def put_bytes(self, data: bytes) -> str:
+        digest = hash_bytes(data)
+        with self.lock:
+            if not self.has(digest):
+                atomic_write(
+                    self.object_path(digest),
+                    zlib.compress(data) if self.compress else data,
+                )
+        return digest
+
+    def put_file(self, path: Path) -> str:
+        if self.compress:
+            return self.put_bytes(path.read_bytes())
+        digest = hash_file(path)
+        if self.has(digest):
+            return digest
+        target = self.object_path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Copied without holding the lock, so every copy needs its own
+        # temporary file
+        fd, tmp = tempfile.mkstemp(".tmp", f".{target.name}.", target.parent)
+        try:
+            with open(path, "rb") as src, open(fd, "wb") as out:
+                shutil.copyfileobj(src, out, CHUNK_SIZE)
+            with self.lock:
+                if not self.has(digest):
+                    os.replace(tmp, target)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+        return digest
+
+    # Copies a blob from fp while hashing it. Nothing is stored unless the
+    # content matches digest, so it's safe to feed untrusted data.
+    def put_stream(self, fp: IO[bytes], digest: str) -> None:
+        if self.compress:
+            if hash_bytes(data := fp.read()) != digest:
+                raise ValueError(f"Blob {digest} is corrupt")
+            self.put_bytes(data)
+            return
+        target = self.object_path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        sha = hashlib.sha256()
+        # Streams run in parallel, each needs its own temporary file
+        fd, tmp = tempfile.mkstemp(".tmp", f".{target.name}.", target.parent)
+        try:
+            with open(fd, "wb") as out:
+                while chunk := fp.read(CHUNK_SIZE):
+                    sha.update(chunk)
+                    out.write(chunk)
+            if sha.hexdigest() != digest:
+                raise ValueError(f"Blob {digest} is corrupt")
+            with self.lock:
+                if not self.has(digest):
+                    os.replace(tmp, target)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+
+    def _read_delta(self, digest: str) -> tuple[str, int, bytes] | None:
+        try:
+            data = zlib.decompress(self.delta_path(digest).read_bytes())
+        except FileNotFoundError:
+            return None
+        header, delta = data.split(b"\n", 1)
+        base, depth = header.decode("ascii").split()
+        return base, int(depth), delta
+
+    def delta_depth(self, digest: str) -> int:
+        delta = self._read_delta(digest) if self.compress else None
+        return 0 if delta is None else delta[1]
+
+    # Stores data as a delta against base if that's smaller, base has to be
+    # in the store already
+    def put_delta(self, data: bytes, base: str) -> str:
+        if not self.compress:
+            return self.put_bytes(data)
+        digest = hash_bytes(data)
+        with self.lock:
+            if self.has(digest):
+                return digest
+            depth = self.delta_depth(base) + 1
+            try:
+                delta = (
+                    make_delta(self.read(base), data)
+                    if depth <= MAX_DELTA_DEPTH else None
+                )
+            except FileNotFoundError:
+                delta = None
+            if delta is None:
+                return self.put_bytes(data)
+            atomic_write(
+                self.delta_path(digest),
+                zlib.compress(f"{base} {depth}\n".encode("ascii") + delta),
+            )
+            self.incref([base])
+        return digest
+
+    def read(self, digest: str) -> bytes:
+        if self.compress and (delta := self._read_delta(digest)) is not None:
+            base, _, ops = delta
+            return apply_delta(self.read(base), ops)
+        data = self.object_path(digest).read_bytes()
+        return zlib.decompress(data) if self.compress else data
+
+    def copy_to(self, digest: str, dest: Path) -> None:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if self.compress:
+            dest.write_bytes(self.read(digest))
+        else:
+            shutil.copyfile(self.object_path(digest), dest)
+
+    def incref(self, digests: Iterable[str]) -> None:
+        with self.lock:
+            self._connect().executemany(
+                "INSERT INTO refs VALUES (?, 1) ON CONFLICT(digest) "
+                "DO UPDATE SET count = count + 1",
+                ((digest,) for digest in digests),
+            )
+            self._commit()
+
+    def decref(self, digests: Iterable[str]) -> int:
+        freed = 0
+        with self.lock:
+            db = self._connect()
+            pending = list(digests)
+            while pending:
+                digest = pending.pop()
+                count = self.refcount(digest) - 1
+                if count > 0:
+                    db.execute(
+                        "UPDATE refs SET count = ? WHERE digest = ?",
+                        (count, digest),
+                    )
+                    continue
+                db.execute("DELETE FROM refs WHERE digest = ?", (digest,))
+                freed += self.stored_size(digest)
+                # Removing a delta releases its base
+                if self.compress and (
+                    delta := self._read_delta(digest)
+                ) is not None:
+                    pending.append(delta[0])
+                object_path = self.object_path(digest)
+                for path in (object_path, self.delta_path(digest)):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                try:
+                    object_path.parent.rmdir()
+                except OSError:
+                    pass
+            self._commit()
+        return freed
+
+    def verify(self, digest: str) -> bool:
+        try:
+            if self.compress:
+                return hash_bytes(self.read(digest)) == digest
+            return hash_file(self.object_path(digest)) == digest
+        except (OSError, ValueError, TypeError, zlib.error):
+            return False
+
+    def delta_base(self, digest: str) -> str | None:
+        try:
+            delta = self._read_delta(digest) if self.compress else None
+        except (OSError, ValueError, zlib.error):
+            return None
+        return None if delta is None else delta[0]
+
+    # Overwrites a missing or corrupt blob, a delta is replaced by the full
+    # content. The reference counts are left to set_refs().
+    def repair(self, digest: str, data: bytes) -> None:
+        if hash_bytes(data) != digest:
+            raise ValueError(f"Data doesn't match blob {digest}")
+        with self.lock:
+            atomic_write(
+                self.object_path(digest),
+                zlib.compress(data) if self.compress else data,
+            )
+            self.delta_path(digest).unlink(missing_ok=True)
+
+    def count_wrong_refs(self, refs: dict[str, int]) -> int:
+        with self.lock:
+            old = self._load_refs()
+            return sum(
+                old.get(digest, 0) != refs.get(digest, 0)
+                for digest in old.keys() | refs.keys()
+            )
+
+    # Replaces the reference counts, e.g. with ones recounted from the
+    # manifests. Returns how many digests had a different count.
+    def set_refs(self, refs: dict[str, int]) -> int:
+        with self.lock:
+            wrong = self.count_wrong_refs(refs)
+            db = self._connect()
+            db.execute("DELETE FROM refs")
+            db.executemany("INSERT INTO refs VALUES (?, ?)", refs.items())
+            self._commit()
+        return wrong
+
+    # Blobs no reference count points at, and temporary files left behind
+    # by crashes. Files younger than grace seconds may belong to a SAVE
+    # that is being created right now.
+    def unreferenced(self, grace: float = 0) -> list[Path]:
+        found = []
+        cutoff = time.time() - grace
+        with self.lock:
+            refs = self._load_refs()
+            for path in self.root.glob("??/*"):
+                digest = path.parent.name + path.name.removesuffix(".delta")
+                if digest in refs and not path.name.startswith("."):
+                    continue
+                try:
+                    if path.stat().st_mtime <= cutoff:
+                        found.append(path)
+                except FileNotFoundError:
+                    pass
+        return found
+
+    def remove_unreferenced(self, grace: float = 0) -> int:
+        with self.lock:
+            paths = self.unreferenced(grace)
+            for path in paths:
+                path.unlink(missing_ok=True)
+                try:
+                    path.parent.rmdir()
+                except OSError:
+                    pass
+        return len(paths)
+
+    def put_tree(self, path: Path) -> Manifest:
+        manifest: Manifest = {}
+        for file in sorted(path.rglob("*")):
+            if file.is_file():
+                manifest[file.relative_to(path).as_posix()] = (
+                    self.put_file(file)
+                )
+        return manifest
+
+    def checkout(self, manifest: Manifest, dest: Path) -> None:
+        dest.mkdir(parents=True, exist_ok=True)
+        for rel, digest in manifest.items():
+            self.copy_to(digest, dest / rel)
+
+
+def read_manifest(path: Path) -> Manifest:
+    data: Manifest = json.loads(path.read_text("utf-8"))["files"]
+    return data
+
+
+def write_manifest(path: Path, manifest: Manifest) -> None:
+    atomic_write(
+        path,
+        json.dumps({"version": 1, "files": manifest}, indent=2).encode(
+            "utf-8"
+        ),
+    )
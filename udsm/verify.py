@@ -0,0 +1,146 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .index import GAME_TITLES, Game
+from .store import Manifest, ObjectStore, hash_file
+
+# Unused blobs younger than this may belong to a SAVE that is being created
+# or imported right now
+ORPHAN_GRACE = 3600.0
+
+
+@dataclass
+class VerifyReport:
+    # Files of each SAVE or backup that are missing or don't match their hash
+    saves: dict[tuple[Game, str], list[str]] = field(default_factory=dict)
+    backups: dict[str, list[str]] = field(default_factory=dict)
+    unreadable_saves: list[tuple[Game, str]] = field(default_factory=list)
+    # Filled on the GUI thread, see model.orphaned_entries()
+    orphaned_entries: dict[str, list[str]] = field(default_factory=dict)
+    bad_objects: set[str] = field(default_factory=set)
+    bad_backup_objects: set[str] = field(default_factory=set)
+    wrong_refs: int = 0
+    unreferenced: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems()
+
+    def problems(self) -> list[str]:
+        lines = [
+            f"{GAME_TITLES[game]} SAVE '{name}' can't be read"
+            for game, name in self.unreadable_saves
+        ]
+        lines.extend(
+            f"{GAME_TITLES[game]} SAVE '{name}' has missing or corrupt "
+            f"files: {', '.join(files)}"
+            for (game, name), files in self.saves.items()
+        )
+        lines.extend(
+            f"Backup '{name}' has missing or corrupt files: "
+            f"{', '.join(files)}"
+            for name, files in self.backups.items()
+        )
+        lines.extend(
+            f"Playlist '{name}' lists missing SAVES: {', '.join(entries)}"
+            for name, entries in self.orphaned_entries.items()
+        )
+        if self.wrong_refs:
+            lines.append(
+                f"{self.wrong_refs} stored files have wrong reference counts"
+            )
+        if self.unreferenced:
+            lines.append(f"{self.unreferenced} stored files are unused")
+        return lines
+
+
+@dataclass
+class RepairResult:
+    restored_files: int = 0
+    recreated_saves: list[str] = field(default_factory=list)
+    removed_entries: int = 0
+    fixed_refs: int = 0
+    removed_files: int = 0
+    # Problems without anything to repair them from
+    unrepaired: list[str] = field(default_factory=list)
+
+    def summary(self) -> list[str]:
+        lines = []
+        if self.restored_files:
+            lines.append(f"Restored {self.restored_files} stored files")
+        lines.extend(
+            f"Recreated SAVE '{name}' from the pre-made SAVES"
+            for name in self.recreated_saves
+        )
+        if self.removed_entries:
+            lines.append(
+                f"Removed {self.removed_entries} missing SAVES from playlists"
+            )
+        if self.fixed_refs:
+            lines.append(f"Fixed {self.fixed_refs} reference counts")
+        if self.removed_files:
+            lines.append(f"Removed {self.removed_files} unused files")
+        lines.extend(f"Not repaired: {problem}" for problem in self.unrepaired)
+        return lines
+
+
+def count_refs(manifests: Iterable[Manifest]) -> dict[str, int]:
+    return dict(Counter(
+        digest for manifest in manifests for digest in manifest.values()
+    ))
+
+
+def count_backup_refs(
+    objects: ObjectStore, manifests: Iterable[Manifest]
+) -> dict[str, int]:
+    refs = Counter(
+        digest for manifest in manifests for digest in manifest.values()
+    )
+    # Every delta references its base once, all the way down the chain
+    pending = list(refs)
+    seen: set[str] = set()
+    while pending:
+        if (digest := pending.pop()) in seen:
+            continue
+        seen.add(digest)
+        if (base := objects.delta_base(digest)) is not None:
+            refs[base] += 1
+            pending.append(base)
+    return dict(refs)
+
+
+# Hashes every blob in parallel, returns the missing and corrupt ones
+def check_objects(
+    objects: ObjectStore,
+    digests: Iterable[str],
+    max_workers: int = 4,
+    progress: Callable[[int, int], None] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+) -> set[str]:
+    pending = list(digests)
+    bad: set[str] = set()
+
+    def check(digest: str) -> None:
+        if (cancelled is None or not cancelled()) and not objects.verify(
+            digest
+        ):
+            bad.add(digest)
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(check, digest) for digest in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            if progress is not None:
+                progress(done, len(pending))
+    return bad
+
+
+def hash_tree(root: Path) -> dict[str, Path]:
+    files: dict[str, Path] = {}
+    for path in sorted(root.rglob("*")):
+        if path.is_file():
+            files.setdefault(hash_file(path), path)
+    return files